@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Can I Access? - Throughput Benchmarks
+
+Checks thousands of URLs on local fake servers (see fake_server.py) and
+reports URLs checked per second, p50/p99 check latency and peak memory,
+so releases can be compared without touching the network.
+
+Usage (from the python-script directory):
+    python benchmarks/bench.py
+    python benchmarks/bench.py --urls 5000 --parallel 1,16,64 --engine async
+    python benchmarks/bench.py --output before.json
+
+Two suites run at every --parallel level with each engine:
+
+    check      check_url_accessibility() (or its async counterpart) called
+               through the test engine, as a library user would
+    command    the whole test command: CSV in, JSONL out
+
+Every case runs in a process of its own, so its peak memory is its own
+maximum resident set size. Results go to a JSON file; compare files from
+the same machine, since the fake servers share it with the checks.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, PACKAGE_DIR)
+
+from can_i_access import __version__, check_url_accessibility
+from can_i_access.results import percentile
+from fake_server import FakeWeb, CERT_FILE
+
+DEFAULT_URLS = 2000
+DEFAULT_PARALLEL = '1,8,32,100'
+DEFAULT_OUTPUT = 'benchmark-results.json'
+DEFAULT_TIMEOUT = 10
+
+# Kinds of site in the benchmark and their share of the URLs (in percent),
+# with the fake server behaviour each one asks for
+MIX = [
+    ('ok', 60, {}),
+    ('tls', 20, {'tls': True}),
+    ('not_found', 5, {'status': 404}),
+    ('server_error', 3, {'status': 503}),
+    ('redirect', 4, {'redirect': 1}),
+    ('slow_server', 4, {'delay': 200}),
+    ('slow_body', 2, {'slow': 50, 'size': 8192}),
+    ('dropped', 2, {'drop': 1}),
+]
+
+SUITES = ('check', 'command')
+ENGINES = ('thread', 'async')
+
+def build_urls(web, count):
+    """count URLs on web, spread over the MIX in a repeating pattern"""
+    pattern = [behaviour for _, share, behaviour in MIX for _ in range(share)]
+    return [web.url(f"/p{i}", **pattern[i % len(pattern)]) for i in range(count)]
+
+def write_csv(urls, path):
+    """Write urls as a test command input file"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['URL', 'site'])
+        for url in urls:
+            writer.writerow([url, 'Benchmark'])
+
+def read_urls(path):
+    """URLs of a file written by write_csv()"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row['URL'] for row in csv.DictReader(f)]
+
+def run_check_case(engine, parallel, csv_path, timeout):
+    """
+    Check every URL in csv_path through the engine (child process side).
+    
+    Prints {"seconds", "latencies", "statuses"} as JSON.
+    """
+    from can_i_access.resolver import Resolver
+    from can_i_access.session import CheckSession
+    
+    urls = read_urls(csv_path)
+    resolver = Resolver()
+    if engine == 'async':
+        from can_i_access.aio import check_url_accessibility_async, iter_checks_async
+        session = CheckSession(resolver=resolver, check_videos=False)
+        
+        async def timed_check(url):
+            started = time.perf_counter()
+            result = await check_url_accessibility_async(url, timeout=timeout, session=session)
+            return result, time.perf_counter() - started
+        checks = iter_checks_async(urls, timed_check, parallel)
+    else:
+        from can_i_access.engine import iter_checks
+        from can_i_access.pool import ConnectionPool
+        session = CheckSession(pool=ConnectionPool(resolver=resolver), resolver=resolver, check_videos=False)
+        
+        def timed_check(url):
+            started = time.perf_counter()
+            result = check_url_accessibility(url, timeout=timeout, session=session)
+            return result, time.perf_counter() - started
+        checks = iter_checks(urls, timed_check, parallel)
+    
+    started = time.perf_counter()
+    latencies = []
+    statuses = Counter()
+    for _, _, (result, seconds) in checks:
+        latencies.append(seconds)
+        statuses[result['status']] += 1
+    elapsed = time.perf_counter() - started
+    session.close()
+    json.dump({'seconds': elapsed, 'latencies': latencies, 'statuses': statuses}, sys.stdout)
+
+def run_process(command, env):
+    """
+    Run command to completion.
+    
+    Returns (stdout, exit code, peak resident memory in bytes or None
+    where the platform cannot report it).
+    """
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, env=env, cwd=PACKAGE_DIR)
+    output = process.stdout.read()
+    process.stdout.close()
+    if not hasattr(os, 'wait4'):
+        return output, process.wait(), None
+    
+    _, status, usage = os.wait4(process.pid, 0)
+    # Same as os.waitstatus_to_exitcode(), which is Python 3.9+
+    process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return output, process.returncode, peak
+
+def run_case(suite, engine, parallel, csv_path, work_dir, timeout, env):
+    """Run one benchmark case in a child process and summarize it"""
+    if suite == 'check':
+        command = [sys.executable, os.path.abspath(__file__), '--case', engine, str(parallel),
+                   csv_path, '--timeout', str(timeout)]
+        started = time.perf_counter()
+        output, exit_code, peak = run_process(command, env)
+        wall = time.perf_counter() - started
+        if exit_code != 0:
+            raise RuntimeError(f"check case exited with {exit_code}")
+        case = json.loads(output)
+        seconds, latencies, statuses = case['seconds'], case['latencies'], case['statuses']
+    else:
+        results_path = os.path.join(work_dir, f"{engine}-{parallel}.jsonl")
+        command = [sys.executable, '-m', 'can_i_access', '-q', 'test', '--csv', csv_path,
+                   '--engine', engine, '--parallel', str(parallel), '--timeout', str(timeout),
+                   '--format', 'jsonl', '--output', results_path,
+                   '--host-concurrency', '0', '--breaker-threshold', '0']
+        started = time.perf_counter()
+        _, exit_code, peak = run_process(command, env)
+        seconds = wall = time.perf_counter() - started
+        if exit_code not in (0, 1):
+            raise RuntimeError(f"test command exited with {exit_code}")
+        latencies = []
+        statuses = Counter()
+        with open(results_path, encoding='utf-8') as f:
+            for line in f:
+                result = json.loads(line)
+                latencies.append(result['response_time'] or 0.0)
+                statuses[result['status']] += 1
+    
+    latencies.sort()
+    checked = len(latencies)
+    return {
+        'suite': suite,
+        'engine': engine,
+        'parallel': parallel,
+        'urls': checked,
+        'seconds': round(seconds, 3),
+        'wall_seconds': round(wall, 3),
+        'throughput': round(checked / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        'peak_memory_mb': round(peak / (1024 * 1024), 1) if peak else None,
+        'statuses': dict(statuses),
+    }
+
+def parse_levels(text):
+    """--parallel list as integers"""
+    try:
+        levels = [int(level) for level in text.split(',') if level.strip()]
+    except ValueError:
+        levels = []
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of positive numbers")
+    return levels
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline throughput benchmarks against local fake servers')
+    parser.add_argument('--urls', type=int, default=DEFAULT_URLS, metavar='N',
+                        help=f'URLs checked in each case (default: {DEFAULT_URLS})')
+    parser.add_argument('--parallel', type=parse_levels, default=parse_levels(DEFAULT_PARALLEL), metavar='LIST',
+                        help=f'comma-separated --parallel levels (default: {DEFAULT_PARALLEL})')
+    parser.add_argument('--engine', choices=ENGINES + ('both',), default='both',
+                        help='engine to benchmark (default: both)')
+    parser.add_argument('--suite', choices=SUITES + ('both',), default='both',
+                        help='benchmark suite to run (default: both)')
+    parser.add_argument('--latency', type=float, default=0, metavar='MS',
+                        help='delay the fake servers add to every answer (default: 0)')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT, metavar='SECONDS',
+                        help=f'check timeout (default: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--output', '-o', default=DEFAULT_OUTPUT, metavar='FILE',
+                        help=f'JSON results file (default: {DEFAULT_OUTPUT})')
+    parser.add_argument('--case', nargs=3, metavar=('ENGINE', 'PARALLEL', 'CSV'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.case:
+        engine, parallel, csv_path = args.case
+        run_check_case(engine, int(parallel), csv_path, args.timeout)
+        return
+    
+    from can_i_access.engine import MAX_PARALLEL
+    engines = ENGINES if args.engine == 'both' else (args.engine,)
+    suites = SUITES if args.suite == 'both' else (args.suite,)
+    
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'urls': args.urls,
+        'latency_ms': args.latency,
+        'mix': {name: share for name, share, _ in MIX},
+        'results': [],
+    }
+    print(f"Benchmarking can-i-access {__version__}: {args.urls} URLs per case")
+    print(f"{'suite':<8} {'engine':<7} {'-j':>5} {'URLs/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    
+    with tempfile.TemporaryDirectory() as work_dir, FakeWeb(latency=args.latency / 1000) as web:
+        # Child processes trust the fake HTTPS server's certificate, go
+        # straight to it and keep their caches out of the user's
+        env = dict(os.environ, SSL_CERT_FILE=CERT_FILE, NO_PROXY='*', XDG_CACHE_HOME=work_dir)
+        for proxy in ('http_proxy', 'https_proxy', 'HTTP_PROXY', 'HTTPS_PROXY'):
+            env.pop(proxy, None)
+        
+        csv_path = os.path.join(work_dir, 'urls.csv')
+        write_csv(build_urls(web, args.urls), csv_path)
+        for suite in suites:
+            for engine in engines:
+                for parallel in args.parallel:
+                    if engine == 'thread' and parallel > MAX_PARALLEL:
+                        continue
+                    case = run_case(suite, engine, parallel, csv_path, work_dir, args.timeout, env)
+                    report['results'].append(case)
+                    peak = case['peak_memory_mb'] if case['peak_memory_mb'] is not None else '-'
+                    print(f"{suite:<8} {engine:<7} {parallel:>5} {case['throughput']:>9} "
+                          f"{case['p50_ms']:>8} {case['p99_ms']:>8} {peak:>8}")
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
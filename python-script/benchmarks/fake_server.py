@@ -0,0 +1,155 @@
+"""
+Fake web servers for the benchmarks - local stand-ins for real websites
+
+Each URL's query string says how the server answers it, so one server
+can play every kind of site a run meets:
+
+    status=404      answer with this HTTP status (default 200)
+    delay=150       wait this many milliseconds before answering
+    size=4096       send a body of this many bytes (default 512)
+    slow=100        send the body in chunks, this many milliseconds apart
+    drop=1          close the connection without answering
+    redirect=1      redirect once to the same URL without redirect=1
+
+Plain HTTP and HTTPS servers are started side by side on 127.0.0.1. The
+HTTPS server uses keycert.pem, a self-signed certificate for localhost
+and 127.0.0.1; clients trust it through SSL_CERT_FILE (see CERT_FILE).
+"""
+
+import os
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+CERT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keycert.pem')
+
+DEFAULT_BODY_SIZE = 512
+
+# Chunks a slow body is sent in
+SLOW_CHUNKS = 8
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Answers every request the way its query string asks"""
+    
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this, delayed ACKs
+    # add 40ms to many answers
+    disable_nagle_algorithm = True
+    
+    def do_GET(self):
+        self.respond(send_body=True)
+    
+    def do_HEAD(self):
+        self.respond(send_body=False)
+    
+    def respond(self, send_body):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        
+        delay = self.server.latency + int(query.get('delay', 0)) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        
+        if query.get('drop'):
+            self.close_connection = True
+            return
+        
+        if query.pop('redirect', None):
+            self.send_response(302)
+            self.send_header('Location', f"{parts.path}?{urlencode(query)}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        status = int(query.get('status', 200))
+        body = b'x' * int(query.get('size', DEFAULT_BODY_SIZE))
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not send_body:
+            return
+        
+        slow = int(query.get('slow', 0)) / 1000
+        if slow <= 0:
+            self.wfile.write(body)
+            return
+        chunk = max(1, len(body) // SLOW_CHUNKS)
+        for start in range(0, len(body), chunk):
+            self.wfile.write(body[start:start + chunk])
+            self.wfile.flush()
+            time.sleep(slow)
+    
+    def log_message(self, format, *args):
+        pass
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    """A threading HTTP server with room for many waiting connections"""
+    
+    daemon_threads = True
+    request_queue_size = 1024
+    
+    def __init__(self, address, latency=0.0, tls=False):
+        super().__init__(address, FakeHandler)
+        self.latency = latency
+        self.context = None
+        if tls:
+            self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.context.load_cert_chain(CERT_FILE)
+    
+    def finish_request(self, request, client_address):
+        # TLS handshakes run on the connection's own thread, so a slow
+        # client never holds up accepting the next connection
+        if self.context is not None:
+            try:
+                request = self.context.wrap_socket(request, server_side=True)
+            except (OSError, ssl.SSLError):
+                return
+        super().finish_request(request, client_address)
+    
+    def handle_error(self, request, client_address):
+        # Clients give up on slow and dropped answers; that is expected
+        pass
+
+class FakeWeb:
+    """
+    Plain and TLS fake servers on ephemeral ports of 127.0.0.1.
+    
+    ``latency`` (seconds) is added before every answer, on top of any
+    per-URL delay. Use as a context manager, and url() to build URLs.
+    """
+    
+    def __init__(self, latency=0.0):
+        self.http = FakeServer(('127.0.0.1', 0), latency)
+        self.https = FakeServer(('127.0.0.1', 0), latency, tls=True)
+        self._threads = []
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def start(self):
+        for server in (self.http, self.https):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        for server in (self.http, self.https):
+            server.shutdown()
+            server.server_close()
+    
+    def url(self, path='/', tls=False, **behaviour):
+        """URL on the plain or TLS server that is answered as behaviour asks"""
+        if tls:
+            base = f"https://127.0.0.1:{self.https.server_address[1]}"
+        else:
+            base = f"http://127.0.0.1:{self.http.server_address[1]}"
+        query = urlencode({key: value for key, value in behaviour.items() if value})
+        return f"{base}{path}?{query}" if query else f"{base}{path}"
@@ -17,7 +17,8 @@ import sys
 import os
 import argparse
 import textwrap
-from urllib.parse import urlparse
+from http.client import HTTPException
+from urllib.parse import urlparse, quote
 from urllib.request import urlopen, Request, HTTPError, URLError
 from urllib.error import URLError
 import csv
@@ -28,6 +29,10 @@ from datetime import datetime
 import socket
 import ssl
 
+from .results import CheckResult, PHASE_FIELDS, add_phase_times
+from .session import ConnectTimeout, uses_proxy
+from .timeouts import DEFAULT_TIMEOUT_MIN, DEFAULT_TIMEOUT_MAX
+
 # Version info
 __version__ = "2.0.0"
 __author__ = "RiceC-at-MasonHS"
@@ -36,6 +41,17 @@ __author__ = "RiceC-at-MasonHS"
 DEFAULT_TIMEOUT = 10
 USER_AGENT = "CanIAccess/2.0 (Educational Network Testing Tool)"
 MAX_REDIRECTS = 5
+HTTPS_UPGRADE_TIMEOUT = 5
+
+# Minimal-bytes probe mode: statuses meaning "this server does not do HEAD",
+# and the most body bytes read from the GET sent instead
+HEAD_REJECTED_CODES = (405, 501)
+PROBE_BODY_LIMIT = 1024
+
+# Layers a check can stop at (--depth), and the method reported for the
+# shallow ones
+PROBE_DEPTHS = ('dns', 'tcp', 'tls', 'http')
+DEPTH_METHODS = {'dns': 'DNS Lookup', 'tcp': 'TCP Connect', 'tls': 'TLS Handshake'}
 
 # Predefined Google Sheets for educational content
 PREDEFINED_SHEETS = {
@@ -68,114 +84,362 @@ def eprint(*args, **kwargs):
     """Print to stderr"""
     print(*args, file=sys.stderr, **kwargs)
 
+def format_bytes(count):
+    """Format a byte count for display (e.g. 1.5 MB)"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
 def format_url_for_display(url, max_length=60):
     """Format URL for display, truncating if necessary"""
     if len(url) <= max_length:
         return url
     return url[:max_length-3] + "..."
 
+# Finds a YouTube video, short, live stream or playlist link and its ID in
+# one pass
+YOUTUBE_URL_PATTERN = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*&)?v=|(?:embed|v|shorts|live)/(?!videoseries)'
+    r'|(?P<playlist>playlist\?(?:[^#]*&)?list=))|youtu\.be/)(?P<id>[\w-]+)',
+    re.IGNORECASE
+)
+
+def classify_youtube_url(url):
+    """
+    Identify a YouTube link.
+    
+    Returns ('video', video_id) for watch, youtu.be, embed, /v/, shorts and
+    live links, ('playlist', playlist_id) for playlist links, or None.
+    """
+    match = YOUTUBE_URL_PATTERN.search(url)
+    if not match:
+        return None
+    return ('playlist' if match.group('playlist') else 'video'), match.group('id')
+
 def is_youtube_url(url):
-    """Check if URL is a YouTube video"""
-    youtube_patterns = [
-        r'youtube\.com/watch\?v=',
-        r'youtu\.be/',
-        r'youtube\.com/embed/',
-        r'youtube\.com/v/'
-    ]
-    return any(re.search(pattern, url, re.IGNORECASE) for pattern in youtube_patterns)
+    """Check if URL is a YouTube video or playlist"""
+    return classify_youtube_url(url) is not None
 
 def extract_youtube_video_id(url):
     """Extract YouTube video ID from URL"""
-    patterns = [
-        r'youtube\.com/watch\?v=([^&]+)',
-        r'youtu\.be/([^?]+)',
-        r'youtube\.com/embed/([^?]+)',
-        r'youtube\.com/v/([^?]+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url, re.IGNORECASE)
-        if match:
-            return match.group(1)
+    youtube = classify_youtube_url(url)
+    if youtube and youtube[0] == 'video':
+        return youtube[1]
     return None
 
-def check_youtube_video(video_id, timeout=10):
-    """Check if YouTube video is available using oEmbed API"""
+def get_default_session():
+    """Session used by checks called without one (plain urlopen, nothing shared)"""
+    from .session import CheckSession
+    return CheckSession()
+
+def youtube_oembed_url(video_id, kind='video'):
+    """oEmbed endpoint URL for a YouTube video or playlist"""
+    if kind == 'playlist':
+        target = f"https://www.youtube.com/playlist?list={video_id}"
+    else:
+        target = f"https://www.youtube.com/watch?v={video_id}"
+    return f"https://www.youtube.com/oembed?url={quote(target, safe='')}&format=json"
+
+def youtube_check_from_status(status, kind='video'):
+    """
+    Availability result for an oEmbed response status.
+    
+    'definitive' is True when YouTube itself answered about the video, so
+    the answer may be remembered; server errors are not definitive.
+    """
+    label = kind.capitalize()
+    if status == 200:
+        return {"available": True, "reason": f"{label} accessible", "definitive": True}
+    elif status in (401, 403, 404):
+        return {"available": False, "reason": f"{label} not found or private", "definitive": True}
+    elif status >= 400:
+        return {"available": False, "reason": f"HTTP error {status}", "definitive": status < 500}
+    else:
+        return {"available": False, "reason": f"HTTP {status}", "definitive": False}
+
+def check_youtube_video(video_id, timeout=10, session=None, kind='video'):
+    """Check if YouTube video (or playlist) is available using oEmbed API"""
     if not video_id:
-        return {"available": False, "reason": "Invalid video ID"}
+        return {"available": False, "reason": "Invalid video ID", "definitive": False}
     
-    oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
+    session = session or get_default_session()
     
     try:
-        req = Request(oembed_url, headers={'User-Agent': USER_AGENT})
-        with urlopen(req, timeout=timeout) as response:
-            if response.status == 200:
-                return {"available": True, "reason": "Video accessible"}
-            else:
-                return {"available": False, "reason": f"HTTP {response.status}"}
+        response = session.request('GET', youtube_oembed_url(video_id, kind), {'User-Agent': USER_AGENT}, timeout)
+        return youtube_check_from_status(response.status, kind)
     except HTTPError as e:
-        if e.code == 404:
-            return {"available": False, "reason": "Video not found or private"}
-        else:
-            return {"available": False, "reason": f"HTTP error {e.code}"}
-    except (URLError, socket.timeout, ssl.SSLError) as e:
-        return {"available": False, "reason": f"Network error: {str(e)}"}
+        return youtube_check_from_status(e.code, kind)
+    except (OSError, HTTPException) as e:
+        # Includes resets and connections closed without an answer
+        return {"available": False, "reason": f"Network error: {str(e)}", "definitive": False}
 
-def attempt_https_upgrade(url):
+def attempt_https_upgrade(url, session=None):
     """Try to upgrade HTTP URL to HTTPS"""
     if not url.lower().startswith('http://'):
         return url, False
     
     https_url = url.replace('http://', 'https://', 1)
+    session = session or get_default_session()
     
     try:
         # Quick test with a HEAD request
-        req = Request(https_url, headers={'User-Agent': USER_AGENT})
-        req.get_method = lambda: 'HEAD'
-        
-        with urlopen(req, timeout=5) as response:
-            if response.status < 400:
-                return https_url, True
+        response = session.request('HEAD', https_url, {'User-Agent': USER_AGENT}, HTTPS_UPGRADE_TIMEOUT)
+        if response.status < 400:
+            return https_url, True
     except:
         pass
     
     return url, False
 
-def check_url_accessibility(url, timeout=DEFAULT_TIMEOUT, verbose=False):
+def probe_depth(url, session):
+    """
+    Layer a check of url stops at: the session's depth, except that
+    http:// URLs have no TLS to stop at and proxied URLs can only be
+    tested through the proxy, with a full request.
+    """
+    if session.depth == 'http' or uses_proxy(url):
+        return 'http'
+    if session.depth == 'tls' and not url.lower().startswith('https://'):
+        return 'tcp'
+    return session.depth
+
+def shallow_probe(url, depth, timeout, session, connect_timeout=None, result=None):
+    """
+    Check url only as far as depth: 'dns' resolves the host, 'tcp'
+    connects to the URL's port and 'tls' also completes the TLS handshake
+    with SNI. Returns (host, port) and raises the same network errors as a
+    request. When result is given, the phase times are added to it.
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname
+    if depth == 'dns':
+        session.lookup(host)
+        return host, None
+    
+    port = parsed.port or (443 if parsed.scheme.lower() == 'https' else 80)
+    timings = session.handshake(host, port, depth == 'tls', timeout, connect_timeout)
+    if result is not None:
+        add_phase_times(result, timings)
+    return host, port
+
+def send_probe(url, timeout, session, result=None, connect_timeout=None):
+    """
+    Send the accessibility request for url in the session's probe mode.
+    
+    'get' sends a normal GET. 'head' sends HEAD and only falls back to a GET
+    when the server rejects HEAD (405/501); that GET asks for the first byte
+    with a Range header and reads at most PROBE_BODY_LIMIT body bytes.
+    """
+    if session.probe_mode != 'head':
+        return session.request('GET', url, REQUEST_HEADERS, timeout, result=result,
+                               connect_timeout=connect_timeout)
+    
+    try:
+        return session.request('HEAD', url, REQUEST_HEADERS, timeout, result=result,
+                               connect_timeout=connect_timeout)
+    except HTTPError as e:
+        if e.code not in HEAD_REJECTED_CODES:
+            raise
+    
+    range_headers = dict(REQUEST_HEADERS, Range='bytes=0-0')
+    try:
+        return session.request('GET', url, range_headers, timeout, max_body=PROBE_BODY_LIMIT,
+                               result=result, connect_timeout=connect_timeout)
+    except HTTPError as e:
+        if e.code != 416:
+            raise
+    # Range not satisfiable (empty resource) - ask again without the range
+    return session.request('GET', url, REQUEST_HEADERS, timeout, max_body=PROBE_BODY_LIMIT,
+                           result=result, connect_timeout=connect_timeout)
+
+def request_https_variant(url, timeout, session, result=None, connect_timeout=None):
+    """
+    Send the accessibility request to the https:// variant of an http:// URL.
+    
+    Returns the Response if HTTPS works, or None (the caller falls back to
+    plain HTTP). The attempt is capped at HTTPS_UPGRADE_TIMEOUT seconds.
+    """
+    https_url = url.replace('http://', 'https://', 1)
+    try:
+        response = send_probe(https_url, min(timeout, HTTPS_UPGRADE_TIMEOUT), session, result,
+                              connect_timeout)
+        if response.status < 400:
+            return response
+    except Exception:
+        pass
+    return None
+
+def merge_probe(result, probe):
+    """Add the bytes and phase times a request counted into probe to result"""
+    result['bytes_transferred'] += probe['bytes_transferred']
+    add_phase_times(result, {field: probe[field] for field in PHASE_FIELDS if field in probe})
+
+# Request headers sent with every accessibility check
+REQUEST_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+def new_result(url):
+    """Create the result record for a URL check (see results.CheckResult)"""
+    return CheckResult(url)
+
+def apply_http_status(result, status, reason=''):
+    """Classify an HTTP status code into the result"""
+    result['http_status'] = status
+    result['method'] = 'HTTP Request'
+    
+    if status >= 400:
+        result['status'] = 'Not Reachable'
+        result['message'] = f"HTTP {status}: {reason}"
+        return result
+    
+    # Success - determine specific status
+    if result['is_http_only']:
+        result['status'] = 'Reachable (HTTP Warning)'
+        result['message'] = "⚠️ Site accessible but uses insecure HTTP. Modern browsers may show warnings."
+    elif result['https_upgraded']:
+        if result['is_youtube'] and result['video_available']:
+            result['status'] = 'Fully Accessible (Video Available, HTTPS Upgraded)'
+            result['message'] = "✓ YouTube video accessible with HTTPS upgrade"
+        else:
+            result['status'] = 'Fully Accessible (HTTPS Upgraded)'
+            result['message'] = "✓ Site accessible with HTTPS upgrade"
+    else:
+        if result['is_youtube'] and result['video_available']:
+            result['status'] = 'Fully Accessible (Video Available)'
+            result['message'] = "✓ YouTube video fully accessible"
+        else:
+            result['status'] = 'Fully Accessible'
+            result['message'] = "✓ Site fully accessible"
+    return result
+
+def apply_http_error(result, error):
+    """
+    Classify an HTTPError into the result. urlopen and the connection pool
+    only raise 3xx statuses for redirect loops, which no browser can load
+    """
+    if error.code >= 400:
+        return apply_http_status(result, error.code, error.reason)
+    result['http_status'] = error.code
+    result['method'] = 'HTTP Request'
+    result['status'] = 'Not Reachable'
+    result['message'] = f"HTTP {error.code}: redirect loop - too many redirects"
+    return result
+
+def is_connection_failure(error):
+    """
+    True for failures to connect or complete the TLS handshake.
+    
+    These are what a firewall that drops or resets traffic produces; DNS
+    failures and HTTP error statuses do not count, and neither do timeouts
+    or resets on a connection that was already set up (errors marked by
+    session.mark_connected), which come from slow or broken servers.
+    """
+    if getattr(error, 'connected', False):
+        return False
+    if isinstance(error, URLError) and isinstance(error.reason, Exception):
+        error = error.reason
+    if isinstance(error, socket.gaierror) or getattr(error, 'connected', False):
+        return False
+    # Connect timeouts, refused/reset connections and SSL errors are all OSErrors
+    return isinstance(error, OSError)
+
+def is_timeout(error):
+    """True if a network error was a timeout"""
+    if isinstance(error, URLError) and isinstance(error.reason, Exception):
+        error = error.reason
+    return isinstance(error, socket.timeout)
+
+def apply_inferred_block(result, failures):
+    """Mark a result as blocked without testing it (host circuit is open)"""
+    host = urlparse(result['url']).hostname
+    result['status'] = 'Not Reachable'
+    result['method'] = 'Circuit Breaker'
+    result['inferred'] = True
+    result['message'] = (f"Inferred, not tested: {failures} connection attempts to {host} "
+                         f"failed in a row, so the host is treated as blocked")
+    return result
+
+def apply_network_error(result, error, timeout, method='HTTP Request'):
+    """Classify a connection-level failure into the result"""
+    # urlopen wraps the underlying socket error in URLError
+    if isinstance(error, URLError) and isinstance(error.reason, Exception):
+        error = error.reason
+    
+    result['status'] = 'Not Reachable'
+    result['method'] = method
+    
+    if isinstance(error, ConnectTimeout):
+        result['message'] = f"Connection timeout: {error} - site may be blocked"
+    elif isinstance(error, socket.timeout):
+        result['message'] = f"Timeout after {timeout}s - site may be blocked or very slow"
+    elif isinstance(error, socket.gaierror):
+        result['message'] = f"DNS resolution failed - site may not exist or DNS is blocked"
+    elif isinstance(error, ssl.SSLError):
+        result['message'] = f"SSL/TLS error - certificate or security issue"
+    else:
+        result['message'] = f"Network error: {str(error)}"
+    return result
+
+def apply_shallow_success(result, depth, host, port):
+    """Classify a check that stopped before HTTP (see shallow_probe)"""
+    result['method'] = DEPTH_METHODS[depth]
+    if depth == 'dns':
+        reached = f"{host} resolves (no connection made)"
+    elif depth == 'tcp':
+        reached = f"TCP connection to {host}:{port} accepted"
+    else:
+        reached = f"TLS handshake with {host}:{port} completed"
+    
+    if result['is_http_only']:
+        result['status'] = 'Reachable (HTTP Warning)'
+        result['message'] = f"⚠️ {reached}, but the site uses insecure HTTP"
+    else:
+        result['status'] = 'Reachable'
+        result['message'] = f"✓ {reached}"
+    return result
+
+def apply_video_check(result, youtube_check):
+    """
+    Record a YouTube availability check in the result.
+    
+    Returns True when the video is unavailable and the check is finished.
+    """
+    result['video_available'] = youtube_check['available']
+    if youtube_check['available']:
+        return False
+    
+    result['status'] = 'Video Removed'
+    result['http_status'] = '404'
+    result['message'] = f"YouTube video unavailable: {youtube_check['reason']}"
+    result['method'] = 'YouTube oEmbed'
+    return True
+
+def check_url_accessibility(url, timeout=DEFAULT_TIMEOUT, verbose=False, session=None):
     """
     Check if a URL is accessible from the current network.
     
     Args:
         url (str): URL to check
-        timeout (int): Request timeout in seconds
+        timeout (int): Request timeout in seconds (the session's adaptive
+            timeouts choose it instead when it has them)
         verbose (bool): Enable verbose output
+        session (CheckSession): Shared per-run state such as the connection
+            pool (default: a standalone urlopen session)
         
     Returns:
         dict: Result dictionary with status, message, and metadata
     """
-    original_url = url
-    https_upgraded = False
-    
-    # Initialize result structure
-    result = {
-        'url': original_url,
-        'final_url': url,
-        'status': 'Error',
-        'http_status': 'N/A',
-        'message': 'Unknown error',
-        'method': 'Unknown',
-        'is_http_only': False,
-        'https_upgraded': False,
-        'is_youtube': False,
-        'video_available': None,
-        'response_time': 0,
-        'site_name': '',
-        'unit': '',
-        'importance': 0,
-        'pii_required': False
-    }
-    
+    result = new_result(url)
+    session = session or get_default_session()
     start_time = time.time()
+    method = 'HTTP Request'
     
     try:
         # Parse URL to validate
@@ -183,110 +447,106 @@ def check_url_accessibility(url, timeout=DEFAULT_TIMEOUT, verbose=False):
         if not parsed.scheme or not parsed.netloc:
             result['message'] = "Invalid URL format"
             return result
+        depth = probe_depth(url, session)
+        method = DEPTH_METHODS.get(depth, method)
         
-        # Check for HTTPS upgrade opportunity
-        if url.lower().startswith('http://'):
-            if verbose:
-                print(f"  → Attempting HTTPS upgrade for {url}")
-            upgraded_url, upgraded = attempt_https_upgrade(url)
-            if upgraded:
-                url = upgraded_url
-                https_upgraded = True
-                result['https_upgraded'] = True
-                result['final_url'] = url
-                if verbose:
-                    print(f"  ✓ HTTPS upgrade successful: {url}")
-            else:
-                result['is_http_only'] = True
-                if verbose:
-                    print(f"  ⚠ HTTPS upgrade failed, using HTTP")
+        # Hosts that failed the DNS pre-resolution stage fail here, before
+        # any HTTP attempt
+        dns_time = session.resolve(url)
+        if dns_time is not None:
+            result['dns_time'] = dns_time
+        
+        # Hosts that keep failing to connect are not tested again
+        if session.circuit_open(url):
+            return apply_inferred_block(result, session.circuit_failures(parsed.hostname))
+        
+        # With adaptive timeouts new connections get a shorter deadline
+        timeout, connect_timeout = session.deadlines(url, timeout)
+        result['timeout'] = timeout
+        if connect_timeout is not None:
+            result['connect_timeout'] = connect_timeout
         
         # Special handling for YouTube URLs
-        if is_youtube_url(url):
+        youtube = classify_youtube_url(url)
+        if youtube:
             result['is_youtube'] = True
-            video_id = extract_youtube_video_id(url)
             
-            if video_id:
+            if session.check_videos:
+                kind, video_id = youtube
                 if verbose:
-                    print(f"  → Checking YouTube video availability: {video_id}")
-                
-                youtube_check = check_youtube_video(video_id, timeout)
-                result['video_available'] = youtube_check['available']
+                    print(f"  → Checking YouTube {kind} availability: {video_id}")
                 
-                if not youtube_check['available']:
-                    result['status'] = 'Video Removed'
-                    result['http_status'] = '404'
-                    result['message'] = f"YouTube video unavailable: {youtube_check['reason']}"
-                    result['method'] = 'YouTube oEmbed'
+                if apply_video_check(result, session.check_video(kind, video_id, timeout)):
                     result['response_time'] = time.time() - start_time
                     return result
         
-        # Attempt connection
-        if verbose:
-            print(f"  → Testing connectivity to {format_url_for_display(url)}")
-        
-        req = Request(url, headers={
-            'User-Agent': USER_AGENT,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
-        
-        with urlopen(req, timeout=timeout) as response:
-            result['http_status'] = response.status
+        # Shallow depths stop before HTTP
+        if depth != 'http':
+            result['is_http_only'] = url.lower().startswith('http://')
+            host, port = shallow_probe(url, depth, timeout, session, connect_timeout, result)
             result['response_time'] = time.time() - start_time
-            
-            if response.status < 400:
-                # Success - determine specific status
-                if result['is_http_only']:
-                    result['status'] = 'Reachable (HTTP Warning)'
-                    result['message'] = "⚠️ Site accessible but uses insecure HTTP. Modern browsers may show warnings."
-                elif https_upgraded:
-                    if result['is_youtube'] and result['video_available']:
-                        result['status'] = 'Fully Accessible (Video Available, HTTPS Upgraded)'
-                        result['message'] = "✓ YouTube video accessible with HTTPS upgrade"
-                    elif result['is_youtube']:
-                        result['status'] = 'Fully Accessible (HTTPS Upgraded)'
-                        result['message'] = "✓ Site accessible with HTTPS upgrade"
-                    else:
-                        result['status'] = 'Fully Accessible (HTTPS Upgraded)'
-                        result['message'] = "✓ Site accessible with HTTPS upgrade"
-                else:
-                    if result['is_youtube'] and result['video_available']:
-                        result['status'] = 'Fully Accessible (Video Available)'
-                        result['message'] = "✓ YouTube video fully accessible"
-                    else:
-                        result['status'] = 'Fully Accessible'
-                        result['message'] = "✓ Site fully accessible"
+            apply_shallow_success(result, depth, host, port)
+            session.record_outcome(url, False)
+            return result
+        
+        response = None
+        if url.lower().startswith('http://'):
+            result['is_http_only'] = True
+            if session.https_upgrade:
+                # The HTTPS attempt doubles as the accessibility check; with
+                # race_https the plain HTTP request is already in flight in
+                # case the upgrade fails
+                if verbose:
+                    print(f"  → Attempting HTTPS upgrade for {url}")
+                http_future = None
+                if session.race_https:
+                    # The raced request counts into a scratch record of its
+                    # own, so one that is abandoned never touches the result
+                    http_probe = {'bytes_transferred': 0}
+                    http_future = session.submit(send_probe, url, timeout, session, http_probe,
+                                                 connect_timeout)
                 
-                result['method'] = 'HTTP Request'
-            else:
-                result['status'] = 'Not Reachable'
-                result['message'] = f"HTTP error {response.status}"
-                result['method'] = 'HTTP Request'
+                upgraded_response = request_https_variant(url, timeout, session, result, connect_timeout)
+                if upgraded_response is not None:
+                    if http_future is not None:
+                        http_future.cancel()
+                    response = upgraded_response
+                    url = url.replace('http://', 'https://', 1)
+                    result['is_http_only'] = False
+                    result['https_upgraded'] = True
+                    result['final_url'] = url
+                    if verbose:
+                        print(f"  ✓ HTTPS upgrade successful: {url}")
+                else:
+                    if verbose:
+                        print(f"  ⚠ HTTPS upgrade failed, using HTTP")
+                    if http_future is not None:
+                        try:
+                            response = http_future.result()
+                        finally:
+                            merge_probe(result, http_probe)
+        
+        # Attempt connection
+        if response is None:
+            if verbose:
+                print(f"  → Testing connectivity to {format_url_for_display(url)}")
+            response = send_probe(url, timeout, session, result, connect_timeout)
+        
+        result['response_time'] = time.time() - start_time
+        apply_http_status(result, response.status, response.reason)
+        session.record_outcome(url, False)
     
     except HTTPError as e:
-        result['http_status'] = e.code
         result['response_time'] = time.time() - start_time
-        result['status'] = 'Not Reachable'
-        result['message'] = f"HTTP {e.code}: {e.reason}"
-        result['method'] = 'HTTP Request'
+        apply_http_error(result, e)
+        session.record_outcome(url, False)
         
     except (URLError, socket.timeout, socket.gaierror, ssl.SSLError) as e:
         result['response_time'] = time.time() - start_time
-        result['status'] = 'Not Reachable'
-        result['method'] = 'HTTP Request'
-        
-        if isinstance(e, socket.timeout):
-            result['message'] = f"Timeout after {timeout}s - site may be blocked or very slow"
-        elif isinstance(e, socket.gaierror):
-            result['message'] = f"DNS resolution failed - site may not exist or DNS is blocked"
-        elif isinstance(e, ssl.SSLError):
-            result['message'] = f"SSL/TLS error - certificate or security issue"
-        else:
-            result['message'] = f"Network error: {str(e)}"
+        apply_network_error(result, e, timeout, method)
+        session.record_outcome(url, is_connection_failure(e))
+        if is_timeout(e):
+            session.record_timeout(url)
     
     except Exception as e:
         result['response_time'] = time.time() - start_time
@@ -317,7 +577,13 @@ def main():
     if args.no_color or not sys.stdout.isatty():
         Colors.disable()
     
-    # Run the appropriate command
+    if args.profile:
+        run_profiled(args)
+    else:
+        run_command(args)
+
+def run_command(args):
+    """Run the chosen subcommand"""
     if args.command == 'test':
         from .commands.test import run_test_command
         run_test_command(args)
@@ -327,11 +593,32 @@ def main():
     elif args.command == 'report':
         from .commands.report import run_report_command
         run_report_command(args)
+    elif args.command == 'history':
+        from .commands.history import run_history_command
+        run_history_command(args)
     else:
         # Default behavior - run test
         from .commands.test import run_test_command
         run_test_command(args)
 
+def run_profiled(args):
+    """Run the chosen subcommand under the profiler and write its report"""
+    from .profiling import Profiler
+    
+    profiler = Profiler()
+    profiler.start()
+    try:
+        run_command(args)
+    finally:
+        # Commands end with sys.exit(), so the report is written on the way out
+        profiler.stop()
+        try:
+            with open(args.profile, 'w', encoding='utf-8') as f:
+                profiler.write_report(f, ' '.join(sys.argv[1:]))
+            eprint(f"{Colors.CYAN}Profile written to {args.profile}{Colors.END}")
+        except OSError as e:
+            eprint(f"{Colors.RED}✗ Cannot write profile {args.profile}: {e}{Colors.END}")
+
 def create_argument_parser():
     """Create the argument parser with all options"""
     parser = argparse.ArgumentParser(
@@ -362,6 +649,8 @@ def create_argument_parser():
                        help='increase verbosity (-v, -vv, -vvv)')
     parser.add_argument('-q', '--quiet', action='store_true',
                        help='minimal output (errors only)')
+    parser.add_argument('--profile', metavar='FILE',
+                       help='profile the command and write hot functions, peak memory and stage times to FILE')
     
     # Subcommands
     subparsers = parser.add_subparsers(dest='command', help='available commands')
@@ -378,6 +667,10 @@ def create_argument_parser():
     report_parser = subparsers.add_parser('report', help='generate reports from results')
     add_report_arguments(report_parser)
     
+    # History command
+    history_parser = subparsers.add_parser('history', help='query results recorded across runs')
+    add_history_arguments(history_parser)
+    
     # Add test arguments to main parser as well (for default behavior)
     add_test_arguments(parser)
     
@@ -405,18 +698,91 @@ def add_test_arguments(parser):
     # Test options
     parser.add_argument('-t', '--timeout', type=int, default=DEFAULT_TIMEOUT,
                        metavar='SECONDS', help=f'request timeout (default: {DEFAULT_TIMEOUT}s)')
-    parser.add_argument('-j', '--parallel', type=int, default=1,
-                       metavar='N', help='number of parallel tests (default: 1)')
+    parser.add_argument('--adaptive-timeout', action='store_true',
+                       help='set connect and read deadlines from the latencies seen so far '
+                       '(reads get at least --timeout)')
+    parser.add_argument('--timeout-min', type=float, default=DEFAULT_TIMEOUT_MIN, metavar='SECONDS',
+                       help=f'shortest adaptive timeout (default: {DEFAULT_TIMEOUT_MIN}s)')
+    parser.add_argument('--timeout-max', type=float, default=DEFAULT_TIMEOUT_MAX, metavar='SECONDS',
+                       help=f'longest adaptive timeout (default: {DEFAULT_TIMEOUT_MAX}s)')
+    parser.add_argument('-j', '--parallel', type=int, default=None,
+                       metavar='N', help='number of URLs to test concurrently '
+                       '(default: 1 for threads, 500 for async)')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                       help='probe engine: worker threads or asyncio (default: thread)')
+    parser.add_argument('--rate', type=float, default=0, metavar='N',
+                       help='start at most N checks per second, 0 for no limit (default: 0)')
+    parser.add_argument('--host-rate', type=float, default=0, metavar='N',
+                       help='start at most N checks per second on one host, 0 for no limit (default: 0)')
+    parser.add_argument('--host-concurrency', type=int, default=6, metavar='N',
+                       help='run at most N checks on one host at once, 0 for no limit (default: 6)')
+    parser.add_argument('--pool-size', type=int, default=32, metavar='N',
+                       help='idle keep-alive connections kept for reuse, 0 disables pooling '
+                       '(thread engine, default: 32)')
+    parser.add_argument('--pool-per-host', type=int, default=6, metavar='N',
+                       help='maximum open connections per host (default: 6)')
+    parser.add_argument('--pool-idle', type=float, default=30, metavar='SECONDS',
+                       help='close pooled connections idle longer than this (default: 30s)')
+    parser.add_argument('--dns-ttl', type=float, default=300, metavar='SECONDS',
+                       help='how long resolved hostnames are cached during a run (default: 300s)')
+    parser.add_argument('--no-dns-prefetch', action='store_true',
+                       help='skip resolving all hostnames before testing starts')
+    parser.add_argument('--breaker-threshold', type=int, default=3, metavar='N',
+                       help='consecutive connect/TLS failures before the rest of a host\'s URLs '
+                       'are inferred as blocked, 0 disables (default: 3)')
+    parser.add_argument('--breaker-confirm', action='store_true',
+                       help='test one more URL on a host before inferring the rest are blocked')
     parser.add_argument('--no-https-upgrade', action='store_true',
                        help='disable automatic HTTP to HTTPS upgrade')
+    parser.add_argument('--depth', choices=PROBE_DEPTHS, default='http',
+                       help='layer each check stops at: DNS lookup, TCP connect, TLS handshake '
+                       'or full HTTP request (default: http)')
+    parser.add_argument('--probe', choices=['get', 'head'], default='get',
+                       help='request method: full GET, or HEAD with a capped GET fallback '
+                       '(default: get)')
+    parser.add_argument('--race-https', action='store_true',
+                       help='request http:// URLs over HTTP and HTTPS at the same time')
     parser.add_argument('--skip-youtube', action='store_true',
                        help='skip YouTube video availability checks')
+    parser.add_argument('--video-ttl', type=float, default=3 * 24 * 3600, metavar='SECONDS',
+                       help='how long YouTube availability answers are reused across runs, '
+                       '0 disables (default: 259200s)')
+    
+    # Checkpoint options
+    parser.add_argument('--journal', metavar='FILE',
+                       help='append each completed result to FILE so the run can be resumed')
+    parser.add_argument('--resume', metavar='JOURNAL',
+                       help='keep the results in JOURNAL, test only the remaining URLs and '
+                       'continue the journal')
+    parser.add_argument('--record', metavar='FILE',
+                       help='save the raw outcome of every network operation to FILE for --replay')
+    parser.add_argument('--replay', metavar='FILE',
+                       help='classify the outcomes saved by --record again, without the network')
+    
+    # Result cache options
+    parser.add_argument('--cache', action='store_true',
+                       help='reuse results verified recently from the on-disk cache')
+    parser.add_argument('--cache-file', metavar='FILE',
+                       help='cache database (default: ~/.cache/can-i-access/results.sqlite)')
+    parser.add_argument('--cache-profile', default='default', metavar='NAME',
+                       help='network profile the cached results belong to (default: default)')
+    parser.add_argument('--cache-ttl', type=float, default=6 * 3600, metavar='SECONDS',
+                       help='how long successful results stay fresh (default: 21600s)')
+    parser.add_argument('--cache-failure-ttl', type=float, default=30 * 60, metavar='SECONDS',
+                       help='how long blocked and failed results stay fresh (default: 1800s)')
+    parser.add_argument('--refresh', action='store_true',
+                       help='re-test every URL, ignoring cached results (fresh results are still cached)')
+    parser.add_argument('--history', action='store_true',
+                       help='record this run in the history database (see the history command)')
+    parser.add_argument('--history-file', metavar='FILE',
+                       help='history database (default: ~/.cache/can-i-access/history.sqlite)')
     
     # Output options
     parser.add_argument('-o', '--output', metavar='FILE',
                        help='save results to file (JSON format)')
-    parser.add_argument('--format', choices=['json', 'csv', 'text'], default='text',
-                       help='output format (default: text)')
+    parser.add_argument('--format', choices=['json', 'jsonl', 'csv', 'text'], default='text',
+                       help='output format; jsonl and csv are written as results arrive '
+                       '(default: text)')
     parser.add_argument('--filter', choices=['all', 'blocked', 'accessible', 'warnings'],
                        default='all', help='filter results (default: all)')
 
@@ -430,7 +796,7 @@ def add_list_arguments(parser):
 def add_report_arguments(parser):
     """Add arguments for the report command"""
     parser.add_argument('input_file', metavar='RESULTS_FILE',
-                       help='JSON results file to generate report from')
+                       help='JSON or JSONL results file to generate report from')
     parser.add_argument('-o', '--output', metavar='FILE',
                        help='output file (default: stdout)')
     parser.add_argument('--format', choices=['html', 'text', 'csv'],
@@ -438,6 +804,31 @@ def add_report_arguments(parser):
     parser.add_argument('--filter', choices=['all', 'blocked', 'accessible', 'warnings'],
                        default='all', help='filter results in report')
 
+def add_history_arguments(parser):
+    """Add arguments for the history command"""
+    parser.add_argument('--history-file', metavar='FILE',
+                       help='history database (default: ~/.cache/can-i-access/history.sqlite)')
+    parser.add_argument('--days', type=float, metavar='N',
+                       help='only look at the last N days of runs')
+    queries = parser.add_subparsers(dest='history_action', metavar='QUERY')
+    
+    timeline = queries.add_parser('timeline', help='every recorded check of one URL')
+    timeline.add_argument('url', metavar='URL')
+    timeline.add_argument('--limit', type=int, metavar='N', help='show only the N most recent checks')
+    
+    flips = queries.add_parser('flips', help='when URLs became blocked or reachable again')
+    flips.add_argument('--host', metavar='HOST', help='only URLs on HOST')
+    flips.add_argument('--url', metavar='URL', help='only this URL')
+    
+    uptime = queries.add_parser('uptime', help='share of checks each host was reachable in')
+    uptime.add_argument('--host', metavar='HOST', help='only HOST')
+    
+    runs = queries.add_parser('runs', help='recently recorded runs')
+    runs.add_argument('--limit', type=int, default=20, metavar='N', help='number of runs (default: 20)')
+    
+    imports = queries.add_parser('import', help='record saved JSON/JSONL results files as past runs')
+    imports.add_argument('files', nargs='+', metavar='RESULTS_FILE')
+
 def show_manual():
     """Display the manual page"""
     manual = textwrap.dedent("""
@@ -466,6 +857,8 @@ def show_manual():
            test        Test URL accessibility (default command)
            list        List available data sources and formats
            report      Generate reports from saved results
+           history     Query results recorded across runs (timeline URL,
+                       flips, uptime, runs, import FILE...)
     
     INPUT SOURCES
            --csv FILE
@@ -477,32 +870,228 @@ def show_manual():
                   Test a single URL.
     
            --sheet URL
-                  Fetch URLs from a published Google Sheets CSV.
+                  Fetch URLs from a published Google Sheets CSV. Sheets are
+                  kept in the user cache directory and revalidated with
+                  ETag/Last-Modified, so an unchanged sheet is not downloaded
+                  again. If the sheet host cannot be reached, the last saved
+                  copy is used with a warning.
     
            --cyber1, --cyber2, --cyber3
                   Use predefined cybersecurity curriculum URLs.
     
            --all-cyber
-                  Test all predefined cybersecurity curriculum URLs.
+                  Test all predefined cybersecurity curriculum URLs. The
+                  sheets are fetched at the same time and testing starts as
+                  soon as the first one arrives.
     
     OPTIONS
            -t, --timeout SECONDS
                   Set request timeout in seconds (default: 10).
     
+           --adaptive-timeout
+                  Set deadlines from the latencies seen during the run
+                  instead of one fixed timeout. Opening a connection (TCP and
+                  TLS) must finish within the host's smoothed connect time
+                  plus four deviations, or three times the run's 95th
+                  percentile connect time for a new host, so sites that
+                  silently drop packets fail in seconds. The rest of the
+                  request gets at least --timeout, more for hosts (or runs)
+                  whose responses are slow. A timeout doubles the host's
+                  deadlines until it answers again. Both deadlines are saved
+                  with each result (timeout, connect_timeout). Connect
+                  deadlines apply to the async engine and pooled connections.
+    
+           --timeout-min SECONDS, --timeout-max SECONDS
+                  Bounds for adaptive deadlines (default: 2 and 30).
+    
            -j, --parallel N
-                  Run N parallel tests for faster processing (default: 1).
+                  Test N URLs concurrently (thread engine: default 1,
+                  maximum 100; async engine: default 500, maximum 10000).
+                  Results keep the input order; progress is printed as each
+                  check completes.
+    
+           --engine ENGINE
+                  Probe engine: thread (blocking requests on a pool of worker
+                  threads) or async (non-blocking sockets on one event loop,
+                  for audits with thousands of URLs in flight). With async,
+                  requests that go through a configured proxy are sent on
+                  helper threads, as with the thread engine.
+    
+           --rate N
+                  Start at most N checks per second across the run (default:
+                  0, no limit). Fractions are allowed, e.g. 0.5 for one check
+                  every two seconds.
+    
+           --host-rate N
+                  Start at most N checks per second on any one host (default:
+                  0, no limit).
+    
+           --host-concurrency N
+                  Run at most N checks on one host at the same time (default:
+                  6, 0 for no limit). While a host is at its limits, workers
+                  move on to URLs on other hosts instead of waiting, so a
+                  sheet dominated by one site stays polite without slowing
+                  the rest of the run.
+    
+           --pool-size N
+                  Keep up to N idle keep-alive connections (keyed by scheme,
+                  host and port) for reuse by later checks on the same host,
+                  skipping repeated TCP and TLS handshakes (default: 32).
+                  Use 0 to open a fresh connection for every request. Used by
+                  the thread engine; proxied URLs always use a fresh
+                  connection. With -v the summary shows the pool hit rate.
+    
+           --pool-per-host N
+                  Open at most N connections to one host at a time (default: 6).
+                  A check that finds no free connection within its timeout is
+                  reported as an error, not as a timeout of the site.
+    
+           --pool-idle SECONDS
+                  Close pooled connections that have been idle this long
+                  (default: 30).
+    
+           --dns-ttl SECONDS
+                  Cache resolved hostnames for this long during a run
+                  (default: 300). Failed lookups are cached for at most 60
+                  seconds.
+    
+           --no-dns-prefetch
+                  Skip the pre-resolution stage. By default every unique
+                  hostname is resolved concurrently before testing starts;
+                  URLs whose host does not resolve are reported as DNS
+                  failures without any HTTP attempt.
+    
+           --breaker-threshold N
+                  After N consecutive connection or TLS failures on one host,
+                  report its remaining URLs as Not Reachable without testing
+                  them (default: 3, 0 disables). Such results are marked as
+                  inferred in the summary, saved results and reports.
+    
+           --breaker-confirm
+                  Before inferring the rest of a host's URLs, test one more of
+                  them as a confirmation probe; if it connects, testing
+                  resumes normally.
     
            --no-https-upgrade
-                  Disable automatic HTTP to HTTPS upgrade attempts.
+                  Disable automatic HTTP to HTTPS upgrade attempts; http://
+                  URLs are tested over plain HTTP only.
+    
+           --depth LAYER
+                  How far each check goes. http (default) sends the request
+                  described under --probe. dns only resolves the host name;
+                  tcp also connects to the URL's port (443 or 80); tls also
+                  completes the TLS handshake, sending the host name (SNI)
+                  where most filters act, and verifying the certificate.
+                  http:// URLs have no TLS and stop at the TCP connection.
+                  Checks that succeed are reported as Reachable, with the
+                  layer in the method column, and run several times faster
+                  than full requests. YouTube video checks are skipped and
+                  proxied URLs are always tested with a full request. Cached
+                  results are kept separately for each depth.
+    
+           --probe MODE
+                  How each URL is requested. get (default) sends a normal GET.
+                  head sends a HEAD request and only falls back to GET when
+                  the server rejects HEAD (405 or 501); that GET asks for a
+                  single byte and reads at most 1 KB of body. Use head to
+                  keep the audit's bandwidth on the school uplink minimal.
+                  The bytes used per URL are saved with each result and
+                  totaled in the summary.
+    
+           --race-https
+                  For http:// URLs, send the HTTP request at the same time as
+                  the HTTPS attempt instead of after it fails. The HTTPS
+                  answer wins when it succeeds; otherwise the HTTP answer is
+                  used without waiting for a second round trip.
     
            --skip-youtube
-                  Skip YouTube video availability checks.
+                  Skip YouTube video availability checks; YouTube links are
+                  tested like any other page.
+    
+           --video-ttl SECONDS
+                  YouTube videos, shorts, live streams and playlists are
+                  checked once per run however many times they appear, all
+                  at the same time before page testing starts. Definitive
+                  answers (available, removed or private) are kept in the
+                  user cache directory and reused for this long (default:
+                  259200, three days; 0 disables). --refresh checks every
+                  video again.
+    
+           --journal FILE
+                  Append every completed result to FILE (one compact JSON
+                  line each) while the run is in progress, so the work
+                  survives Ctrl+C, sleep or a dropped connection.
+    
+           --resume JOURNAL
+                  Reload the results recorded in JOURNAL, test only the URLs
+                  not in it, and keep appending to it. A line cut short by a
+                  crash is discarded and that URL is tested again.
+    
+           --record FILE
+                  Save the raw outcome of every network operation the run
+                  makes (DNS lookups, connections, the status, headers and
+                  phase times of each response, or the exception raised) to
+                  FILE, one JSON line each. Answers from --cache and the
+                  persistent YouTube cache are not used while recording, so
+                  every URL's outcomes are saved.
+    
+           --replay FILE
+                  Run the checks again on the outcomes saved with --record,
+                  with no network at all: each operation gets the outcome
+                  it had when recorded, so only the classification, filters
+                  and output are redone. The recorded run's settings
+                  (timeout, depth, probe mode, HTTPS upgrades, YouTube
+                  checks) are used, checks run one at a time in input
+                  order, and results keep their recorded response times.
+                  A URL that was not part of the recording fails with "no
+                  recorded outcome". The cache and history are not used.
+    
+           --cache
+                  Keep results in a local sqlite database and reuse entries
+                  that are still fresh instead of re-testing those URLs.
+                  Cached results are counted in the summary and marked with
+                  "cached": true in saved results. Several runs on one
+                  machine can share the cache at the same time.
+    
+           --cache-file FILE
+                  Cache database location (default:
+                  ~/.cache/can-i-access/results.sqlite, or under
+                  $XDG_CACHE_HOME when set).
+    
+           --cache-profile NAME
+                  Network profile the results belong to, e.g. the lab or
+                  network the run is made from (default: default). Results
+                  are only reused within the same profile.
+    
+           --cache-ttl SECONDS
+                  How long successful and warning results are reused
+                  (default: 21600, six hours).
+    
+           --cache-failure-ttl SECONDS
+                  How long blocked, removed and errored results are reused
+                  (default: 1800). Use 0 to always re-test failures.
+    
+           --refresh
+                  Ignore cached results and test every URL; the fresh
+                  results still update the cache.
+    
+           --history
+                  Record every URL tested in this run in the history
+                  database, for the history command. Results taken from
+                  the cache or a resumed journal are not recorded again.
+    
+           --history-file FILE
+                  History database location (default:
+                  ~/.cache/can-i-access/history.sqlite).
     
            -o, --output FILE
                   Save results to file in JSON format for later analysis.
     
            --format FORMAT
-                  Output format: json, csv, or text (default: text).
+                  Output format: json, jsonl, csv, or text (default: text).
+                  jsonl and csv results are written to the output file as
+                  each check completes (in completion order), so the file
+                  can be followed with tail -f during long runs.
     
            --filter FILTER
                   Filter results: all, blocked, accessible, or warnings.
@@ -516,6 +1105,16 @@ def show_manual():
            --no-color
                   Disable colored output.
     
+           --profile FILE
+                  Run the command under cProfile and tracemalloc and write
+                  a report to FILE: wall-clock time spent in each stage
+                  (load, test, filter, save, render, close), peak traced
+                  memory with the largest allocations, and the hottest
+                  functions by cumulative and own time across all threads.
+                  Profiling slows the run down, so use it to find where
+                  time goes rather than to time runs. Attach the file to
+                  bug reports about slow runs.
+    
            --version
                   Show version information.
     
@@ -527,6 +1126,7 @@ def show_manual():
     
            text    Human-readable colored output with summaries
            json    Machine-readable JSON for automation
+           jsonl   One JSON result per line, written as results arrive
            csv     Comma-separated values for spreadsheet import
     
     EXIT STATUS
@@ -550,6 +1150,15 @@ def show_manual():
     
            Generate an HTML report from saved results:
                can-i-access report results.json --format html -o report.html
+           HTML reports of more than 2000 results show 500 rows per page.
+           Results saved with --format json or jsonl are read a few at a time,
+           so reports can be made from files of any size.
+    
+           Record each run, then see when a site started being blocked:
+               can-i-access --cyber1 --history
+               can-i-access history flips --host example.com
+               can-i-access history timeline https://example.com/lesson
+               can-i-access history --days 30 uptime
     
            Run parallel tests for faster processing:
                can-i-access --csv large-list.csv --parallel 5
@@ -563,6 +1172,11 @@ def show_manual():
            reporting z-index       Importance ranking (higher = more important)
            Student PII Needed      Privacy flag (TRUE/FALSE)
     
+           Comma, semicolon, tab and pipe delimiters are detected
+           automatically, and a file with only a URL column works too. Rows
+           are read as testing runs, so very large files start testing
+           immediately and are never held in memory as a whole.
+    
     SECURITY
            This tool only performs read-only network tests and does not attempt
            to bypass security measures. It respects robots.txt, follows redirects
@@ -0,0 +1,648 @@
+"""
+Asyncio probe engine - thousands of concurrent checks on a single thread
+
+Mirrors check_url_accessibility() on top of asyncio.open_connection() and a
+minimal HTTP/1.1 client, so a whole-district audit does not need one OS
+thread per in-flight request.
+"""
+
+import asyncio
+import itertools
+import queue
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlparse, urljoin
+
+from . import (
+    DEFAULT_TIMEOUT, MAX_REDIRECTS, HTTPS_UPGRADE_TIMEOUT, HEAD_REJECTED_CODES,
+    USER_AGENT, REQUEST_HEADERS,
+    get_default_session,
+    new_result, apply_http_status, apply_network_error, apply_video_check,
+    apply_inferred_block, apply_shallow_success, is_connection_failure, is_timeout, probe_depth,
+    merge_probe, apply_http_error,
+    DEPTH_METHODS,
+    classify_youtube_url, youtube_oembed_url, youtube_check_from_status, format_url_for_display,
+)
+from .engine import POLL_INTERVAL
+from .scheduler import lookahead
+from .results import add_phase_times
+from .session import ConnectTimeout, Response, mark_connected, redirect_loop_error, uses_proxy
+
+# Upper bound and default for -j/--parallel with the async engine
+MAX_ASYNC_PARALLEL = 10000
+DEFAULT_ASYNC_PARALLEL = 500
+
+# Largest status line or header block we are willing to read
+MAX_HEADER_LINES = 100
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+class ResponseError(OSError):
+    """The server sent something that is not an HTTP/1.x response"""
+
+_ssl_context = None
+
+def get_ssl_context():
+    """Shared client TLS context (verifies certificates like urlopen)"""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+async def _resolved(resolver, host, call, *args):
+    """
+    call(*args), a lookup of host: straight away when resolver has the
+    answer cached, otherwise on the default executor, since a cache miss is
+    a blocking getaddrinfo()
+    """
+    if resolver is not None and host and resolver.is_cached(host):
+        return call(*args)
+    return await asyncio.get_event_loop().run_in_executor(None, call, *args)
+
+async def _open_connection(host, port, tls, resolver):
+    """
+    Connect to host, using the run's DNS cache when there is one.
+    
+    The TLS handshake runs as its own step once TCP is connected, so the
+    two can be timed apart (Python 3.7+; before that loops cannot upgrade
+    a connection and the handshake counts into connect_time). Returns
+    (reader, writer, phase times).
+    """
+    loop = asyncio.get_event_loop()
+    if resolver is None:
+        # create_connection() looks the name up off the loop itself
+        addresses = [host]
+    else:
+        resolved = await _resolved(resolver, host, resolver.resolve, host, port)
+        addresses = [sockaddr[0] for _, sockaddr in resolved]
+    # Without start_tls() the handshake happens inside create_connection()
+    wrap = {}
+    if tls and not hasattr(loop, 'start_tls'):
+        wrap = {'ssl': get_ssl_context(), 'server_hostname': host}
+    started = time.perf_counter()
+    last_error = None
+    for address in addresses:
+        reader = asyncio.StreamReader()
+        protocol = asyncio.StreamReaderProtocol(reader)
+        try:
+            transport, _ = await loop.create_connection(lambda: protocol, address, port, **wrap)
+            break
+        except OSError as e:
+            last_error = e
+    else:
+        raise last_error or OSError(f"no addresses for {host}")
+    
+    connected = time.perf_counter()
+    timings = {'connect_time': connected - started}
+    if tls and not wrap:
+        try:
+            transport = await loop.start_tls(transport, protocol, get_ssl_context(), server_hostname=host)
+        except BaseException:
+            transport.abort()
+            raise
+        timings['tls_time'] = time.perf_counter() - connected
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop), timings
+
+async def _connect(host, port, tls, session, connect_timeout):
+    """_open_connection() within connect_timeout, timed for the adaptive timeouts"""
+    started = time.time()
+    connection = _open_connection(host, port, tls, session.resolver)
+    if connect_timeout is None:
+        opened = await connection
+    else:
+        try:
+            opened = await asyncio.wait_for(connection, connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectTimeout(f"no connection within {connect_timeout}s") from None
+    session.record_connect(host, time.time() - started)
+    return opened
+
+async def _request_once(url, method, headers, session, connect_timeout=None, progress=None):
+    # progress['connected'] is set once the connection is open, so the
+    # caller can tell what a timeout interrupted
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in ('http', 'https'):
+        raise ValueError(f"unsupported URL scheme: {parsed.scheme}")
+    
+    host = parsed.hostname
+    port = parsed.port or (443 if scheme == 'https' else 80)
+    reader, writer, timings = await _connect(host, port, scheme == 'https', session, connect_timeout)
+    if progress is not None:
+        progress['connected'] = True
+    
+    try:
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        host_header = parsed.netloc.rsplit('@', 1)[-1]
+        
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host_header}"]
+        for name, value in headers.items():
+            if name.lower() not in ('host', 'connection'):
+                lines.append(f"{name}: {value}")
+        lines.append("Connection: close")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode('ascii')
+        writer.write(request)
+        await writer.drain()
+        sent = time.perf_counter()
+        
+        raw_line = await reader.readline()
+        timings['first_byte_time'] = time.perf_counter() - sent
+        size = len(request) + len(raw_line)
+        status_line = raw_line.decode('iso-8859-1').rstrip('\r\n')
+        parts = status_line.split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+            raise ResponseError(f"Bad status line: {status_line!r}")
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+        
+        response_headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            raw_line = await reader.readline()
+            size += len(raw_line)
+            line = raw_line.decode('iso-8859-1').rstrip('\r\n')
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        
+        return Response(url, status, reason, response_headers, size, timings)
+    except OSError as e:
+        raise mark_connected(e)
+    finally:
+        # Only the status and headers matter; drop the connection without
+        # waiting for the body or a TLS close_notify
+        writer.transport.abort()
+
+async def fetch(url, method='GET', headers=None, timeout=DEFAULT_TIMEOUT, session=None, result=None,
+                connect_timeout=None):
+    """
+    Send one request and return its Response, following redirects.
+    
+    Unlike urlopen, 4xx/5xx statuses are returned rather than raised; a
+    redirect loop raises HTTPError like urlopen.
+    Timeouts surface as socket.timeout so results classify exactly like
+    the urlopen-based checks. Response bodies are never read; when result
+    is given, the bytes exchanged are added to result['bytes_transferred'].
+    Each connection must be set up within connect_timeout, when given.
+    URLs that go through a configured proxy are sent with urlopen on the
+    session's helper threads instead.
+    """
+    session = session or get_default_session()
+    if uses_proxy(url):
+        return await _fetch_proxied(url, method, headers, timeout, session, result)
+    if session.outcomes is None:
+        return await _fetch(url, method, headers, timeout, session, result, connect_timeout)
+    
+    # Recorded under the same operation as CheckSession.request, so a
+    # run recorded with either engine can be replayed
+    key = f"{method} {url}"
+    started = time.perf_counter()
+    try:
+        response = await _fetch(url, method, headers, timeout, session, result, connect_timeout)
+    except Exception as e:
+        session.outcomes.record_error('request', key, time.perf_counter() - started, e)
+        raise
+    session.outcomes.record('request', key, time.perf_counter() - started, response)
+    return response
+
+async def _fetch_proxied(url, method, headers, timeout, session, result):
+    # Only urlopen speaks to proxies, so the request runs on the session's
+    # helper threads, as it would with the thread engine
+    headers = headers or {'User-Agent': USER_AGENT}
+    request = session.submit(session.request, method, url, headers, timeout, None, result)
+    try:
+        return await asyncio.wrap_future(request)
+    except HTTPError as e:
+        if e.code < 400:
+            raise  # a redirect loop
+        return Response(e.url, e.code, e.reason, e.headers, getattr(e, 'size', 0),
+                        getattr(e, 'timings', None))
+
+async def _fetch(url, method, headers, timeout, session, result, connect_timeout):
+    headers = headers or {'User-Agent': USER_AGENT}
+    size = 0
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            started = time.time()
+            progress = {}
+            try:
+                response = await asyncio.wait_for(
+                    _request_once(url, method, headers, session, connect_timeout, progress), timeout)
+            except ConnectTimeout:
+                raise
+            except asyncio.TimeoutError:
+                error = socket.timeout('timed out')
+                if progress:
+                    mark_connected(error)
+                raise error
+            session.record_response(url, time.time() - started)
+            size += response.size
+            if result is not None:
+                add_phase_times(result, response.timings)
+        
+            location = response.headers.get('location')
+            if response.status not in REDIRECT_CODES or not location:
+                break
+            next_url = urljoin(url, location)
+            if urlparse(next_url).scheme.lower() not in ('http', 'https'):
+                break
+            url = next_url
+            if response.status == 303:
+                method = 'GET'
+        else:
+            response.size = size
+            raise redirect_loop_error(response)
+        
+        response.size = size
+        return response
+    finally:
+        if result is not None:
+            result['bytes_transferred'] += size
+
+async def send_probe_async(url, timeout, session, result=None, connect_timeout=None):
+    """Async counterpart of send_probe(); bodies are never read"""
+    if session.probe_mode != 'head':
+        return await fetch(url, headers=REQUEST_HEADERS, timeout=timeout, session=session, result=result,
+                           connect_timeout=connect_timeout)
+    
+    response = await fetch(url, 'HEAD', REQUEST_HEADERS, timeout, session, result, connect_timeout)
+    if response.status not in HEAD_REJECTED_CODES:
+        return response
+    
+    range_headers = dict(REQUEST_HEADERS, Range='bytes=0-0')
+    response = await fetch(url, headers=range_headers, timeout=timeout, session=session, result=result,
+                           connect_timeout=connect_timeout)
+    if response.status != 416:
+        return response
+    return await fetch(url, headers=REQUEST_HEADERS, timeout=timeout, session=session, result=result,
+                       connect_timeout=connect_timeout)
+
+async def shallow_probe_async(url, depth, timeout, session, connect_timeout=None, result=None):
+    """Async counterpart of shallow_probe()"""
+    parsed = urlparse(url)
+    host = parsed.hostname
+    if depth == 'dns':
+        await _resolved(session.resolver, host, session.lookup, host)
+        return host, None
+    
+    port = parsed.port or (443 if parsed.scheme.lower() == 'https' else 80)
+    started = time.perf_counter()
+    try:
+        timings = await _handshake(host, port, depth == 'tls', timeout, session, connect_timeout)
+    except Exception as e:
+        if session.outcomes is not None:
+            session.outcomes.record_error('connect', f"{host} {port} {depth}", time.perf_counter() - started, e)
+        raise
+    if session.outcomes is not None:
+        session.outcomes.record('connect', f"{host} {port} {depth}", time.perf_counter() - started, timings)
+    if result is not None:
+        add_phase_times(result, timings)
+    return host, port
+
+async def _handshake(host, port, tls, timeout, session, connect_timeout):
+    try:
+        _, writer, timings = await asyncio.wait_for(
+            _connect(host, port, tls, session, connect_timeout), timeout)
+    except ConnectTimeout:
+        raise
+    except asyncio.TimeoutError:
+        raise socket.timeout('timed out')
+    writer.transport.abort()
+    return timings
+
+async def check_youtube_video_async(video_id, timeout=10, session=None, kind='video'):
+    """Async counterpart of check_youtube_video()"""
+    if not video_id:
+        return {"available": False, "reason": "Invalid video ID", "definitive": False}
+    
+    try:
+        response = await fetch(youtube_oembed_url(video_id, kind), timeout=timeout, session=session)
+    except (OSError, ValueError) as e:
+        return {"available": False, "reason": f"Network error: {str(e)}", "definitive": False}
+    return youtube_check_from_status(response.status, kind)
+
+def _discard_outcome(task):
+    """Retrieve a losing race task's outcome so asyncio does not log it"""
+    if not task.cancelled():
+        task.exception()
+
+async def request_https_variant_async(url, timeout, session, result=None, connect_timeout=None):
+    """Async counterpart of request_https_variant()"""
+    https_url = url.replace('http://', 'https://', 1)
+    try:
+        response = await send_probe_async(https_url, min(timeout, HTTPS_UPGRADE_TIMEOUT), session, result,
+                                          connect_timeout)
+        if response.status < 400:
+            return response
+    except Exception:
+        pass
+    return None
+
+async def check_url_accessibility_async(url, timeout=DEFAULT_TIMEOUT, verbose=False, session=None):
+    """
+    Check if a URL is accessible from the current network.
+    
+    Same checks and the same result dictionary as check_url_accessibility(),
+    using non-blocking sockets.
+    """
+    result = new_result(url)
+    session = session or get_default_session()
+    start_time = time.time()
+    method = 'HTTP Request'
+    
+    try:
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc:
+            result['message'] = "Invalid URL format"
+            return result
+        depth = probe_depth(url, session)
+        method = DEPTH_METHODS.get(depth, method)
+        
+        # Hosts that failed the DNS pre-resolution stage fail here, before
+        # any HTTP attempt
+        dns_time = None
+        if session.resolver is not None:
+            dns_time = await _resolved(session.resolver, parsed.hostname, session.resolve, url)
+        if dns_time is not None:
+            result['dns_time'] = dns_time
+        
+        # Hosts that keep failing to connect are not tested again
+        if session.circuit_open(url):
+            return apply_inferred_block(result, session.circuit_failures(parsed.hostname))
+        
+        timeout, connect_timeout = session.deadlines(url, timeout)
+        result['timeout'] = timeout
+        if connect_timeout is not None:
+            result['connect_timeout'] = connect_timeout
+        
+        youtube = classify_youtube_url(url)
+        if youtube:
+            result['is_youtube'] = True
+            
+            if session.check_videos:
+                kind, video_id = youtube
+                if verbose:
+                    print(f"  → Checking YouTube {kind} availability: {video_id}")
+                
+                if session.videos is not None:
+                    # Shared with the run's other checks of the same video;
+                    # only one not checked before the run needs a thread
+                    youtube_check = session.videos.cached(kind, video_id)
+                    if youtube_check is None:
+                        youtube_check = await asyncio.wrap_future(
+                            session.submit(session.check_video, kind, video_id, timeout))
+                else:
+                    youtube_check = await check_youtube_video_async(video_id, timeout, session, kind)
+                if apply_video_check(result, youtube_check):
+                    result['response_time'] = time.time() - start_time
+                    return result
+        
+        if depth != 'http':
+            result['is_http_only'] = url.lower().startswith('http://')
+            host, port = await shallow_probe_async(url, depth, timeout, session, connect_timeout, result)
+            result['response_time'] = time.time() - start_time
+            apply_shallow_success(result, depth, host, port)
+            session.record_outcome(url, False)
+            return result
+        
+        response = None
+        if url.lower().startswith('http://'):
+            result['is_http_only'] = True
+            if session.https_upgrade:
+                if verbose:
+                    print(f"  → Attempting HTTPS upgrade for {url}")
+                http_task = None
+                if session.race_https:
+                    # As in check_url_accessibility, the raced request counts
+                    # into a scratch record merged only when it is used
+                    http_probe = {'bytes_transferred': 0}
+                    http_task = asyncio.ensure_future(
+                        send_probe_async(url, timeout, session, http_probe, connect_timeout))
+                
+                upgraded_response = await request_https_variant_async(url, timeout, session, result,
+                                                                      connect_timeout)
+                if upgraded_response is not None:
+                    if http_task is not None:
+                        http_task.cancel()
+                        http_task.add_done_callback(_discard_outcome)
+                    response = upgraded_response
+                    url = url.replace('http://', 'https://', 1)
+                    result['is_http_only'] = False
+                    result['https_upgraded'] = True
+                    result['final_url'] = url
+                    if verbose:
+                        print(f"  ✓ HTTPS upgrade successful: {url}")
+                else:
+                    if verbose:
+                        print(f"  ⚠ HTTPS upgrade failed, using HTTP")
+                    if http_task is not None:
+                        try:
+                            response = await http_task
+                        finally:
+                            merge_probe(result, http_probe)
+        
+        if response is None:
+            if verbose:
+                print(f"  → Testing connectivity to {format_url_for_display(url)}")
+            response = await send_probe_async(url, timeout, session, result, connect_timeout)
+        
+        result['response_time'] = time.time() - start_time
+        apply_http_status(result, response.status, response.reason)
+        session.record_outcome(url, False)
+    
+    except HTTPError as e:
+        result['response_time'] = time.time() - start_time
+        apply_http_error(result, e)
+        session.record_outcome(url, False)
+    
+    except OSError as e:
+        result['response_time'] = time.time() - start_time
+        apply_network_error(result, e, timeout, method)
+        session.record_outcome(url, is_connection_failure(e))
+        if is_timeout(e):
+            session.record_timeout(url)
+    
+    except Exception as e:
+        result['response_time'] = time.time() - start_time
+        result['status'] = 'Error'
+        result['message'] = f"Unexpected error: {str(e)}"
+        result['method'] = 'HTTP Request'
+    
+    return result
+
+def raise_open_file_limit(wanted):
+    """Raise the soft open-file limit towards wanted where the OS allows it"""
+    try:
+        import resource
+    except ImportError:
+        return  # Windows: the proactor event loop has no select() limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY:
+        wanted = min(wanted, hard)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+        except (ValueError, OSError):
+            pass
+
+class _Feeder:
+    """
+    Takes (index, item) pairs from items off the event loop.
+    
+    Items from a generator can cost blocking work to produce (CSV parsing,
+    journal and cache lookups, background submits), so they are pulled on
+    a thread of its own and no check in flight waits for them. Lists and
+    tuples are read directly.
+    """
+    
+    def __init__(self, items):
+        self._source = enumerate(items)
+        self._executor = None
+        if not isinstance(items, (list, tuple)):
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='can-i-access-feeder')
+    
+    async def take(self, count):
+        """Up to count more pairs; fewer once items run out"""
+        batch = itertools.islice(self._source, count)
+        if self._executor is None or count <= 0:
+            return list(batch)
+        return await asyncio.get_event_loop().run_in_executor(self._executor, list, batch)
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+async def _dispatch(items, check, concurrency, emit, scheduler=None, key=None):
+    if scheduler is not None and scheduler.limited:
+        await _dispatch_scheduled(items, check, concurrency, emit, scheduler, key)
+        return
+    feeder = _Feeder(items)
+    tasks = {}
+    
+    async def start(count):
+        for index, item in await feeder.take(count):
+            tasks[asyncio.ensure_future(check(item))] = (index, item)
+    
+    try:
+        await start(concurrency)
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, item = tasks.pop(task)
+                emit((index, item, task.result()))
+            await start(len(done))
+    finally:
+        feeder.close()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _dispatch_scheduled(items, check, concurrency, emit, scheduler, key):
+    # Like engine.iter_scheduled(): the first waiting item whose host may
+    # start is started whenever a slot is free
+    feeder = _Feeder(items)
+    waiting = deque()
+    window = lookahead(concurrency)
+    tasks = {}
+    exhausted = False
+    
+    async def run(item, host):
+        try:
+            return await check(item)
+        finally:
+            scheduler.finish(host)
+    
+    try:
+        while True:
+            if not exhausted and len(waiting) < window:
+                for index, item in await feeder.take(window - len(waiting)):
+                    waiting.append((index, item, key(item)))
+                exhausted = len(waiting) < window
+            
+            timeout = None
+            while waiting and len(tasks) < concurrency:
+                position, timeout = scheduler.start_next(host for _, _, host in waiting)
+                if position is None:
+                    break
+                index, item, host = waiting[position]
+                del waiting[position]
+                tasks[asyncio.ensure_future(run(item, host))] = (index, item)
+            else:
+                timeout = None
+            
+            if not tasks:
+                if not waiting:
+                    return
+                await asyncio.sleep(timeout if timeout is not None else POLL_INTERVAL)
+                continue
+            
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, item = tasks.pop(task)
+                emit((index, item, task.result()))
+    finally:
+        feeder.close()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+_DONE = object()
+
+def iter_checks_async(items, check, concurrency=DEFAULT_ASYNC_PARALLEL, scheduler=None, key=None):
+    """
+    Run the coroutine function check(item) for every item on one event loop.
+    
+    Behaves like engine.iter_checks(): at most ``concurrency`` checks are in
+    flight, and (index, item, result) tuples are yielded in completion
+    order, and a Scheduler holds back hosts the same way. The loop runs on
+    a background thread so the caller can keep using ordinary blocking code
+    and still get Ctrl+C promptly.
+    """
+    concurrency = max(1, concurrency)
+    raise_open_file_limit(concurrency + 64)
+    
+    completed = queue.Queue()
+    loop = asyncio.new_event_loop()
+    main_task = loop.create_task(_dispatch(items, check, concurrency, completed.put, scheduler, key))
+    
+    def run():
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(main_task)
+        except asyncio.CancelledError:
+            pass
+        except BaseException as e:
+            completed.put(e)
+        finally:
+            completed.put(_DONE)
+            loop.close()
+    
+    thread = threading.Thread(target=run, name='can-i-access-async', daemon=True)
+    thread.start()
+    
+    try:
+        while True:
+            try:
+                entry = completed.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if entry is _DONE:
+                break
+            if isinstance(entry, BaseException):
+                raise entry
+            yield entry
+    finally:
+        if thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(main_task.cancel)
+            except RuntimeError:
+                pass  # loop finished and closed in the meantime
@@ -0,0 +1,69 @@
+"""
+Host circuit breaker - stop paying the full timeout for blocked domains
+"""
+
+import threading
+
+DEFAULT_BREAKER_THRESHOLD = 3
+
+# Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+CONFIRMING = 'confirming'
+CONFIRMED = 'confirmed'
+
+class HostCircuitBreaker:
+    """
+    Track consecutive connect/TLS failures per host.
+    
+    After ``threshold`` consecutive failures the host's circuit opens and
+    the remaining URLs on it are not tested. With ``confirm`` enabled, the
+    first URL after the circuit opens is still tested as a single
+    confirmation probe: success closes the circuit again, failure keeps it
+    open for the rest of the run.
+    """
+    
+    def __init__(self, threshold=DEFAULT_BREAKER_THRESHOLD, confirm=False):
+        self.threshold = threshold
+        self.confirm = confirm
+        self.inferred = 0
+        self._failures = {}
+        self._state = {}
+        self._lock = threading.Lock()
+    
+    def allow(self, host):
+        """Return True if a URL on host should be tested for real"""
+        with self._lock:
+            state = self._state.get(host, CLOSED)
+            if state == CLOSED:
+                return True
+            if state == OPEN and self.confirm:
+                self._state[host] = CONFIRMING
+                return True
+            self.inferred += 1
+            return False
+    
+    def failures(self, host):
+        """Consecutive connection failures recorded for host"""
+        with self._lock:
+            return self._failures.get(host, 0)
+    
+    def record(self, host, connection_failed):
+        """Record the outcome of a real check against host"""
+        with self._lock:
+            if not connection_failed:
+                self._failures[host] = 0
+                self._state[host] = CLOSED
+                return
+            
+            self._failures[host] = self._failures.get(host, 0) + 1
+            state = self._state.get(host, CLOSED)
+            if state == CONFIRMING:
+                self._state[host] = CONFIRMED
+            elif state == CLOSED and self._failures[host] >= self.threshold:
+                self._state[host] = OPEN
+    
+    def open_hosts(self):
+        """Hosts whose circuit is currently open"""
+        with self._lock:
+            return sorted(h for h, state in self._state.items() if state != CLOSED)
@@ -0,0 +1,139 @@
+"""
+Result cache - skip URLs verified recently on the same network
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, urlunparse
+
+from . import new_result
+
+DEFAULT_SUCCESS_TTL = 6 * 3600
+DEFAULT_FAILURE_TTL = 30 * 60
+DEFAULT_CACHE_PROFILE = 'default'
+
+# Statuses cached with the (shorter) failure TTL
+FAILURE_STATUSES = ('Not Reachable', 'Error', 'Video Removed')
+
+# Fields that come from the URL list rather than the check itself
+METADATA_FIELDS = ('site_name', 'unit', 'importance', 'pii_required', 'source', 'cached')
+
+# Pending results are written in one transaction once this many accumulate
+FLUSH_EVERY = 50
+
+# How long to wait for another run holding the database lock
+LOCK_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    profile TEXT NOT NULL,
+    url TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (profile, url)
+)
+"""
+
+def cache_dir():
+    """Per-user cache directory (under $XDG_CACHE_HOME or ~/.cache)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'can-i-access')
+
+def default_cache_path():
+    """Per-user cache database location"""
+    return os.path.join(cache_dir(), 'results.sqlite')
+
+def normalize_url(url):
+    """Canonical form of a URL for cache keys (case, default port, fragment)"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if ':' in host:
+        host = f"[{host}]"
+    port = parsed.port
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, parsed.query, ''))
+
+class ResultCache:
+    """
+    sqlite-backed store of past check results.
+    
+    Entries are keyed by (profile, normalized URL) and expire after
+    success_ttl, or failure_ttl for blocked and errored URLs. The database
+    runs in WAL mode and every write is one short transaction, so several
+    runs on one machine can share the file. Lookups may come from any
+    thread; results are stored from the thread that collects them.
+    """
+    
+    def __init__(self, path=None, profile=DEFAULT_CACHE_PROFILE,
+                 success_ttl=DEFAULT_SUCCESS_TTL, failure_ttl=DEFAULT_FAILURE_TTL):
+        self.path = path or default_cache_path()
+        self.profile = profile
+        self.success_ttl = success_ttl
+        self.failure_ttl = failure_ttl
+        self.hits = 0
+        self.stored = 0
+        self._pending = []
+        
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(SCHEMA)
+    
+    def get(self, url):
+        """Return the cached result for url, or None without a fresh entry"""
+        query = 'SELECT result FROM results WHERE profile = ? AND url = ? AND expires_at > ?'
+        with self._lock:
+            row = self._db.execute(query, (self.profile, normalize_url(url), time.time())).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+        
+        result = new_result(url)
+        result.update(json.loads(row[0]))
+        # Nothing was sent for this URL in the current run
+        result.update(url=url, cached=True, bytes_transferred=0)
+        return result
+    
+    def store(self, url, result):
+        """Queue a fresh result for writing"""
+        ttl = self.failure_ttl if result['status'] in FAILURE_STATUSES else self.success_ttl
+        if ttl <= 0:
+            return
+        data = {k: v for k, v in result.items() if k not in METADATA_FIELDS}
+        now = time.time()
+        self._pending.append((self.profile, normalize_url(url), now, now + ttl, json.dumps(data)))
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+    
+    def flush(self):
+        """Write queued results in a single transaction"""
+        if not self._pending:
+            return
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)', self._pending)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        self.stored += len(self._pending)
+        self._pending = []
+    
+    def close(self):
+        """Flush queued results, drop expired entries and close the database"""
+        try:
+            self.flush()
+            with self._lock:
+                self._db.execute('DELETE FROM results WHERE expires_at <= ?', (time.time(),))
+        finally:
+            self._db.close()
@@ -0,0 +1,137 @@
+"""
+History command implementation - trends across recorded runs
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from itertools import chain
+from .. import Colors, eprint, format_url_for_display
+from ..history import HistoryStore, default_history_path
+from ..resultfile import ResultFile, ResultFileError
+from .test import get_status_color
+
+def run_history_command(args):
+    """Execute the history command"""
+    if not args.history_action:
+        eprint(f"{Colors.RED}✗ Choose a history query: timeline, flips, uptime, runs or import{Colors.END}")
+        sys.exit(2)
+    
+    if args.history_action != 'import' and not os.path.exists(args.history_file or default_history_path()):
+        eprint(f"{Colors.RED}✗ No history recorded yet - run tests with --history first{Colors.END}")
+        sys.exit(2)
+    
+    try:
+        store = HistoryStore(args.history_file)
+    except (OSError, sqlite3.Error) as e:
+        eprint(f"{Colors.RED}✗ Cannot open history database: {e}{Colors.END}")
+        sys.exit(2)
+    
+    since = time.time() - args.days * 86400 if args.days else 0
+    try:
+        if args.history_action == 'timeline':
+            show_timeline(store, args.url, since, args.limit)
+        elif args.history_action == 'flips':
+            show_flips(store, since, args.host, args.url)
+        elif args.history_action == 'uptime':
+            show_uptime(store, since, args.host)
+        elif args.history_action == 'runs':
+            show_runs(store, args.limit)
+        else:
+            import_files(store, args.files)
+    finally:
+        store.close()
+
+def format_time(timestamp):
+    """Local date and time of a run"""
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+def show_timeline(store, url, since, limit):
+    """Print every recorded check of one URL, newest first"""
+    rows = store.timeline(url, since, limit)
+    if not rows:
+        print(f"{Colors.YELLOW}No history for {url}{Colors.END}")
+        return
+    
+    print(f"{Colors.BOLD}History for {url}{Colors.END} ({len(rows)} checks)")
+    for checked_at, status, http_status, response_time, inferred, source in rows:
+        status_color = get_status_color(status)
+        details = [http_status or 'N/A']
+        if response_time:
+            details.append(f"{response_time:.2f}s")
+        if inferred:
+            details.append("inferred")
+        if source:
+            details.append(source)
+        print(f"  {format_time(checked_at)}  {status_color}{status}{Colors.END}  ({', '.join(details)})")
+
+def show_flips(store, since, host, url):
+    """Print each time a URL went from reachable to blocked or back"""
+    rows = store.flips(since, host, url)
+    if not rows:
+        print(f"{Colors.GREEN}No status changes recorded{Colors.END}")
+        return
+    
+    print(f"{Colors.BOLD}Status changes{Colors.END} ({len(rows)})")
+    for checked_at, flipped_url, previous_status, status, up in rows:
+        marker = f"{Colors.GREEN}▲" if up else f"{Colors.RED}▼"
+        print(f"  {format_time(checked_at)}  {marker}{Colors.END} {format_url_for_display(flipped_url, 60)}")
+        print(f"      {previous_status} → {get_status_color(status)}{status}{Colors.END}")
+
+def show_uptime(store, since, host):
+    """Print the share of checks each host was reachable in"""
+    rows = store.uptime(since, host)
+    if not rows:
+        print(f"{Colors.YELLOW}No history recorded{Colors.END}")
+        return
+    
+    print(f"{Colors.BOLD}Uptime by host{Colors.END} (least available first)")
+    for host_name, checks, up, last_checked in rows:
+        share = up / checks * 100
+        if share == 100:
+            color = Colors.GREEN
+        elif share >= 50:
+            color = Colors.YELLOW
+        else:
+            color = Colors.RED
+        print(f"  {color}{share:5.1f}%{Colors.END}  {host_name}  "
+              f"({up}/{checks} checks, last {format_time(last_checked)})")
+
+def show_runs(store, limit):
+    """Print the most recent recorded runs"""
+    rows = store.runs(limit or 20)
+    if not rows:
+        print(f"{Colors.YELLOW}No runs recorded{Colors.END}")
+        return
+    
+    print(f"{Colors.BOLD}Recorded runs{Colors.END} (newest first)")
+    for run_id, started_at, source, total in rows:
+        print(f"  #{run_id:<5} {format_time(started_at)}  {total:6d} URLs  {source}")
+
+def import_files(store, files):
+    """Record saved results files as past runs"""
+    for path in files:
+        try:
+            source = ResultFile(path)
+            results = iter(source)
+            first = next(results, None)
+        except FileNotFoundError:
+            eprint(f"{Colors.RED}✗ Results file not found: {path}{Colors.END}")
+            continue
+        except ResultFileError as e:
+            eprint(f"{Colors.RED}✗ Invalid JSON in results file {path}: {e}{Colors.END}")
+            continue
+        
+        # Saved JSON gives the run time before the results; JSONL has none
+        started_at = source.timestamp if source.timestamp is not None else os.path.getmtime(path)
+        store.start_run(os.path.basename(path), started_at)
+        count = 0
+        try:
+            for result in chain([first] if first is not None else [], results):
+                store.record(result)
+                count += 1
+        except ResultFileError as e:
+            eprint(f"{Colors.YELLOW}⚠ {path}: stopped after {count} results: {e}{Colors.END}")
+        store.finish_run()
+        print(f"{Colors.GREEN}✓ Imported {count} results from {path} ({format_time(started_at)}){Colors.END}")
@@ -51,6 +51,7 @@ def list_output_formats():
     formats = [
         ('text', 'Human-readable colored output (default)', 'Terminal display, progress updates'),
         ('json', 'Machine-readable JSON format', 'Automation, further processing'),
+        ('jsonl', 'One JSON result per line, written as results arrive', 'Live monitoring, very large lists'),
         ('csv', 'Comma-separated values', 'Spreadsheet import, data analysis'),
         ('html', 'HTML report (via report command)', 'Web viewing, professional reports')
     ]
@@ -7,86 +7,125 @@ import json
 import csv
 import time
 from datetime import datetime
+from html import escape
 from .. import Colors, eprint
+from ..results import ResultStore, matches_filter, status_category, ACCESSIBLE, WARNING, PHASE_LABELS
+from ..resultfile import ResultFile, ResultFileError
+from ..profiling import stage
+
+# Larger HTML reports embed their rows as data and show them a page at a time
+PAGED_REPORT_ROWS = 2000
+PAGE_SIZE = 500
+
+# Optional HTML report columns (result key, heading), in table order
+OPTIONAL_COLUMNS = [
+    ('site_name', 'Site'),
+    ('unit', 'Unit'),
+    ('importance', 'Priority'),
+    ('pii_required', 'PII'),
+]
+
+# CSS classes for status categories in HTML reports
+STATUS_CLASSES = ['accessible', 'warning', 'blocked']
 
 def run_report_command(args):
     """Execute the report command"""
-    # Load results from file
+    stage('load')
+    
+    # First pass over the results file: totals and the fields present.
+    # Results are read a few at a time and not kept, so the file can be
+    # any size.
     try:
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if isinstance(data, dict) and 'results' in data:
-                results = data['results']
-                timestamp = data.get('timestamp', time.time())
-            else:
-                results = data
-                timestamp = time.time()
+        source = ResultFile(args.input_file)
+        summary = ReportSummary()
+        for result in source:
+            if matches_filter(result, args.filter):
+                summary.add(result)
     except FileNotFoundError:
         eprint(f"{Colors.RED}✗ Results file not found: {args.input_file}{Colors.END}")
         sys.exit(2)
-    except json.JSONDecodeError as e:
+    except ResultFileError as e:
         eprint(f"{Colors.RED}✗ Invalid JSON in results file: {e}{Colors.END}")
         sys.exit(2)
     except Exception as e:
         eprint(f"{Colors.RED}✗ Error reading results file: {e}{Colors.END}")
         sys.exit(2)
     
-    # Filter results if requested
-    if args.filter != 'all':
-        results = filter_results(results, args.filter)
+    timestamp = source.timestamp if source.timestamp is not None else time.time()
     
-    # Generate report
-    if args.format == 'html':
-        report = generate_html_report(results, timestamp)
-    elif args.format == 'csv':
-        report = generate_csv_report(results)
-    else:  # text
-        report = generate_text_report(results, timestamp)
-    
-    # Output report
+    # Second pass: filtered rows go straight into the report
+    stage('render')
+    rows = (result for result in source if matches_filter(result, args.filter))
     if args.output:
         try:
             with open(args.output, 'w', encoding='utf-8') as f:
-                f.write(report)
+                write_report(f, summary, rows, timestamp, args.format)
             print(f"{Colors.GREEN}✓ Report saved to {args.output}{Colors.END}")
         except Exception as e:
             eprint(f"{Colors.RED}✗ Error saving report: {e}{Colors.END}")
             sys.exit(2)
     else:
-        print(report)
+        write_report(sys.stdout, summary, rows, timestamp, args.format)
+        print()
 
-def filter_results(results, filter_type):
-    """Filter results based on type"""
-    if filter_type == 'blocked':
-        return [r for r in results if r['status'] in ['Not Reachable', 'Video Removed']]
-    elif filter_type == 'accessible':
-        return [r for r in results if 'Accessible' in r['status'] or r['status'] == 'Reachable']
-    elif filter_type == 'warnings':
-        return [r for r in results if 'Warning' in r['status'] or 'HTTP' in r['status']]
-    else:
-        return results
+class ReportSummary:
+    """Totals and field names of the results going into a report"""
+    
+    def __init__(self):
+        self.stats = ResultStore(keep_rows=False)
+        self.fields = {}    # every field seen, in first-seen order
+        self.present = set()    # optional columns with a value in some result
+    
+    def add(self, result):
+        self.stats.append(result)
+        self.fields.update(dict.fromkeys(result))
+        if len(self.present) < len(OPTIONAL_COLUMNS):
+            for key, _ in OPTIONAL_COLUMNS:
+                if key not in self.present and result.get(key):
+                    self.present.add(key)
+
+def write_report(out, summary, rows, timestamp, format_type):
+    """Write a report of rows in the given format to the open file out"""
+    if format_type == 'html':
+        write_html_report(out, summary, rows, timestamp)
+    elif format_type == 'csv':
+        write_csv_report(out, summary, rows)
+    else:  # text
+        write_text_report(out, summary, rows, timestamp)
 
-def generate_html_report(results, timestamp):
-    """Generate HTML report"""
+def write_html_report(out, summary, rows, timestamp):
+    """
+    Write an HTML report to the open file ``out``.
+    
+    Rows are written as they are formatted rather than built into one
+    string. Reports with more than PAGED_REPORT_ROWS rows embed their rows
+    as compact JSON and page through them in the browser, so the page
+    stays light however many results there are.
+    """
     report_time = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
     
-    # Calculate statistics
+    results = summary.stats
     total = len(results)
     if total == 0:
-        return "<html><body><h1>No results to report</h1></body></html>"
+        out.write("<html><body><h1>No results to report</h1></body></html>")
+        return
     
-    accessible = sum(1 for r in results if 'Accessible' in r['status'] or r['status'] == 'Reachable')
-    warnings = sum(1 for r in results if 'Warning' in r['status'])
-    blocked = sum(1 for r in results if r['status'] in ['Not Reachable', 'Video Removed'])
-    errors = sum(1 for r in results if r['status'] == 'Error')
+    accessible = results.accessible
+    warnings = results.warnings
+    blocked = results.blocked
     
-    # Count PII-required resources if available
-    pii_count = sum(1 for r in results if r.get('pii_required', False))
+    # PII-required and high-priority resources, if the data has them
+    pii_count = results.pii_required
+    high_priority = results.high_priority
     
-    # Count by importance if available
-    high_priority = sum(1 for r in results if r.get('importance', 0) > 50)
+    # Results inferred by the host circuit breaker rather than measured
+    inferred = results.inferred
     
-    html = f"""<!DOCTYPE html>
+    # Optional columns are shown when any result has a value for them
+    columns = [column for column in OPTIONAL_COLUMNS if column[0] in summary.present]
+    paged = total > PAGED_REPORT_ROWS
+    
+    out.write(f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -160,10 +199,14 @@ def generate_html_report(results, timestamp):
         .status.blocked {{ background: #f8d7da; color: #721c24; }}
         .url-cell {{ font-family: monospace; word-break: break-all; max-width: 300px; }}
         .pii-indicator {{ color: #dc3545; font-weight: bold; }}
+        .inferred {{ color: #666; font-size: 0.8em; font-style: italic; }}
         .importance {{ font-weight: bold; }}
         .importance.high {{ color: #dc3545; }}
         .importance.medium {{ color: #ffc107; }}
         .importance.low {{ color: #28a745; }}
+        .pager {{ margin: 15px 0; text-align: center; }}
+        .pager button {{ padding: 6px 14px; margin: 0 8px; }}
+        .timing {{ margin-bottom: 30px; }}
     </style>
 </head>
 <body>
@@ -180,135 +223,260 @@ def generate_html_report(results, timestamp):
         <div class="summary-card success">
             <h3>Accessible</h3>
             <div class="number">{accessible}</div>
-            <small>{(accessible/total*100):.1f}%</small>
+            <small>{results.percent(accessible):.1f}%</small>
         </div>
         <div class="summary-card warning">
             <h3>Warnings</h3>
             <div class="number">{warnings}</div>
-            <small>{(warnings/total*100):.1f}%</small>
+            <small>{results.percent(warnings):.1f}%</small>
         </div>
         <div class="summary-card danger">
             <h3>Blocked</h3>
             <div class="number">{blocked}</div>
-            <small>{(blocked/total*100):.1f}%</small>
-        </div>"""
+            <small>{results.percent(blocked):.1f}%</small>
+        </div>""")
     
     if pii_count > 0:
-        html += f"""
+        out.write(f"""
         <div class="summary-card info">
             <h3>PII Required</h3>
             <div class="number">{pii_count}</div>
-            <small>{(pii_count/total*100):.1f}%</small>
-        </div>"""
+            <small>{results.percent(pii_count):.1f}%</small>
+        </div>""")
     
     if high_priority > 0:
-        html += f"""
+        out.write(f"""
         <div class="summary-card warning">
             <h3>High Priority</h3>
             <div class="number">{high_priority}</div>
-            <small>{(high_priority/total*100):.1f}%</small>
-        </div>"""
+            <small>{results.percent(high_priority):.1f}%</small>
+        </div>""")
     
-    html += """
-    </div>
+    if inferred > 0:
+        out.write(f"""
+        <div class="summary-card danger">
+            <h3>Inferred Blocks</h3>
+            <div class="number">{inferred}</div>
+            <small>not measured</small>
+        </div>""")
+    
+    out.write("""
+    </div>""")
+    
+    out.write(html_phase_table(results))
+    
+    out.write("""
     
     <table>
         <thead>
             <tr>
                 <th>URL</th>
-                <th>Status</th>"""
+                <th>Status</th>""")
     
     # Add optional columns if data is available
-    if any(r.get('site_name') for r in results):
-        html += "<th>Site</th>"
-    if any(r.get('unit') for r in results):
-        html += "<th>Unit</th>"
-    if any(r.get('importance') for r in results):
-        html += "<th>Priority</th>"
-    if any(r.get('pii_required') for r in results):
-        html += "<th>PII</th>"
-    
-    html += """
+    for _, title in columns:
+        out.write(f"<th>{title}</th>")
+    
+    out.write("""
                 <th>Message</th>
             </tr>
         </thead>
-        <tbody>"""
-    
-    for result in results:
-        # Determine status class
-        if 'Accessible' in result['status'] or result['status'] == 'Reachable':
-            status_class = 'accessible'
-        elif 'Warning' in result['status']:
-            status_class = 'warning'
-        else:
-            status_class = 'blocked'
-        
-        html += f"""
-            <tr>
-                <td class="url-cell">{result['url']}</td>
-                <td><span class="status {status_class}">{result['status']}</span></td>"""
-        
-        # Add optional columns
-        if any(r.get('site_name') for r in results):
-            html += f"<td>{result.get('site_name', '')}</td>"
-        if any(r.get('unit') for r in results):
-            html += f"<td>{result.get('unit', '')}</td>"
-        if any(r.get('importance') for r in results):
-            importance = result.get('importance', 0)
-            if importance > 70:
-                importance_class = 'high'
-            elif importance > 30:
-                importance_class = 'medium'
-            else:
-                importance_class = 'low'
-            html += f"<td><span class=\"importance {importance_class}\">{importance}</span></td>"
-        if any(r.get('pii_required') for r in results):
-            pii_text = "YES" if result.get('pii_required', False) else "NO"
-            pii_class = "pii-indicator" if result.get('pii_required', False) else ""
-            html += f"<td><span class=\"{pii_class}\">{pii_text}</span></td>"
-        
-        html += f"""
-                <td>{result['message']}</td>
-            </tr>"""
+        <tbody id="report-rows">""")
     
-    html += """
+    if paged:
+        out.write("""
         </tbody>
     </table>
+    <div class="pager">
+        <button id="prev-page">&laquo; Previous</button>
+        <span id="page-info"></span>
+        <button id="next-page">Next &raquo;</button>
+    </div>""")
+        write_html_data(out, rows, columns)
+    else:
+        for result in rows:
+            out.write(html_row(result, status_category(result['status']), columns))
+        out.write("""
+        </tbody>
+    </table>""")
+    
+    out.write("""
     
     <div style="text-align: center; margin-top: 30px; color: #666;">
         <p>Generated by Can I Access? v2.0 - Educational Network Testing Tool</p>
         <p><a href="https://github.com/RiceC-at-MasonHS/can-i-access">GitHub Repository</a></p>
     </div>
 </body>
-</html>"""
+</html>""")
+
+def html_phase_table(results):
+    """Table of p50/p90/p99 for each request phase, if any were measured"""
+    phases = results.phase_percentiles()
+    if not phases:
+        return ''
+    
+    rows = ''.join(f"""
+            <tr>
+                <td>{PHASE_LABELS[field]}</td>
+                {''.join(f'<td>{value * 1000:.0f} ms</td>' for value in values)}
+                <td>{count}</td>
+            </tr>""" for field, (count, values) in phases.items())
+    return f"""
     
-    return html
+    <table class="timing">
+        <thead>
+            <tr>
+                <th>Phase</th>
+                <th>p50</th>
+                <th>p90</th>
+                <th>p99</th>
+                <th>Checks</th>
+            </tr>
+        </thead>
+        <tbody>{rows}
+        </tbody>
+    </table>"""
 
-def generate_csv_report(results):
-    """Generate CSV report"""
-    if not results:
-        return "No results to report"
+def status_class(category):
+    """CSS class for a status category"""
+    if category & ACCESSIBLE:
+        return 'accessible'
+    elif category & WARNING:
+        return 'warning'
+    else:
+        return 'blocked'
+
+def importance_class(importance):
+    """CSS class for an importance ranking"""
+    if importance > 70:
+        return 'high'
+    elif importance > 30:
+        return 'medium'
+    else:
+        return 'low'
+
+def html_row(result, category, columns):
+    """One table row of a report"""
+    inferred_note = ' <span class="inferred">(inferred)</span>' if result.get('inferred') else ''
+    
+    row = f"""
+            <tr>
+                <td class="url-cell">{escape(str(result['url']))}</td>
+                <td><span class="status {status_class(category)}">{escape(str(result['status']))}</span>{inferred_note}</td>"""
     
-    import io
-    output = io.StringIO()
+    # Add optional columns
+    for key, _ in columns:
+        if key == 'importance':
+            importance = result.get('importance', 0)
+            row += f"<td><span class=\"importance {importance_class(importance)}\">{escape(str(importance))}</span></td>"
+        elif key == 'pii_required':
+            pii_text = "YES" if result.get('pii_required', False) else "NO"
+            pii_class = "pii-indicator" if result.get('pii_required', False) else ""
+            row += f"<td><span class=\"{pii_class}\">{pii_text}</span></td>"
+        else:
+            row += f"<td>{escape(str(result.get(key, '')))}</td>"
     
-    # Determine all available fields
-    fieldnames = set()
-    for result in results:
-        fieldnames.update(result.keys())
+    return row + f"""
+                <td>{escape(str(result['message']))}</td>
+            </tr>"""
+
+def write_html_data(out, rows, columns):
+    """
+    Write the rows of a paged report as embedded JSON and the script that
+    shows them a page at a time.
+    
+    Each row is a short array (url, status, class, inferred, the optional
+    column values, message) rather than an object, and class names come
+    from a lookup table, which keeps the data a fraction of the size of
+    rendered rows. "<" is escaped so no value can end the script block.
+    """
+    keys = [key for key, _ in columns]
+    out.write(f"""
+    <script type="application/json" id="report-data">{{"columns":{json.dumps(keys)},"classes":{json.dumps(STATUS_CLASSES)},"rows":[""")
+    classes = {name: number for number, name in enumerate(STATUS_CLASSES)}
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+    separator = ''
+    for result in rows:
+        row = [result['url'], result['status'], classes[status_class(status_category(result['status']))],
+               1 if result.get('inferred') else 0]
+        row.extend(result.get(key, '') for key in keys)
+        row.append(result['message'])
+        out.write(separator + encode(row).replace('<', '\\u003c'))
+        separator = ','
+    out.write(f"""]}}</script>
+    <script>
+    (function () {{
+        var data = JSON.parse(document.getElementById('report-data').textContent);
+        var rows = data.rows, columns = data.columns, pageSize = {PAGE_SIZE}, page = 0;
+        var body = document.getElementById('report-rows');
+        var pages = Math.ceil(rows.length / pageSize);
+        
+        function cell(tr, text, className) {{
+            var td = tr.insertCell(), span = document.createElement('span');
+            span.textContent = text;
+            if (className) span.className = className;
+            td.appendChild(span);
+            return td;
+        }}
+        
+        function render() {{
+            var fragment = document.createDocumentFragment();
+            var end = Math.min((page + 1) * pageSize, rows.length);
+            for (var i = page * pageSize; i < end; i++) {{
+                var row = rows[i], tr = document.createElement('tr');
+                cell(tr, row[0]).className = 'url-cell';
+                var status = cell(tr, row[1], 'status ' + data.classes[row[2]]);
+                if (row[3]) {{
+                    var note = document.createElement('span');
+                    note.className = 'inferred';
+                    note.textContent = ' (inferred)';
+                    status.appendChild(note);
+                }}
+                for (var c = 0; c < columns.length; c++) {{
+                    var value = row[4 + c];
+                    if (columns[c] === 'importance') {{
+                        cell(tr, value, 'importance ' + (value > 70 ? 'high' : value > 30 ? 'medium' : 'low'));
+                    }} else if (columns[c] === 'pii_required') {{
+                        cell(tr, value ? 'YES' : 'NO', value ? 'pii-indicator' : '');
+                    }} else {{
+                        cell(tr, value);
+                    }}
+                }}
+                cell(tr, row[4 + columns.length]);
+                fragment.appendChild(tr);
+            }}
+            body.replaceChildren(fragment);
+            document.getElementById('page-info').textContent =
+                'Rows ' + (page * pageSize + 1) + '-' + end + ' of ' + rows.length +
+                ' (page ' + (page + 1) + ' of ' + pages + ')';
+        }}
+        
+        document.getElementById('prev-page').onclick = function () {{
+            if (page > 0) {{ page--; render(); window.scrollTo(0, 0); }}
+        }};
+        document.getElementById('next-page').onclick = function () {{
+            if (page < pages - 1) {{ page++; render(); window.scrollTo(0, 0); }}
+        }};
+        render();
+    }})();
+    </script>""")
+
+def write_csv_report(out, summary, rows):
+    """Write a CSV report"""
+    if not summary.stats:
+        out.write("No results to report")
+        return
     
     # Order fields logically
     ordered_fields = ['url', 'status', 'http_status', 'message', 'site_name', 'unit', 'importance', 'pii_required', 'source', 'response_time']
-    fieldnames = [f for f in ordered_fields if f in fieldnames] + [f for f in fieldnames if f not in ordered_fields]
+    fieldnames = [f for f in ordered_fields if f in summary.fields] + [f for f in summary.fields if f not in ordered_fields]
     
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    writer = csv.DictWriter(out, fieldnames=fieldnames)
     writer.writeheader()
-    writer.writerows(results)
-    
-    return output.getvalue()
+    writer.writerows(rows)
 
-def generate_text_report(results, timestamp):
-    """Generate plain text report"""
+def write_text_report(out, summary, rows, timestamp):
+    """Write a plain text report"""
     report_time = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
     
     lines = []
@@ -317,33 +485,42 @@ def generate_text_report(results, timestamp):
     lines.append(f"Generated: {report_time}")
     lines.append("")
     
+    results = summary.stats
     if not results:
         lines.append("No results to report")
-        return "\\n".join(lines)
+        out.write("\n".join(lines))
+        return
     
     # Summary
     total = len(results)
-    accessible = sum(1 for r in results if 'Accessible' in r['status'] or r['status'] == 'Reachable')
-    warnings = sum(1 for r in results if 'Warning' in r['status'])
-    blocked = sum(1 for r in results if r['status'] in ['Not Reachable', 'Video Removed'])
-    errors = sum(1 for r in results if r['status'] == 'Error')
+    accessible = results.accessible
+    warnings = results.warnings
+    blocked = results.blocked
+    errors = results.errors
+    inferred = results.inferred
     
     lines.append("SUMMARY")
     lines.append("-" * 20)
     lines.append(f"Total URLs tested: {total}")
-    lines.append(f"Accessible: {accessible} ({accessible/total*100:.1f}%)")
-    lines.append(f"Warnings: {warnings} ({warnings/total*100:.1f}%)")
-    lines.append(f"Blocked: {blocked} ({blocked/total*100:.1f}%)")
-    lines.append(f"Errors: {errors} ({errors/total*100:.1f}%)")
+    lines.append(f"Accessible: {accessible} ({results.percent(accessible):.1f}%)")
+    lines.append(f"Warnings: {warnings} ({results.percent(warnings):.1f}%)")
+    lines.append(f"Blocked: {blocked} ({results.percent(blocked):.1f}%)")
+    lines.append(f"Errors: {errors} ({results.percent(errors):.1f}%)")
+    if inferred:
+        lines.append(f"Inferred (not measured): {inferred} ({results.percent(inferred):.1f}%)")
     lines.append("")
     
-    # Detailed results
+    # Detailed results, written one at a time
     lines.append("DETAILED RESULTS")
     lines.append("-" * 20)
+    out.write("\n".join(lines))
     
-    for result in results:
+    for result in rows:
+        lines = []
         lines.append(f"URL: {result['url']}")
         lines.append(f"Status: {result['status']}")
+        if result.get('inferred'):
+            lines.append("Result: inferred from repeated failures on this host (not measured)")
         if result.get('site_name'):
             lines.append(f"Site: {result['site_name']}")
         if result.get('unit'):
@@ -354,5 +531,4 @@ def generate_text_report(results, timestamp):
             lines.append(f"PII Required: {'YES' if result['pii_required'] else 'NO'}")
         lines.append(f"Message: {result['message']}")
         lines.append("")
-    
-    return "\\n".join(lines)
+        out.write("\n" + "\n".join(lines))
@@ -7,12 +7,50 @@ import csv
 import json
 import time
 import io
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
 from urllib.parse import urlparse
-from urllib.request import urlopen, Request
-from .. import check_url_accessibility, Colors, eprint, format_url_for_display, PREDEFINED_SHEETS
+from .. import check_url_accessibility, classify_youtube_url, is_youtube_url, Colors, eprint, format_bytes, format_url_for_display, PREDEFINED_SHEETS
+from ..engine import iter_checks, MAX_PARALLEL
+from ..scheduler import Scheduler
+from ..session import CheckSession, uses_proxy
+from ..pool import ConnectionPool
+from ..resolver import Resolver, is_ip_address
+from ..breaker import HostCircuitBreaker
+from ..timeouts import AdaptiveTimeouts
+from ..profiling import stage
+from ..replay import OutcomeRecorder, OutcomesFileError, ReplaySession, load_outcomes
+from ..cache import ResultCache
+from ..history import HistoryStore
+from ..journal import Journal, load_journal
+from ..output import ResultStream, STREAM_FORMATS
+from ..sheets import fetch_sheet
+from ..youtube import VideoCache, VideoChecker
+from ..results import (CheckResult, ResultStore, as_store, matches_filter, status_category,
+                       ACCESSIBLE, WARNING, MENTIONS_HTTP, PROBLEM, PHASE_LABELS)
+
+# Characters read from the start of a CSV file to detect its dialect
+SNIFF_SIZE = 64 * 1024
+
+# Optional CSV columns copied into each URL record
+METADATA_COLUMNS = [
+    ('site', 'site_name'),
+    ('unit', 'unit'),
+    ('reporting z-index (higher, more important)', 'importance'),
+    ('Student PII Needed', 'pii_required')
+]
+
+# Options a --replay takes from the recorded run, so every check asks for
+# the outcomes that were recorded
+RECORDED_SETTINGS = ('timeout', 'depth', 'probe', 'no_https_upgrade', 'skip_youtube')
 
 def run_test_command(args):
     """Execute the test command"""
+    stage('load')
+    
     # Determine input source
     urls_to_test = []
     source_name = "Unknown"
@@ -31,215 +69,624 @@ def run_test_command(args):
     elif args.cyber3:
         urls_to_test, source_name = load_urls_from_sheet(PREDEFINED_SHEETS['cyber3'], "Cyber3")
     elif args.all_cyber:
-        # Load all cybersecurity sheets
-        urls_to_test = []
-        for name, sheet_url in PREDEFINED_SHEETS.items():
-            sheet_urls, _ = load_urls_from_sheet(sheet_url, name.title())
-            for url_data in sheet_urls:
-                url_data['source'] = name.title()
-            urls_to_test.extend(sheet_urls)
+        # Fetch all cybersecurity sheets at once; testing starts on the first to arrive
+        urls_to_test = stream_sheets([(name.title(), sheet_url) for name, sheet_url in PREDEFINED_SHEETS.items()])
         source_name = "All Cybersecurity Curricula"
     else:
         # Default: load cyber1
         urls_to_test, source_name = load_urls_from_sheet(PREDEFINED_SHEETS['cyber1'], "Cyber1 (default)")
     
+    # Lists are counted up front; streamed sources are read while testing runs
+    total = None
+    if isinstance(urls_to_test, list):
+        urls_to_test = [url_data for url_data in urls_to_test if url_data['url'].strip()]
+        total = len(urls_to_test)
+    else:
+        first = next(urls_to_test, None)
+        urls_to_test = chain([first], urls_to_test) if first is not None else []
     if not urls_to_test:
         eprint(f"{Colors.RED}✗ No URLs to test{Colors.END}")
         sys.exit(1)
     
+    if args.record and args.replay:
+        eprint(f"{Colors.RED}✗ --record and --replay cannot be used together{Colors.END}")
+        sys.exit(2)
+    
+    # A replay takes on the recorded run's settings and checks one URL at a
+    # time, so outcomes are used in the order they were recorded
+    outcomes = open_replay(args) if args.replay else None
+    
+    if args.engine == 'async':
+        from ..aio import check_url_accessibility_async, iter_checks_async, MAX_ASYNC_PARALLEL, DEFAULT_ASYNC_PARALLEL
+        workers = args.parallel or DEFAULT_ASYNC_PARALLEL
+        max_workers = MAX_ASYNC_PARALLEL
+    else:
+        workers = args.parallel or 1
+        max_workers = MAX_PARALLEL
+    
+    if not 1 <= workers <= max_workers:
+        eprint(f"{Colors.RED}✗ --parallel must be between 1 and {max_workers} for the {args.engine} engine{Colors.END}")
+        sys.exit(2)
+    
+    if args.adaptive_timeout and not 0 < args.timeout_min <= args.timeout_max:
+        eprint(f"{Colors.RED}✗ --timeout-min must be above 0 and no more than --timeout-max{Colors.END}")
+        sys.exit(2)
+    
+    if args.rate < 0 or args.host_rate < 0 or args.host_concurrency < 0:
+        eprint(f"{Colors.RED}✗ --rate, --host-rate and --host-concurrency cannot be negative{Colors.END}")
+        sys.exit(2)
+    
     # Print header
     if not args.quiet:
         print(f"{Colors.BOLD}{Colors.BLUE}Can I Access? - Network Accessibility Test{Colors.END}")
         print(f"{Colors.CYAN}Source: {source_name}{Colors.END}")
-        print(f"{Colors.CYAN}URLs to test: {len(urls_to_test)}{Colors.END}")
-        print(f"{Colors.CYAN}Timeout: {args.timeout}s{Colors.END}")
+        if total is not None:
+            print(f"{Colors.CYAN}URLs to test: {total}{Colors.END}")
+        else:
+            print(f"{Colors.CYAN}URLs to test: read from the source as testing runs{Colors.END}")
+        if args.adaptive_timeout:
+            print(f"{Colors.CYAN}Timeout: adaptive, {args.timeout_min:g}-{args.timeout_max:g}s "
+                  f"(starting at {args.timeout}s){Colors.END}")
+        else:
+            print(f"{Colors.CYAN}Timeout: {args.timeout}s{Colors.END}")
+        if args.engine == 'async':
+            print(f"{Colors.CYAN}Engine: async ({workers} concurrent checks){Colors.END}")
+        elif workers > 1:
+            print(f"{Colors.CYAN}Workers: {workers}{Colors.END}")
+        if args.depth != 'http':
+            print(f"{Colors.CYAN}Probe depth: {args.depth} (no HTTP requests){Colors.END}")
+        if args.replay:
+            print(f"{Colors.CYAN}Replaying outcomes from {args.replay} (no network){Colors.END}")
+        elif args.record:
+            print(f"{Colors.CYAN}Recording outcomes to {args.record}{Colors.END}")
+        if args.rate or args.host_rate:
+            limits = []
+            if args.rate:
+                limits.append(f"{args.rate:g} checks/s")
+            if args.host_rate:
+                limits.append(f"{args.host_rate:g} checks/s per host")
+            print(f"{Colors.CYAN}Rate limit: {', '.join(limits)}{Colors.END}")
         print()
     
-    # Run tests
-    results = []
+    # Results completed by an interrupted run are kept rather than re-tested
+    resumed = {}
+    if args.resume:
+        if not os.path.exists(args.resume):
+            eprint(f"{Colors.RED}✗ Journal not found: {args.resume}{Colors.END}")
+            sys.exit(2)
+        resumed = load_journal(args.resume)
+    journal = open_journal(args.resume or args.journal)
+    
+    # JSONL and CSV output is written as results complete
+    stream = None
+    if args.output and args.format in STREAM_FORMATS:
+        stream = open_result_stream(args.output, args.format)
+    
+    session = create_session(args, outcomes, workers)
+    # Replayed results are not new observations to cache or keep in history
+    cache = open_cache(args) if outcomes is None else None
+    history = open_history(args, source_name) if outcomes is None else None
     start_time = time.time()
+    stage('test')
     
-    for i, url_data in enumerate(urls_to_test, 1):
-        url = url_data['url'].strip()
-        if not url:
-            continue
+    # Journaled results and results still fresh in the cache are reported
+    # without testing again; every other record goes to the engine
+    already_done = deque()
+    from_journal = set()
+    seen_hosts = set()
+    seen_videos = set()
+    read_ahead = total is None and not args.no_dns_prefetch and session.resolver is not None
+    
+    def split_records(records):
+        for index, url_data in records:
+            url = url_data['url'].strip()
+            result = resumed.get(url)
+            if result is not None:
+                from_journal.add(index)
+            elif cache is not None and not args.refresh and not args.record:
+                result = cache.get(url)
+            if result is not None:
+                already_done.append((index, url_data, CheckResult.from_dict(result)))
+                continue
             
-        if not args.quiet:
-            progress = f"[{i:3d}/{len(urls_to_test)}]"
-            display_url = format_url_for_display(url, 50)
-            print(f"{Colors.CYAN}{progress}{Colors.END} Testing: {display_url}")
-        
-        # Test the URL
-        result = check_url_accessibility(
-            url, 
-            timeout=args.timeout, 
-            verbose=(args.verbose > 1)
-        )
-        
-        # Add metadata from CSV if available
-        for key in ['site_name', 'unit', 'importance', 'pii_required']:
-            if key in url_data:
-                result[key] = url_data[key]
-        
-        result['source'] = url_data.get('source', source_name)
-        results.append(result)
+            # Streamed files cannot be pre-resolved as a whole, so new hosts
+            # are looked up in the background as their rows are read
+            if read_ahead:
+                for host in url_hosts(url) - seen_hosts:
+                    seen_hosts.add(host)
+                    session.submit(session.resolver.resolve, host)
+            # Likewise each new YouTube video is checked as soon as it is seen
+            youtube = classify_youtube_url(url) if session.videos is not None else None
+            if youtube and total is None and youtube not in seen_videos:
+                seen_videos.add(youtube)
+                session.submit(session.check_video, youtube[0], youtube[1], args.timeout)
+            yield index, url_data
+    
+    records = split_records(enumerate(urls_to_test))
+    if total is not None:
+        records = list(records)
+        if already_done and not args.quiet:
+            sources = []
+            if from_journal:
+                sources.append(f"{len(from_journal)} from journal")
+            if len(already_done) > len(from_journal):
+                sources.append(f"{len(already_done) - len(from_journal)} from cache")
+            print(f"{Colors.CYAN}Already done: {', '.join(sources)}; {len(records)} left to test{Colors.END}")
+            print()
         
-        # Show immediate result unless quiet
-        if not args.quiet:
-            status_color = get_status_color(result['status'])
-            print(f"    → {status_color}{result['status']}{Colors.END}")
-            if result['message'] and args.verbose:
-                print(f"      {result['message']}")
+        # Resolve every unique host up front so checks use cached addresses and
+        # hosts that fail DNS are classified without an HTTP attempt
+        if not args.no_dns_prefetch and session.resolver is not None:
+            prefetch_hosts(session.resolver, [url_data for _, url_data in records], args.quiet)
         
-        # Brief pause to avoid overwhelming the network
-        if i < len(urls_to_test):
-            time.sleep(0.1)
+        # Check each unique YouTube video once, before the page checks need it
+        if session.videos is not None:
+            prefetch_videos(session, [url_data for _, url_data in records], args.timeout, args.quiet)
     
-    total_time = time.time() - start_time
+    # Checks on a host that is at its limits wait while other hosts' run
+    scheduler = Scheduler(rate=args.rate, host_rate=args.host_rate,
+                          host_concurrency=args.host_concurrency)
     
-    # Filter results if requested
-    if args.filter != 'all':
-        results = filter_results(results, args.filter)
+    def record_host(record):
+        return urlparse(record[1]['url'].strip()).hostname or ''
+    
+    if outcomes is not None:
+        def run_check(record):
+            # Results keep the response time measured when recording
+            session.start_check()
+            result = check_url_accessibility(record[1]['url'].strip(), timeout=args.timeout,
+                                             verbose=(args.verbose > 1), session=session)
+            result['response_time'] = session.check_time()
+            return result
+        checks = ((index, record, run_check(record)) for index, record in enumerate(records))
+    elif args.engine == 'async':
+        def run_check(record):
+            return check_url_accessibility_async(
+                record[1]['url'].strip(),
+                timeout=args.timeout,
+                verbose=(args.verbose > 1),
+                session=session
+            )
+        checks = iter_checks_async(records, run_check, workers, scheduler, record_host)
+    else:
+        def run_check(record):
+            return check_url_accessibility(
+                record[1]['url'].strip(),
+                timeout=args.timeout,
+                verbose=(args.verbose > 1),
+                session=session
+            )
+        checks = iter_checks(records, run_check, workers, scheduler, record_host)
+    
+    def iter_results():
+        # Already-known results are passed on between completed checks
+        while True:
+            while already_done:
+                yield already_done.popleft()
+            entry = next(checks, None)
+            if entry is None:
+                if already_done:
+                    continue
+                return
+            _, (index, url_data), result = entry
+            yield index, url_data, result
+    
+    # Run tests - results are tagged with their input position so the output
+    # keeps the original order even though checks finish out of order.
+    # Streamed results are already on disk, so only their totals are kept
+    results = ResultStore(keep_rows=False) if stream is not None else []
+    completed = 0
+    interrupted = False
+    
+    try:
+        for index, url_data, result in iter_results():
+            # Add metadata from CSV if available
+            for key in ['site_name', 'unit', 'importance', 'pii_required']:
+                if key in url_data:
+                    result[key] = url_data[key]
+            
+            result['source'] = url_data.get('source', source_name)
+            completed += 1
+            if stream is None:
+                results.append((index, result))
+            elif matches_filter(result, args.filter):
+                stream.write(result)
+                results.append(result)
+            if journal is not None and index not in from_journal:
+                journal.record(url_data['url'].strip(), result)
+            if cache is not None and not result['cached'] and index not in from_journal and not result['inferred']:
+                cache.store(url_data['url'].strip(), result)
+            if history is not None and not result['cached'] and index not in from_journal:
+                history.record(result)
+            
+            # Show immediate result unless quiet
+            if not args.quiet:
+                progress = f"[{completed:3d}/{total}]" if total is not None else f"[{completed:3d}]"
+                display_url = format_url_for_display(result['url'], 50)
+                status_color = get_status_color(result['status'])
+                print(f"{Colors.CYAN}{progress}{Colors.END} Testing: {display_url}")
+                if index in from_journal:
+                    marker = " (resumed)"
+                elif result['cached']:
+                    marker = " (cached)"
+                else:
+                    marker = ""
+                print(f"    → {status_color}{result['status']}{Colors.END}{marker}")
+                if result['message'] and args.verbose:
+                    print(f"      {result['message']}")
+    except KeyboardInterrupt:
+        interrupted = True
+        of_total = f" of {total}" if total is not None else ""
+        eprint(f"\n{Colors.YELLOW}⚠ Interrupted - stopping after {completed}{of_total} URLs "
+               f"(checks already in flight finish within {args.timeout}s){Colors.END}")
+    
+    total_time = time.time() - start_time
+    stage('filter')
+    if stream is None:
+        results = ResultStore(result for _, result in sorted(results, key=lambda entry: entry[0]))
+        
+        # Filter results if requested
+        results = results.filter(args.filter)
     
     # Output results
-    if args.output:
+    stage('save')
+    if stream is not None:
+        stream.close()
+    elif args.output:
         save_results(results, args.output, args.format)
+    if args.output:
         if not args.quiet:
             print(f"\n{Colors.GREEN}✓ Results saved to {args.output}{Colors.END}")
     
     # Print summary
+    stage('render')
     if not args.quiet:
         print_summary(results, total_time)
+        if args.verbose and session.pool is not None:
+            print_pool_stats(session.pool)
+    
+    stage('close')
+    session.close()
+    if cache is not None:
+        close_cache(cache)
+    if history is not None:
+        close_history(history)
+    if journal is not None:
+        journal.close()
+        if interrupted and not args.quiet:
+            print(f"\n{Colors.CYAN}Resume with: --resume {args.resume or args.journal}{Colors.END}")
     
     # Exit with appropriate code
-    failed_count = sum(1 for r in results if r['status'] in ['Not Reachable', 'Error', 'Video Removed'])
-    sys.exit(1 if failed_count > 0 else 0)
+    if interrupted:
+        sys.exit(130)
+    sys.exit(1 if results.problems > 0 else 0)
 
-def load_urls_from_csv(filename):
-    """Load URLs from a CSV file"""
-    urls = []
+def create_session(args, outcomes=None, workers=1):
+    """
+    Create the check session shared by every URL in the run; with replay
+    outcomes, a session that answers from them instead of the network.
+    workers is the number of checks run at once.
+    """
+    if outcomes is not None:
+        check_videos = not args.skip_youtube and args.depth == 'http'
+        return ReplaySession(outcomes, videos=VideoChecker() if check_videos else None,
+                             https_upgrade=not args.no_https_upgrade, probe_mode=args.probe,
+                             check_videos=check_videos, depth=args.depth)
+    
+    resolver = Resolver(ttl=args.dns_ttl)
+    timeouts = None
+    if args.adaptive_timeout:
+        timeouts = AdaptiveTimeouts(args.timeout, minimum=args.timeout_min, maximum=args.timeout_max)
+    pool = None
+    if args.engine == 'thread' and args.pool_size > 0:
+        pool = ConnectionPool(max_size=args.pool_size, per_host=args.pool_per_host,
+                              idle_timeout=args.pool_idle, resolver=resolver, timeouts=timeouts)
+    breaker = None
+    if args.breaker_threshold > 0:
+        breaker = HostCircuitBreaker(threshold=args.breaker_threshold, confirm=args.breaker_confirm)
+    # Video checks are HTTP requests, so shallow depths skip them
+    check_videos = not args.skip_youtube and args.depth == 'http'
+    videos = None
+    if check_videos:
+        videos = VideoChecker(store=open_video_cache(args), refresh=args.refresh)
+    # One helper thread per concurrent check for background DNS and video
+    # lookups, and one more for the HTTP side of each raced thread check
+    helper_threads = workers * (2 if args.race_https and args.engine == 'thread' else 1)
+    return CheckSession(pool=pool, resolver=resolver, breaker=breaker, videos=videos,
+                        https_upgrade=not args.no_https_upgrade, race_https=args.race_https,
+                        probe_mode=args.probe, check_videos=check_videos,
+                        timeouts=timeouts, depth=args.depth, outcomes=open_recorder(args),
+                        helper_threads=helper_threads)
+
+def open_recorder(args):
+    """Start the --record outcomes file, headed by the settings a replay needs"""
+    if not args.record:
+        return None
     try:
-        with open(filename, 'r', encoding='utf-8', newline='') as csvfile:
-            # Detect CSV dialect
-            sample = csvfile.read(1024)
-            csvfile.seek(0)
-            dialect = csv.Sniffer().sniff(sample)
-            
-            reader = csv.DictReader(csvfile, dialect=dialect)
-            
-            # Find URL column (case insensitive)
-            url_column = None
-            for field in reader.fieldnames:
-                if field.lower().strip() == 'url':
-                    url_column = field
-                    break
-            
-            if not url_column:
-                eprint(f"{Colors.RED}✗ CSV file must contain a 'URL' column{Colors.END}")
-                eprint(f"Available columns: {', '.join(reader.fieldnames)}")
-                sys.exit(2)
-            
-            for row_num, row in enumerate(reader, 2):
-                url = row.get(url_column, '').strip()
-                if url:
-                    url_data = {'url': url}
-                    
-                    # Extract additional metadata if available
-                    for csv_col, result_key in [
-                        ('site', 'site_name'),
-                        ('unit', 'unit'),
-                        ('reporting z-index (higher, more important)', 'importance'),
-                        ('Student PII Needed', 'pii_required')
-                    ]:
-                        if csv_col in row and row[csv_col]:
-                            value = row[csv_col].strip()
-                            if result_key == 'importance':
-                                try:
-                                    url_data[result_key] = int(value)
-                                except ValueError:
-                                    url_data[result_key] = 0
-                            elif result_key == 'pii_required':
-                                url_data[result_key] = value.upper() in ['TRUE', 'YES', '1']
-                            else:
-                                url_data[result_key] = value
-                    
-                    urls.append(url_data)
+        return OutcomeRecorder(args.record, {name: getattr(args, name) for name in RECORDED_SETTINGS})
+    except OSError as e:
+        eprint(f"{Colors.RED}✗ Cannot write outcomes file {args.record}: {e}{Colors.END}")
+        sys.exit(2)
+
+def open_replay(args):
+    """Load the --replay outcomes and take on the settings they were recorded with"""
+    try:
+        settings, outcomes = load_outcomes(args.replay)
+    except FileNotFoundError:
+        eprint(f"{Colors.RED}✗ Outcomes file not found: {args.replay}{Colors.END}")
+        sys.exit(2)
+    except (OSError, UnicodeDecodeError, OutcomesFileError) as e:
+        eprint(f"{Colors.RED}✗ Cannot replay {args.replay}: {e}{Colors.END}")
+        sys.exit(2)
+    for name in RECORDED_SETTINGS:
+        if name in settings:
+            setattr(args, name, settings[name])
+    args.engine = 'thread'
+    args.parallel = 1
+    return outcomes
+
+def open_video_cache(args):
+    """Open the persistent YouTube answer cache unless --video-ttl is 0"""
+    # A recording needs every video's own request
+    if args.video_ttl <= 0 or args.record:
+        return None
+    try:
+        return VideoCache(ttl=args.video_ttl)
+    except (OSError, sqlite3.Error) as e:
+        eprint(f"{Colors.YELLOW}⚠ Video cache unavailable, checking every video: {e}{Colors.END}")
+        return None
+
+def open_cache(args):
+    """Open the on-disk result cache when --cache is given"""
+    if not args.cache:
+        return None
+    # A shallow check's result must not stand in for a full one
+    profile = args.cache_profile if args.depth == 'http' else f"{args.cache_profile}/{args.depth}"
+    try:
+        return ResultCache(args.cache_file, profile=profile,
+                           success_ttl=args.cache_ttl, failure_ttl=args.cache_failure_ttl)
+    except (OSError, sqlite3.Error) as e:
+        eprint(f"{Colors.YELLOW}⚠ Result cache unavailable, testing without it: {e}{Colors.END}")
+        return None
+
+def open_history(args, source_name):
+    """Open the history database and start recording a run when --history is given"""
+    if not args.history:
+        return None
+    try:
+        history = HistoryStore(args.history_file)
+        history.start_run(source_name)
+        return history
+    except (OSError, sqlite3.Error) as e:
+        eprint(f"{Colors.YELLOW}⚠ History database unavailable, this run will not be recorded: {e}{Colors.END}")
+        return None
+
+def open_result_stream(filename, format_type):
+    """Open an incremental JSONL/CSV output file"""
+    try:
+        return ResultStream(filename, format_type)
+    except OSError as e:
+        eprint(f"{Colors.RED}✗ Error saving results: {e}{Colors.END}")
+        sys.exit(2)
+
+def open_journal(path):
+    """Open the checkpoint journal for appending, if one was requested"""
+    if not path:
+        return None
+    try:
+        return Journal(path)
+    except OSError as e:
+        eprint(f"{Colors.RED}✗ Cannot write journal {path}: {e}{Colors.END}")
+        sys.exit(2)
+
+def close_cache(cache):
+    """Write pending results to the cache and close it"""
+    try:
+        cache.close()
+    except sqlite3.Error as e:
+        eprint(f"{Colors.YELLOW}⚠ Could not update the result cache: {e}{Colors.END}")
+
+def close_history(history):
+    """Record the end of the run and close the history database"""
+    try:
+        history.finish_run()
+        history.close()
+    except sqlite3.Error as e:
+        eprint(f"{Colors.YELLOW}⚠ Could not record this run in the history: {e}{Colors.END}")
+
+def url_hosts(url):
+    """Hostnames a check of url will look up (none for a malformed URL)"""
+    hosts = set()
+    try:
+        if not uses_proxy(url):
+            hosts.add(urlparse(url).hostname)
+    except ValueError:
+        # Such as an unclosed IPv6 bracket; the check reports the URL
+        return set()
+    if is_youtube_url(url):
+        hosts.add('www.youtube.com')
+    return set(host for host in hosts if host and not is_ip_address(host))
+
+def prefetch_hosts(resolver, urls_to_test, quiet=False):
+    """Resolve the unique hosts of the URL list concurrently"""
+    hosts = set()
+    for url_data in urls_to_test:
+        hosts |= url_hosts(url_data['url'].strip())
+    if not hosts:
+        return
+    
+    start_time = time.time()
+    failed = resolver.prefetch(hosts)
+    if not quiet:
+        summary = f"Resolved {len(hosts)} hosts in {time.time() - start_time:.1f}s"
+        if failed:
+            summary += f" ({len(failed)} failed DNS)"
+        print(f"{Colors.CYAN}{summary}{Colors.END}")
+        print()
+
+def sniff_dialect(csvfile):
+    """Detect the dialect from the start of a CSV file, then rewind it"""
+    sample = csvfile.read(SNIFF_SIZE)
+    csvfile.seek(0)
+    # Leave out a trailing partial line so it cannot mislead the sniffer
+    if len(sample) == SNIFF_SIZE and '\n' in sample:
+        sample = sample[:sample.rindex('\n') + 1]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|')
+    except csv.Error:
+        # A single-column file has no delimiter to detect
+        return csv.excel
+
+def resolve_columns(fieldnames, source_label):
+    """
+    Find the URL column and the optional metadata columns of a header.
+    
+    Returns (url_column, [(column, result_key), ...]) so rows can be parsed
+    without looking the columns up again. Exits if there is no URL column.
+    """
+    fieldnames = fieldnames or []
+    url_column = None
+    for field in fieldnames:
+        if field.lower().strip() == 'url':
+            url_column = field
+            break
+    
+    if not url_column:
+        eprint(f"{Colors.RED}✗ {source_label} must contain a 'URL' column{Colors.END}")
+        if fieldnames:
+            eprint(f"Available columns: {', '.join(fieldnames)}")
+        sys.exit(2)
+    
+    columns = [(column, result_key) for column, result_key in METADATA_COLUMNS if column in fieldnames]
+    return url_column, columns
+
+def iter_url_records(reader, url_column, columns):
+    """Yield a URL record for every row of a csv.DictReader that has a URL"""
+    for row in reader:
+        url = (row.get(url_column) or '').strip()
+        if not url:
+            continue
+        url_data = {'url': url}
+        
+        # Extract additional metadata if available
+        for column, result_key in columns:
+            value = row.get(column)
+            if not value:
+                continue
+            value = value.strip()
+            if result_key == 'importance':
+                try:
+                    url_data[result_key] = int(value)
+                except ValueError:
+                    url_data[result_key] = 0
+            elif result_key == 'pii_required':
+                url_data[result_key] = value.upper() in ['TRUE', 'YES', '1']
+            else:
+                url_data[result_key] = value
+        
+        yield url_data
+
+def prefetch_videos(session, urls_to_test, timeout, quiet=False):
+    """Check the unique YouTube videos of the URL list concurrently"""
+    videos = [classify_youtube_url(url_data['url'].strip()) for url_data in urls_to_test]
+    videos = [video for video in videos if video]
+    if not videos:
+        return
+    
+    start_time = time.time()
+    checker = session.videos
+    unique = checker.prefetch(videos, timeout, session)
+    if not quiet:
+        summary = f"Checked {unique} unique YouTube videos in {time.time() - start_time:.1f}s"
+        if checker.stored_hits:
+            summary += f" ({checker.stored_hits} from cache)"
+        print(f"{Colors.CYAN}{summary}{Colors.END}")
+        print()
+
+def load_urls_from_csv(filename):
+    """
+    Open a CSV file of URLs for streaming.
     
+    The header is checked straight away; rows are parsed lazily as the
+    returned iterator is consumed, so testing starts on the first row and
+    memory use does not grow with the file.
+    """
+    try:
+        csvfile = open(filename, 'r', encoding='utf-8-sig', newline='')
     except FileNotFoundError:
         eprint(f"{Colors.RED}✗ File not found: {filename}{Colors.END}")
         sys.exit(2)
+    except OSError as e:
+        eprint(f"{Colors.RED}✗ Error reading CSV: {e}{Colors.END}")
+        sys.exit(2)
+    
+    try:
+        reader = csv.DictReader(csvfile, dialect=sniff_dialect(csvfile))
+        url_column, columns = resolve_columns(reader.fieldnames, "CSV file")
     except Exception as e:
+        csvfile.close()
         eprint(f"{Colors.RED}✗ Error reading CSV: {e}{Colors.END}")
         sys.exit(2)
     
-    return urls, f"CSV file ({filename})"
+    return stream_csv_records(csvfile, reader, url_column, columns), f"CSV file ({filename})"
+
+def stream_csv_records(csvfile, reader, url_column, columns):
+    """Yield URL records from an open CSV file, closing it at the end"""
+    with csvfile:
+        try:
+            yield from iter_url_records(reader, url_column, columns)
+        except (csv.Error, UnicodeDecodeError) as e:
+            eprint(f"{Colors.RED}✗ Error reading CSV at line {reader.line_num}: {e} "
+                   f"- no further URLs will be read{Colors.END}")
+
+def download_sheet(sheet_url, sheet_name):
+    """Fetch a sheet's CSV content, warning when an offline copy is used"""
+    csv_content, origin, fetched_at = fetch_sheet(sheet_url)
+    if origin == 'offline':
+        saved = time.strftime('%Y-%m-%d %H:%M', time.localtime(fetched_at)) if fetched_at else 'an earlier run'
+        eprint(f"{Colors.YELLOW}⚠ Could not reach the sheet host for {sheet_name} - "
+               f"using the copy saved {saved}{Colors.END}")
+    return csv_content
+
+def parse_sheet(csv_content):
+    """Parse a sheet's CSV content into a list of URL records"""
+    reader = csv.DictReader(io.StringIO(csv_content))
+    url_column, columns = resolve_columns(reader.fieldnames, "Google Sheet")
+    return list(iter_url_records(reader, url_column, columns))
 
 def load_urls_from_sheet(sheet_url, sheet_name):
     """Load URLs from a Google Sheets CSV"""
-    urls = []
     try:
-        req = Request(sheet_url, headers={
-            'User-Agent': 'CanIAccess/2.0 (Educational Network Testing Tool)'
-        })
-        
-        with urlopen(req, timeout=30) as response:
-            csv_content = response.read().decode('utf-8')
-        
-        reader = csv.DictReader(io.StringIO(csv_content))
-        
-        # Find URL column
-        url_column = None
-        for field in reader.fieldnames:
-            if field.lower().strip() == 'url':
-                url_column = field
-                break
-        
-        if not url_column:
-            eprint(f"{Colors.RED}✗ Google Sheet must contain a 'URL' column{Colors.END}")
-            sys.exit(2)
-        
-        for row in reader:
-            url = row.get(url_column, '').strip()
-            if url:
-                url_data = {'url': url}
-                
-                # Extract metadata
-                for csv_col, result_key in [
-                    ('site', 'site_name'),
-                    ('unit', 'unit'),
-                    ('reporting z-index (higher, more important)', 'importance'),
-                    ('Student PII Needed', 'pii_required')
-                ]:
-                    if csv_col in row and row[csv_col]:
-                        value = row[csv_col].strip()
-                        if result_key == 'importance':
-                            try:
-                                url_data[result_key] = int(value)
-                            except ValueError:
-                                url_data[result_key] = 0
-                        elif result_key == 'pii_required':
-                            url_data[result_key] = value.upper() in ['TRUE', 'YES', '1']
-                        else:
-                            url_data[result_key] = value
-                
-                urls.append(url_data)
-    
+        urls = parse_sheet(download_sheet(sheet_url, sheet_name))
     except Exception as e:
         eprint(f"{Colors.RED}✗ Error loading Google Sheet: {e}{Colors.END}")
         sys.exit(2)
     
     return urls, sheet_name
 
-def filter_results(results, filter_type):
-    """Filter results based on type"""
-    if filter_type == 'blocked':
-        return [r for r in results if r['status'] in ['Not Reachable', 'Video Removed']]
-    elif filter_type == 'accessible':
-        return [r for r in results if 'Accessible' in r['status'] or r['status'] == 'Reachable']
-    elif filter_type == 'warnings':
-        return [r for r in results if 'Warning' in r['status'] or 'HTTP' in r['status']]
-    else:
-        return results
+def stream_sheets(sheets):
+    """
+    Fetch (name, url) sheets concurrently and yield their URL records.
+    
+    Each sheet's records are yielded as soon as that sheet arrives, tagged
+    with the sheet name as their source. A sheet that cannot be loaded is
+    reported and skipped.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(sheets))
+    try:
+        futures = {executor.submit(download_sheet, sheet_url, name): name for name, sheet_url in sheets}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                urls = parse_sheet(future.result())
+            except Exception as e:
+                eprint(f"{Colors.RED}✗ Error loading Google Sheet {name}: {e}{Colors.END}")
+                continue
+            for url_data in urls:
+                url_data['source'] = name
+                yield url_data
+    finally:
+        executor.shutdown(wait=False)
 
 def save_results(results, filename, format_type):
     """Save results to file"""
@@ -248,14 +695,16 @@ def save_results(results, filename, format_type):
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump({
                     'timestamp': time.time(),
-                    'results': results
+                    'cache_hits': as_store(results).cached,
+                    'results': [dict(result) for result in results]
                 }, f, indent=2)
-        elif format_type == 'csv':
-            with open(filename, 'w', encoding='utf-8', newline='') as f:
-                if results:
-                    writer = csv.DictWriter(f, fieldnames=results[0].keys())
-                    writer.writeheader()
-                    writer.writerows(results)
+        elif format_type in STREAM_FORMATS:
+            stream = ResultStream(filename, format_type)
+            try:
+                for result in results:
+                    stream.write(result)
+            finally:
+                stream.close()
         else:  # text
             with open(filename, 'w', encoding='utf-8') as f:
                 for result in results:
@@ -266,55 +715,92 @@ def save_results(results, filename, format_type):
 
 def get_status_color(status):
     """Get color for status"""
-    if 'Accessible' in status or status == 'Reachable':
+    category = status_category(status)
+    if category & ACCESSIBLE:
         return Colors.GREEN
-    elif 'Warning' in status or 'HTTP' in status:
+    elif category & (WARNING | MENTIONS_HTTP):
         return Colors.YELLOW
-    elif status in ['Not Reachable', 'Video Removed', 'Error']:
+    elif category & PROBLEM:
         return Colors.RED
     else:
         return Colors.WHITE
 
 def print_summary(results, total_time):
     """Print test summary"""
+    results = as_store(results)
     total = len(results)
     if total == 0:
         return
     
-    # Count by status
-    accessible = sum(1 for r in results if 'Accessible' in r['status'] or r['status'] == 'Reachable')
-    warnings = sum(1 for r in results if 'Warning' in r['status'])
-    blocked = sum(1 for r in results if r['status'] in ['Not Reachable', 'Video Removed'])
-    errors = sum(1 for r in results if r['status'] == 'Error')
+    # Counts by status are kept by the store as results are added
+    accessible = results.accessible
+    warnings = results.warnings
+    blocked = results.blocked
+    errors = results.errors
+    inferred = results.inferred
+    cache_hits = results.cached
     
     print(f"\n{Colors.BOLD}═══ SUMMARY ═══{Colors.END}")
     print(f"Total URLs tested: {Colors.BOLD}{total}{Colors.END}")
     print(f"Time taken: {Colors.BOLD}{total_time:.1f}s{Colors.END}")
+    total_bytes = results.bytes_transferred
+    if total_bytes:
+        print(f"Network footprint: {Colors.BOLD}{format_bytes(total_bytes)}{Colors.END} "
+              f"(avg {format_bytes(total_bytes / total)} per URL)")
+    if cache_hits > 0:
+        print(f"Cache hits: {Colors.BOLD}{cache_hits}{Colors.END} (reused, not re-tested)")
     print()
     
     if accessible > 0:
-        print(f"{Colors.GREEN}✓ Accessible: {accessible} ({accessible/total*100:.1f}%){Colors.END}")
+        print(f"{Colors.GREEN}✓ Accessible: {accessible} ({results.percent(accessible):.1f}%){Colors.END}")
     if warnings > 0:
-        print(f"{Colors.YELLOW}⚠ Warnings: {warnings} ({warnings/total*100:.1f}%){Colors.END}")
+        print(f"{Colors.YELLOW}⚠ Warnings: {warnings} ({results.percent(warnings):.1f}%){Colors.END}")
     if blocked > 0:
-        print(f"{Colors.RED}✗ Blocked/Unavailable: {blocked} ({blocked/total*100:.1f}%){Colors.END}")
+        print(f"{Colors.RED}✗ Blocked/Unavailable: {blocked} ({results.percent(blocked):.1f}%){Colors.END}")
     if errors > 0:
-        print(f"{Colors.RED}⚠ Errors: {errors} ({errors/total*100:.1f}%){Colors.END}")
+        print(f"{Colors.RED}⚠ Errors: {errors} ({results.percent(errors):.1f}%){Colors.END}")
+    if inferred > 0:
+        print(f"{Colors.YELLOW}  Inferred (not measured): {inferred} - host failed repeatedly, "
+              f"remaining URLs were not tested{Colors.END}")
+    
+    print_phase_times(results)
     
     # Show problematic URLs
-    problem_results = [r for r in results if r['status'] in ['Not Reachable', 'Video Removed', 'Error']]
-    if problem_results and len(problem_results) <= 10:
+    problem_count = results.problems
+    if 0 < problem_count <= 10 and results.keep_rows:
         print(f"\n{Colors.BOLD}Problematic URLs:{Colors.END}")
-        for result in problem_results:
+        for result in results.select(PROBLEM):
             status_color = get_status_color(result['status'])
             display_url = format_url_for_display(result['url'], 60)
-            print(f"  {status_color}✗{Colors.END} {display_url}")
+            marker = " (inferred)" if result.get('inferred') else ""
+            print(f"  {status_color}✗{Colors.END} {display_url}{marker}")
             print(f"    {result['message']}")
-    elif len(problem_results) > 10:
-        print(f"\n{Colors.YELLOW}⚠ {len(problem_results)} problematic URLs found. Use --output to save full results.{Colors.END}")
+    elif problem_count > 0 and not results.keep_rows:
+        print(f"\n{Colors.YELLOW}⚠ {problem_count} problematic URLs found. See the results file for details.{Colors.END}")
+    elif problem_count > 10:
+        print(f"\n{Colors.YELLOW}⚠ {problem_count} problematic URLs found. Use --output to save full results.{Colors.END}")
     
     # Success message
     if blocked == 0 and errors == 0:
         print(f"\n{Colors.GREEN}{Colors.BOLD}🎉 All URLs are accessible!{Colors.END}")
     elif blocked == 0:
         print(f"\n{Colors.YELLOW}✓ All URLs are reachable, but some have warnings{Colors.END}")
+
+def print_phase_times(results):
+    """Print p50/p90/p99 of each request phase measured during the run"""
+    phases = results.phase_percentiles()
+    if not phases:
+        return
+    
+    print(f"\n{Colors.BOLD}Timing (p50 / p90 / p99):{Colors.END}")
+    for field, (count, values) in phases.items():
+        times = ' / '.join(f"{value * 1000:.0f}ms" for value in values)
+        print(f"  {PHASE_LABELS[field]:<11} {times}  ({count} checks)")
+
+def print_pool_stats(pool):
+    """Print keep-alive connection pool statistics"""
+    reused, opened, hit_rate = pool.stats()
+    if reused + opened == 0:
+        return
+    print(f"\n{Colors.CYAN}Connection pool: {reused} reused, {opened} opened "
+          f"({hit_rate:.1f}% hit rate){Colors.END}")
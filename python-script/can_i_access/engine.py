@@ -0,0 +1,115 @@
+"""
+Test engine - run URL accessibility checks concurrently
+"""
+
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .scheduler import lookahead
+
+# Upper bound for -j/--parallel with the thread engine
+MAX_PARALLEL = 100
+
+# How long the dispatcher blocks before re-checking for Ctrl+C. Lock waits
+# are not interruptible on Windows, so never wait forever.
+POLL_INTERVAL = 0.5
+
+def iter_checks(items, check, workers=1, scheduler=None, key=None):
+    """
+    Run check(item) for every item on a pool of worker threads.
+    
+    Only a bounded window of items is in flight at any time, so ``items`` may
+    be a lazy iterator. Yields (index, item, result) tuples in completion
+    order, where index is the item's position in the input.
+    
+    With a Scheduler, key(item) names the item's host and each check starts
+    only once the scheduler allows it (see iter_scheduled).
+    
+    If the consumer stops early (or Ctrl+C arrives while waiting), checks
+    that have not started yet are cancelled and the pool is shut down
+    without blocking on the ones already in flight.
+    """
+    workers = max(1, workers)
+    if scheduler is not None and scheduler.limited:
+        yield from iter_scheduled(items, check, workers, scheduler, key)
+        return
+    window = workers * 2
+    source = enumerate(items)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}
+    
+    def submit(count):
+        for index, item in itertools.islice(source, count):
+            pending[executor.submit(check, item)] = (index, item)
+    
+    try:
+        submit(window)
+        while pending:
+            done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                submit(1)
+                yield index, item, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def iter_scheduled(items, check, workers, scheduler, key):
+    """
+    iter_checks() under a Scheduler's rate and per-host limits.
+    
+    A window of waiting items is read ahead of the running ones. Whenever a
+    worker is free, the first waiting item whose host may start now is
+    submitted, so a host that is held back leaves its items waiting while
+    the workers carry on with other hosts.
+    """
+    source = enumerate(items)
+    waiting = deque()
+    window = lookahead(workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}
+    exhausted = False
+    
+    def run(item, host):
+        try:
+            return check(item)
+        finally:
+            scheduler.finish(host)
+    
+    try:
+        while True:
+            if not exhausted and len(waiting) < window:
+                for index, item in itertools.islice(source, window - len(waiting)):
+                    waiting.append((index, item, key(item)))
+                exhausted = len(waiting) < window
+            
+            # Start waiting items while there are free workers
+            timeout = POLL_INTERVAL
+            while waiting and len(pending) < workers:
+                position, delay = scheduler.start_next(host for _, _, host in waiting)
+                if position is None:
+                    # Nothing may start yet; wake up when something can
+                    if delay is not None:
+                        timeout = min(delay, POLL_INTERVAL)
+                    break
+                index, item, host = waiting[position]
+                del waiting[position]
+                pending[executor.submit(run, item, host)] = (index, item)
+            
+            if not pending:
+                if not waiting:
+                    return
+                time.sleep(timeout)
+                continue
+            
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                yield index, item, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,200 @@
+"""
+Result history - every recorded run in one indexed database for trend queries
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from .cache import cache_dir, normalize_url, LOCK_TIMEOUT
+from .results import status_category, PROBLEM
+
+# Pending checks are written in one transaction once this many accumulate
+FLUSH_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS checks (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    checked_at REAL NOT NULL,
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    up INTEGER NOT NULL,
+    http_status TEXT,
+    response_time REAL,
+    inferred INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS flips (
+    url TEXT NOT NULL,
+    host TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    previous_status TEXT NOT NULL,
+    status TEXT NOT NULL,
+    up INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checks_url ON checks (url, checked_at, up, status);
+CREATE INDEX IF NOT EXISTS checks_host ON checks (host, checked_at, up);
+CREATE INDEX IF NOT EXISTS checks_source ON checks (source, checked_at);
+CREATE INDEX IF NOT EXISTS flips_url ON flips (url, checked_at);
+CREATE INDEX IF NOT EXISTS flips_host ON flips (host, checked_at);
+CREATE INDEX IF NOT EXISTS flips_time ON flips (checked_at);
+"""
+
+def default_history_path():
+    """Per-user history database location"""
+    return os.path.join(cache_dir(), 'history.sqlite')
+
+def history_key(url):
+    """URL and host a result is filed under"""
+    key = normalize_url(url)
+    return key, urlparse(key).hostname or ''
+
+class HistoryStore:
+    """
+    sqlite-backed archive of check results, one row per URL per run.
+    
+    Rows are indexed by URL, host, source and run time, so timelines and
+    uptime over thousands of runs come from index range scans. A result
+    counts as up unless it was blocked, removed or errored; each change
+    between up and down is kept in the flips table as checks are written
+    (runs imported out of order included), so flip queries read no more
+    than the flips themselves. Like
+    ResultCache, writes are batched into short WAL transactions so several
+    runs can record at once. Each store records one run at a time
+    (start_run, record, finish_run).
+    """
+    
+    def __init__(self, path=None):
+        self.path = path or default_history_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._run = None    # (id, started_at, source) of the run being recorded
+        self._recorded = 0
+        self._db = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+    
+    def start_run(self, source, started_at=None):
+        """Register a run; its results are filed under its start time"""
+        started_at = started_at if started_at is not None else time.time()
+        with self._lock:
+            cursor = self._db.execute('INSERT INTO runs (started_at, source) VALUES (?, ?)',
+                                      (started_at, source))
+        self._run = (cursor.lastrowid, started_at, source)
+        self._recorded = 0
+    
+    def record(self, result):
+        """Queue one result of the current run"""
+        run_id, started_at, source = self._run
+        url, host = history_key(result['url'])
+        up = 0 if status_category(result['status']) & PROBLEM else 1
+        self._pending.append((run_id, started_at, url, host, result.get('source') or source,
+                              result['status'], up, str(result.get('http_status', '')),
+                              result.get('response_time'), 1 if result.get('inferred') else 0))
+        self._recorded += 1
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+    
+    def flush(self):
+        """Write queued results in a single transaction"""
+        if not self._pending:
+            return
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                for check in self._pending:
+                    self._insert(check)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        self._pending = []
+    
+    def _insert(self, check):
+        # Store a check and update the flips around it: against the check
+        # before it and, if it landed between two checks, the one after
+        url, host, checked_at, status, up = check[2], check[3], check[1], check[5], check[6]
+        db = self._db
+        before = db.execute('SELECT up, status FROM checks WHERE url = ? AND checked_at < ? '
+                            'ORDER BY checked_at DESC LIMIT 1', (url, checked_at)).fetchone()
+        after = db.execute('SELECT up, status, checked_at FROM checks WHERE url = ? AND checked_at > ? '
+                           'ORDER BY checked_at LIMIT 1', (url, checked_at)).fetchone()
+        db.execute('INSERT INTO checks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', check)
+        if before is not None and before[0] != up:
+            db.execute('INSERT INTO flips VALUES (?, ?, ?, ?, ?, ?)', (url, host, checked_at, before[1], status, up))
+        if after is not None:
+            db.execute('DELETE FROM flips WHERE url = ? AND checked_at = ?', (url, after[2]))
+            if after[0] != up:
+                db.execute('INSERT INTO flips VALUES (?, ?, ?, ?, ?, ?)', (url, host, after[2], status, after[1], after[0]))
+    
+    def finish_run(self):
+        """Write the current run's remaining results and its total"""
+        self.flush()
+        with self._lock:
+            self._db.execute('UPDATE runs SET total = ? WHERE id = ?', (self._recorded, self._run[0]))
+        self._run = None
+    
+    def timeline(self, url, since=0, limit=None):
+        """(checked_at, status, http_status, response_time, inferred, source) for url, newest first"""
+        query = ('SELECT checked_at, status, http_status, response_time, inferred, source FROM checks '
+                 'WHERE url = ? AND checked_at >= ? ORDER BY checked_at DESC, run_id DESC LIMIT ?')
+        with self._lock:
+            return self._db.execute(query, (history_key(url)[0], since, limit or -1)).fetchall()
+    
+    def flips(self, since=0, host=None, url=None):
+        """
+        Checks where a URL went from up to down or back, oldest first.
+        
+        Returns (checked_at, url, previous status, status, up) rows for
+        changes since ``since``, optionally for one host or URL.
+        """
+        where, params = self._scope(since, host, url)
+        query = (f'SELECT checked_at, url, previous_status, status, up FROM flips WHERE {where} '
+                 'ORDER BY checked_at, url')
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+    
+    def uptime(self, since=0, host=None):
+        """(host, checks, up, last checked_at) per host, least available first"""
+        where, params = self._scope(since, host)
+        query = f"""
+            SELECT host, COUNT(*), SUM(up), MAX(checked_at) FROM checks WHERE {where}
+            GROUP BY host ORDER BY 1.0 * SUM(up) / COUNT(*), host
+        """
+        with self._lock:
+            return self._db.execute(query, params).fetchall()
+    
+    def runs(self, limit=20):
+        """(id, started_at, source, total) of recent runs, newest first"""
+        with self._lock:
+            return self._db.execute('SELECT id, started_at, source, total FROM runs '
+                                    'ORDER BY started_at DESC, id DESC LIMIT ?', (limit,)).fetchall()
+    
+    def _scope(self, since, host=None, url=None):
+        where = ['checked_at >= ?']
+        params = [since]
+        if host:
+            where.append('host = ?')
+            params.append(host.lower())
+        if url:
+            where.append('url = ?')
+            params.append(history_key(url)[0])
+        return ' AND '.join(where), params
+    
+    def close(self):
+        """Write queued results and close the database"""
+        try:
+            self.flush()
+        finally:
+            self._db.close()
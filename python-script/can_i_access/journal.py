@@ -0,0 +1,74 @@
+"""
+Checkpoint journal - keep completed results so an interrupted run can resume
+"""
+
+import json
+import os
+
+from .output import FlushedFile
+
+def load_journal(path):
+    """
+    Read completed results from a journal; returns {url: result}.
+    
+    A missing file gives an empty journal. Lines that do not parse, such as
+    a last entry cut short by a crash, are ignored.
+    """
+    completed = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    completed[entry['url']] = entry['result']
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return completed
+
+class Journal:
+    """
+    Append-only file of completed results, one compact JSON object per line.
+    
+    Lines are buffered and flushed to disk at least once a second (see
+    output.FlushedFile), so recording a result costs one in-memory write
+    however fast checks finish.
+    A partial line left by an earlier crash is cut off before appending.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._truncate_partial_line()
+        self._file = FlushedFile(path, 'a', newline='\n')
+    
+    def _truncate_partial_line(self):
+        try:
+            with open(self.path, 'rb+') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size == 0:
+                    return
+                # Walk back to the end of the last complete line
+                position = size
+                while position > 0:
+                    step = min(4096, position)
+                    f.seek(position - step)
+                    chunk = f.read(step)
+                    newline = chunk.rfind(b'\n')
+                    if newline != -1:
+                        position -= step - newline - 1
+                        break
+                    position -= step
+                if position != size:
+                    f.truncate(position)
+        except FileNotFoundError:
+            pass
+    
+    def record(self, url, result):
+        """Append a completed result"""
+        self._file.write(json.dumps({'url': url, 'result': dict(result)}, separators=(',', ':')) + '\n')
+    
+    def close(self):
+        """Flush buffered entries and close the file"""
+        self._file.close()
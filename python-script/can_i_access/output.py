@@ -0,0 +1,90 @@
+"""
+Streaming result output - write each result to disk as soon as it completes
+"""
+
+import csv
+import json
+import threading
+
+from .results import FIELDS, OPTIONAL_FIELDS
+
+# Formats written incrementally during the run
+STREAM_FORMATS = ('jsonl', 'csv')
+
+# Buffered lines are flushed to disk at least this often
+FLUSH_INTERVAL = 1.0
+
+class FlushedFile:
+    """
+    UTF-8 text file whose buffered writes reach disk at least every
+    FLUSH_INTERVAL seconds.
+    
+    A write only goes to the file's buffer, so it costs no system call
+    however fast lines arrive; a daemon thread flushes the buffer on a
+    timer, so lines written just before a quiet stretch (long timeouts, an
+    open circuit) are not left unflushed. Writes may come from any thread.
+    """
+    
+    def __init__(self, path, mode='w', newline='', interval=FLUSH_INTERVAL):
+        self._file = open(path, mode, encoding='utf-8', newline=newline)
+        self._lock = threading.Lock()
+        self._pending = False
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_every, args=(interval,),
+                                         name='flush', daemon=True)
+        self._flusher.start()
+    
+    def write(self, text):
+        with self._lock:
+            self._file.write(text)
+            self._pending = True
+    
+    def _flush_every(self, interval):
+        while not self._closed.wait(interval):
+            with self._lock:
+                # close() may have run since the wait ended
+                if self._pending and not self._closed.is_set():
+                    self._file.flush()
+                    self._pending = False
+    
+    def close(self):
+        """Flush what is buffered and close the file"""
+        self._closed.set()
+        with self._lock:
+            self._file.close()
+        self._flusher.join()
+
+class ResultStream:
+    """
+    Incremental JSONL or CSV writer for check results.
+    
+    Each result is written when it arrives, so memory use does not depend
+    on the number of results and the file can be tailed while the run is in
+    progress. The CSV header is every field a result can have, so it does
+    not depend on which check happens to finish first.
+    """
+    
+    def __init__(self, path, format_type):
+        if format_type not in STREAM_FORMATS:
+            raise ValueError(f"cannot stream format: {format_type}")
+        self.path = path
+        self.format_type = format_type
+        self.count = 0
+        self._file = FlushedFile(path)
+        self._writer = None
+    
+    def write(self, result):
+        """Write one result"""
+        if self.format_type == 'jsonl':
+            self._file.write(json.dumps(dict(result), separators=(',', ':')) + '\n')
+        else:
+            if self._writer is None:
+                self._writer = csv.DictWriter(self._file, fieldnames=FIELDS + OPTIONAL_FIELDS,
+                                              extrasaction='ignore')
+                self._writer.writeheader()
+            self._writer.writerow(dict(result))
+        self.count += 1
+    
+    def close(self):
+        """Flush remaining output and close the file"""
+        self._file.close()
@@ -0,0 +1,301 @@
+"""
+Keep-alive connection pool - reuse TCP+TLS connections to repeated hosts
+"""
+
+import http.client
+import socket
+import ssl
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlparse, urljoin
+
+from . import MAX_REDIRECTS
+from .session import (ConnectTimeout, Response, mark_connected, redirect_loop_error, request_size,
+                      response_header_size)
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_POOL_PER_HOST = 6
+DEFAULT_POOL_IDLE = 30
+
+# Bodies larger than this are not drained; the connection is closed instead
+DRAIN_LIMIT = 64 * 1024
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# Errors meaning a kept-alive connection was closed by the server while idle
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected, http.client.BadStatusLine,
+    ConnectionResetError, ConnectionAbortedError, BrokenPipeError,
+)
+
+class PoolTimeout(Exception):
+    """
+    No connection to a host came free in time.
+    
+    Not an OSError: the wait says nothing about the site, so it is not
+    reported as a site timeout or counted by the circuit breaker and the
+    adaptive timeouts.
+    """
+
+class ConnectionPool:
+    """
+    Thread-safe pool of http.client connections keyed by (scheme, host, port).
+    
+    max_size caps the idle connections kept across all hosts, per_host caps
+    the connections open to one host at a time (extra checks wait for a
+    free one, see PoolTimeout), and idle connections older than idle_timeout are closed.
+    With AdaptiveTimeouts, the time taken to open each connection is
+    recorded for the run's connect deadlines.
+    """
+    
+    def __init__(self, max_size=DEFAULT_POOL_SIZE, per_host=DEFAULT_POOL_PER_HOST,
+                 idle_timeout=DEFAULT_POOL_IDLE, resolver=None, timeouts=None):
+        self.max_size = max_size
+        self.per_host = max(1, per_host)
+        self.idle_timeout = idle_timeout
+        self.resolver = resolver
+        self.timeouts = timeouts
+        self.hits = 0
+        self.misses = 0
+        self._idle = {}      # key -> [(connection, released_at), ...]
+        self._active = {}    # key -> connections currently checked out
+        self._idle_count = 0
+        self._lock = threading.Condition()
+        self._ssl_context = ssl.create_default_context()
+    
+    def _evict_expired(self, now):
+        for key in list(self._idle):
+            fresh = []
+            for conn, released_at in self._idle[key]:
+                if now - released_at > self.idle_timeout:
+                    conn.close()
+                    self._idle_count -= 1
+                else:
+                    fresh.append((conn, released_at))
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+    
+    def _evict_oldest(self):
+        oldest_key = min(self._idle, key=lambda k: self._idle[k][0][1])
+        conn, _ = self._idle[oldest_key].pop(0)
+        conn.close()
+        self._idle_count -= 1
+        if not self._idle[oldest_key]:
+            del self._idle[oldest_key]
+    
+    def acquire(self, scheme, host, port, timeout):
+        """Check out a connection for key; returns (connection, reused)"""
+        key = (scheme, host, port)
+        deadline = time.time() + timeout
+        with self._lock:
+            while self._active.get(key, 0) >= self.per_host:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise PoolTimeout(f"no free connection to {host} within {timeout}s")
+                self._lock.wait(remaining)
+            
+            self._active[key] = self._active.get(key, 0) + 1
+            self._evict_expired(time.time())
+            idle = self._idle.get(key)
+            if idle:
+                conn, _ = idle.pop()
+                self._idle_count -= 1
+                if not idle:
+                    del self._idle[key]
+                self.hits += 1
+                reused = True
+            else:
+                conn = None
+                self.misses += 1
+                reused = False
+        
+        if conn is None:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(host, port, timeout=timeout,
+                                                   context=self._ssl_context)
+            else:
+                conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        else:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        return conn, reused
+    
+    def release(self, scheme, host, port, conn, reusable):
+        """Return a checked-out connection, keeping it for reuse if possible"""
+        key = (scheme, host, port)
+        with self._lock:
+            self._active[key] -= 1
+            if not self._active[key]:
+                del self._active[key]
+            if reusable and conn.sock is not None and self.max_size > 0:
+                if self._idle_count >= self.max_size:
+                    self._evict_oldest()
+                self._idle.setdefault(key, []).append((conn, time.time()))
+                self._idle_count += 1
+            else:
+                conn.close()
+            self._lock.notify_all()
+    
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            for connections in self._idle.values():
+                for conn, _ in connections:
+                    conn.close()
+            self._idle.clear()
+            self._idle_count = 0
+    
+    def stats(self):
+        """Return (reused, opened, hit_rate_percent)"""
+        total = self.hits + self.misses
+        return self.hits, self.misses, (self.hits / total * 100 if total else 0.0)
+    
+    def _connect(self, conn, host, port, tls, timeout, connect_timeout):
+        """
+        Open conn, allowing connect_timeout for the TCP and TLS handshakes.
+        
+        The pool makes the socket itself, through the run's DNS cache, and
+        hands it to conn, so the two handshakes can be timed apart. Returns
+        the phase times ({'connect_time': ..., 'tls_time': ...}).
+        """
+        connect_timeout = min(timeout, connect_timeout or timeout)
+        if self.resolver is not None:
+            create_connection = self.resolver.create_connection
+        else:
+            create_connection = socket.create_connection
+        sock = None
+        started = time.perf_counter()
+        try:
+            sock = create_connection((host, port), connect_timeout)
+            connected = time.perf_counter()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if tls:
+                sock = self._ssl_context.wrap_socket(sock, server_hostname=host)
+        except BaseException as e:
+            if sock is not None:
+                sock.close()
+            if isinstance(e, socket.timeout) and connect_timeout < timeout:
+                raise ConnectTimeout(f"no connection within {connect_timeout}s") from None
+            raise
+        finished = time.perf_counter()
+        sock.settimeout(timeout)
+        conn.sock = sock
+        if self.timeouts is not None:
+            self.timeouts.record_connect(host, finished - started)
+        if tls:
+            return {'connect_time': connected - started, 'tls_time': finished - connected}
+        return {'connect_time': finished - started}
+    
+    def _send(self, method, url, headers, timeout, max_body, connect_timeout=None):
+        parsed = urlparse(url)
+        scheme = parsed.scheme.lower()
+        if scheme not in ('http', 'https') or not parsed.hostname:
+            raise URLError(f"unknown url type: {parsed.scheme}")
+        host = parsed.hostname
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        tls = scheme == 'https'
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        
+        conn, reused = self.acquire(scheme, host, port, timeout)
+        reusable = False
+        connected = conn.sock is not None
+        timings = {}
+        try:
+            try:
+                if not connected:
+                    timings = self._connect(conn, host, port, tls, timeout, connect_timeout)
+                    connected = True
+                conn.request(method, path, headers=headers)
+                sent = time.perf_counter()
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                # The server dropped the idle connection - retry once on a new one
+                conn.close()
+                connected = False
+                timings = self._connect(conn, host, port, tls, timeout, connect_timeout)
+                connected = True
+                conn.request(method, path, headers=headers)
+                sent = time.perf_counter()
+                response = conn.getresponse()
+            timings['first_byte_time'] = time.perf_counter() - sent
+            
+            reusable, body_bytes = self._drain(method, response, max_body)
+            size = (request_size(method, url, headers) + body_bytes +
+                    response_header_size(response.status, response.reason, response.headers))
+            return Response(url, response.status, response.reason, response.headers, size, timings)
+        except (OSError, http.client.HTTPException) as e:
+            if connected:
+                mark_connected(e)
+            if isinstance(e, (socket.timeout, ssl.SSLError)):
+                raise
+            raise URLError(e)
+        finally:
+            self.release(scheme, host, port, conn, reusable)
+    
+    def _drain(self, method, response, max_body):
+        """
+        Read a small body so the connection can carry the next request.
+        
+        Returns (reusable, body_bytes_read). Bodies longer than max_body are
+        not read; the connection is closed instead.
+        """
+        if method == 'HEAD':
+            response.close()
+            return not response.will_close, 0
+        if response.will_close or (response.length is not None and response.length > max_body):
+            response.close()
+            return False, 0
+        body_bytes = len(response.read(max_body))
+        if not response.isclosed():
+            response.close()
+            return False, body_bytes
+        return True, body_bytes
+    
+    def request(self, method, url, headers, timeout, max_body=DRAIN_LIMIT, connect_timeout=None):
+        """
+        Send a request over a pooled connection, following redirects.
+        
+        Mirrors urlopen: returns a Response for 1xx-3xx and raises HTTPError
+        for 4xx/5xx, URLError or socket errors for connection failures. A
+        redirect still pending after MAX_REDIRECTS redirects raises an
+        HTTPError with its 3xx status (a redirect loop). At most max_body
+        bytes of each response body are read. New connections must be set
+        up within connect_timeout, when given.
+        """
+        size = 0
+        timings = {}
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(method, url, headers, timeout, max_body, connect_timeout)
+            size += response.size
+            for field, seconds in response.timings.items():
+                timings[field] = timings.get(field, 0) + seconds
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_CODES or not location:
+                break
+            next_url = urljoin(url, location)
+            if urlparse(next_url).scheme.lower() not in ('http', 'https'):
+                break
+            url = next_url
+            if method != 'HEAD':
+                method = 'GET'
+        else:
+            response.size = size
+            response.timings = timings
+            raise redirect_loop_error(response)
+        
+        response.size = size
+        response.timings = timings
+        if response.status >= 400:
+            error = HTTPError(url, response.status, response.reason, response.headers, None)
+            error.size = size
+            error.timings = timings
+            raise error
+        return response
@@ -0,0 +1,145 @@
+"""
+Run profiling - stage timers, hot functions and peak memory for --profile
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+# Rows of the hot-function tables and of the allocation table
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+
+# Stack frames tracemalloc keeps per allocation
+TRACE_FRAMES = 1
+
+# Before Python 3.12 a cProfile profile only sees the thread that enabled
+# it. From 3.12 one profile sees every thread, and enabling a second one
+# raises ValueError.
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+# The profiler of the current run, if --profile was given
+_active = None
+
+def stage(name):
+    """
+    Mark the start of a stage of the command (load, test, save, ...).
+    
+    The previous stage ends here; None ends it without starting another.
+    Does nothing unless a profiler is running.
+    """
+    if _active is not None:
+        _active.mark(name)
+
+class Profiler:
+    """
+    cProfile and tracemalloc over one command, plus wall-clock stage timers.
+    
+    Work done on engine worker threads is counted too: before Python 3.12
+    every thread started while the profiler runs gets its own cProfile
+    profile, and the profiles are merged into one table. That includes the async engine, whose event
+    loop runs on a thread of its own, and the executor threads it hands DNS
+    lookups and input reading to. Stages are marked with stage() as the
+    command moves on, and each stage's time is the sum of every span it
+    was active.
+    """
+    
+    def __init__(self):
+        self.stages = {}
+        self._current = None
+        self._stage_started = None
+        self._profiles = []
+        self._lock = threading.Lock()
+        self.started = None
+        self.elapsed = None
+        self.peak_memory = None
+        self.snapshot = None
+    
+    def mark(self, name):
+        now = time.perf_counter()
+        if self._current is not None:
+            self.stages[self._current] = self.stages.get(self._current, 0.0) + now - self._stage_started
+        self._current = name
+        self._stage_started = now
+    
+    def _profile_thread(self, *_):
+        # Called once in each new thread: give it a profile of its own,
+        # which replaces this hook as the thread's profile function
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+    
+    def start(self):
+        global _active
+        tracemalloc.start(TRACE_FRAMES)
+        if PER_THREAD_PROFILES:
+            threading.setprofile(self._profile_thread)
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        self.started = time.perf_counter()
+        _active = self
+        profile.enable()
+    
+    def stop(self):
+        global _active
+        main_profile = self._profiles[0]
+        main_profile.disable()
+        if PER_THREAD_PROFILES:
+            threading.setprofile(None)
+        self.mark(None)
+        self.elapsed = time.perf_counter() - self.started
+        _active = None
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        self.snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        tracemalloc.stop()
+    
+    def statistics(self):
+        """Merged pstats.Stats of every profiled thread"""
+        stats = None
+        with self._lock:
+            profiles = list(self._profiles)
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # A thread that ended before calling any Python function
+                continue
+        return stats
+    
+    def write_report(self, out, command):
+        """Write stage times, peak memory and the hot-function tables to out"""
+        out.write(f"can-i-access profile: {command}\n")
+        out.write(f"Python {sys.version.split()[0]} on {sys.platform}, "
+                  f"{time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        
+        out.write(f"Stages (wall clock, total {self.elapsed:.3f}s)\n")
+        for name, seconds in self.stages.items():
+            share = seconds / self.elapsed * 100 if self.elapsed else 0.0
+            out.write(f"  {name:<10} {seconds:9.3f}s  {share:5.1f}%\n")
+        out.write("\n")
+        
+        out.write(f"Peak traced memory: {self.peak_memory / (1024 * 1024):.1f} MB\n")
+        out.write(f"Largest allocations still held at the end, by line (top {TOP_ALLOCATIONS})\n")
+        for statistic in self.snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            out.write(f"  {statistic}\n")
+        out.write("\n")
+        
+        stats = self.statistics()
+        if stats is None:
+            return
+        threads = f"{len(self._profiles)} threads profiled" if PER_THREAD_PROFILES else "all threads profiled"
+        for sort_key, title in (('cumulative', 'cumulative time'), ('tottime', 'own time')):
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+            out.write(f"Hot functions by {title} ({threads})\n")
+            out.write(buffer.getvalue().lstrip('\n'))
+            out.write("\n")
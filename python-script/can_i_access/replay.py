@@ -0,0 +1,245 @@
+"""
+Record and replay - save a run's raw network outcomes and check them again offline
+"""
+
+import http.client
+import json
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlparse
+
+from .output import FlushedFile
+from .results import add_phase_times
+from .session import CheckSession, ConnectTimeout, Response, mark_connected
+
+# Version of the outcomes file layout
+OUTCOMES_VERSION = 1
+
+# Exceptions rebuilt by name on replay; the check classifies errors by type
+ERROR_TYPES = {cls.__name__: cls for cls in (
+    URLError, ConnectTimeout, socket.timeout, socket.gaierror, socket.herror,
+    ssl.SSLError, ssl.SSLEOFError, ssl.SSLZeroReturnError,
+    # Python 3.6 has no separate certificate error
+    getattr(ssl, 'SSLCertVerificationError', ssl.SSLError),
+    ConnectionError, ConnectionRefusedError, ConnectionResetError, ConnectionAbortedError,
+    BrokenPipeError, http.client.RemoteDisconnected, http.client.HTTPException,
+    OSError, ValueError,
+)}
+
+class RecordedError(Exception):
+    """Stand-in on replay for an exception type not in ERROR_TYPES"""
+
+class OutcomesFileError(ValueError):
+    """The file is not an outcomes file that can be replayed"""
+
+def describe_error(error):
+    """JSON description of an exception raised by a network operation"""
+    described = {'type': type(error).__name__}
+    if isinstance(error, URLError) and isinstance(error.reason, BaseException):
+        described['reason'] = describe_error(error.reason)
+    elif error.args and all(isinstance(arg, (str, int, float)) or arg is None for arg in error.args):
+        described['args'] = list(error.args)
+    else:
+        described['args'] = [str(error)]
+    if isinstance(error, OSError) and type(error).__name__ not in ERROR_TYPES:
+        described['os_error'] = True
+    if getattr(error, 'connected', False):
+        described['connected'] = True
+    return described
+
+def rebuild_error(described):
+    """The exception described by describe_error()"""
+    cls = ERROR_TYPES.get(described['type'])
+    if cls is None:
+        cls = OSError if described.get('os_error') else RecordedError
+    if 'reason' in described:
+        error = cls(rebuild_error(described['reason']))
+    else:
+        try:
+            error = cls(*described.get('args', ()))
+        except TypeError:
+            error = cls(*[str(arg) for arg in described.get('args', ())][:1])
+    if described.get('connected'):
+        mark_connected(error)
+    return error
+
+def describe_response(response):
+    """JSON description of a Response"""
+    return {
+        'url': response.url,
+        'status': response.status,
+        'reason': response.reason,
+        'headers': list(response.headers.items()) if response.headers else [],
+        'size': response.size,
+        'timings': response.timings,
+    }
+
+def rebuild_response(described):
+    """The Response described by describe_response()"""
+    return Response(described['url'], described['status'], described['reason'], dict(described['headers']),
+                    described['size'], described['timings'])
+
+class OutcomeRecorder:
+    """
+    Writes the raw outcome of every network operation of a run to a file.
+    
+    The file is JSON lines: a header with the settings the run was made
+    with, then one [operation, key, seconds, outcome] entry per DNS lookup,
+    connection, request, adaptive deadline or circuit breaker decision, in
+    the order they happened. An outcome is {"value": ...} or, for a raised
+    exception, {"error": ...}. Lines are buffered like the journal's.
+    """
+    
+    def __init__(self, path, settings):
+        self.path = path
+        self._file = FlushedFile(path, newline='\n')
+        self._write({'outcomes': OUTCOMES_VERSION, 'recorded_at': time.time(), 'settings': settings})
+    
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+    
+    def record(self, operation, key, seconds, value):
+        """Record an operation that returned value (a Response or JSON data)"""
+        if isinstance(value, Response):
+            value = describe_response(value)
+        self._write([operation, key, round(seconds, 6), {'value': value}])
+    
+    def record_error(self, operation, key, seconds, error):
+        """Record an operation that raised error"""
+        if isinstance(error, HTTPError):
+            # Statuses are outcomes like any other; replay raises them again.
+            # filename is the URL: Python 3.6 has no url on an HTTPError
+            # raised without a body, such as a redirect loop's
+            self.record(operation, key, seconds, {
+                'url': error.filename, 'status': error.code, 'reason': error.reason,
+                'headers': list(error.headers.items()) if error.headers else [],
+                'size': getattr(error, 'size', 0), 'timings': getattr(error, 'timings', None),
+                'raised': True,
+            })
+            return
+        if isinstance(error, OSError) and not isinstance(error, (URLError, socket.timeout, socket.gaierror,
+                                                                 ssl.SSLError)):
+            # The async engine raises socket errors as they are; store them
+            # wrapped the way urlopen and the pool report them
+            error = URLError(error)
+        self._write([operation, key, round(seconds, 6), {'error': describe_error(error)}])
+    
+    def close(self):
+        """Flush buffered outcomes and close the file"""
+        self._file.close()
+
+def load_outcomes(path):
+    """
+    Read an outcomes file; returns (settings, {(operation, key): deque of
+    (seconds, outcome)}).
+    
+    A last line cut short by an interrupted run is ignored.
+    """
+    outcomes = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('outcomes') != OUTCOMES_VERSION:
+            raise OutcomesFileError(f"{path} is not a recorded outcomes file")
+        
+        loads = json.loads
+        for line in f:
+            try:
+                operation, key, seconds, outcome = loads(line)
+            except ValueError:
+                if not line.endswith('\n'):
+                    break
+                raise OutcomesFileError(f"{path}: unreadable entry: {line[:80]}") from None
+            entries = outcomes.get((operation, key))
+            if entries is None:
+                entries = outcomes[(operation, key)] = deque()
+            entries.append((seconds, outcome))
+    return header.get('settings', {}), outcomes
+
+class ReplaySession(CheckSession):
+    """
+    A CheckSession whose network operations return recorded outcomes.
+    
+    Each operation takes the next outcome recorded for it (the same
+    request made twice gets the second outcome the second time, and the
+    last one after that), so the classification in check_url_accessibility
+    runs exactly as it did when the outcomes were recorded, with no
+    network at all. An operation with nothing recorded fails with a
+    URLError. check_time() is the recorded time of the operations replayed
+    since start_check(), so results keep the response times measured when
+    recording.
+    
+    Outcomes for one operation are handed out in the order operations
+    ask for them, not by which check asks. A URL listed more than once only
+    gets its own outcomes back when checks run one at a time, in input
+    order, as the test command's replay does; with several threads the
+    duplicates may swap outcomes between runs.
+    """
+    
+    def __init__(self, outcomes, **settings):
+        super().__init__(**settings)
+        self._outcomes = outcomes
+        self._failures = {}
+        self._clock = threading.local()
+    
+    def _next(self, operation, key):
+        entries = self._outcomes.get((operation, key))
+        if not entries:
+            raise URLError(f"no recorded outcome for {operation} {key}")
+        seconds, outcome = entries.popleft() if len(entries) > 1 else entries[0]
+        self._clock.seconds = getattr(self._clock, 'seconds', 0.0) + seconds
+        if 'error' in outcome:
+            raise rebuild_error(outcome['error'])
+        return outcome['value']
+    
+    def start_check(self):
+        """Start timing a check from zero"""
+        self._clock.seconds = 0.0
+    
+    def check_time(self):
+        """Recorded seconds of the operations replayed since start_check()"""
+        return getattr(self._clock, 'seconds', 0.0)
+    
+    def circuit_open(self, url):
+        if ('circuit', url) not in self._outcomes:
+            return False
+        self._failures[urlparse(url).hostname] = self._next('circuit', url)
+        return True
+    
+    def circuit_failures(self, host):
+        return self._failures.get(host, 0)
+    
+    def deadlines(self, url, timeout):
+        if ('deadlines', url) not in self._outcomes:
+            return timeout, None
+        return tuple(self._next('deadlines', url))
+    
+    def resolve(self, url):
+        host = urlparse(url).hostname
+        if not host or ('resolve', host.lower()) not in self._outcomes:
+            return None
+        return self._next('resolve', host.lower())
+    
+    def lookup(self, host):
+        return self._next('lookup', host.lower())
+    
+    def handshake(self, host, port, tls, timeout, connect_timeout=None):
+        return self._next('connect', f"{host} {port} {'tls' if tls else 'tcp'}")
+    
+    def request(self, method, url, headers, timeout, max_body=None, result=None, connect_timeout=None):
+        described = self._next('request', f"{method} {url}")
+        response = rebuild_response(described)
+        if result is not None:
+            result['bytes_transferred'] += response.size
+            if response.timings:
+                add_phase_times(result, response.timings)
+        # Redirect loops were raised with their 3xx status
+        if response.status >= 400 or described.get('raised'):
+            raise HTTPError(response.url, response.status, response.reason, response.headers, None)
+        return response
@@ -0,0 +1,159 @@
+"""
+DNS resolver cache - resolve every host once per run
+"""
+
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_DNS_TTL = 300
+
+# Failed lookups are remembered for at most this long
+NEGATIVE_DNS_TTL = 60
+
+# Concurrent lookups during the pre-resolution stage
+DNS_WORKERS = 32
+
+def is_ip_address(host):
+    """True if host is an IPv4 or IPv6 literal"""
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+class Resolver:
+    """
+    Thread-safe, TTL-bounded cache of getaddrinfo() results.
+    
+    Successful lookups are kept for ``ttl`` seconds and failures for at most
+    NEGATIVE_DNS_TTL, so a host that fails DNS once is classified straight
+    away for the rest of the run. Concurrent lookups of one host share a
+    single query.
+    """
+    
+    def __init__(self, ttl=DEFAULT_DNS_TTL):
+        self.ttl = ttl
+        self.lookups = 0
+        self.hits = 0
+        self._cache = {}      # host -> (expires_at, addresses or the lookup's error, seconds taken)
+        self._pending = {}    # host -> threading.Event for lookups in progress
+        self._lock = threading.Lock()
+    
+    def resolve(self, host, port=None):
+        """
+        Return the cached (family, sockaddr) list for host.
+        
+        Raises socket.gaierror if the host does not resolve, or the error
+        getaddrinfo() raised for a name it cannot look up at all (such as
+        UnicodeError for an over-long label).
+        """
+        if is_ip_address(host):
+            family = socket.AF_INET6 if ':' in host else socket.AF_INET
+            return [(family, (host, port))]
+        
+        host = host.lower()
+        while True:
+            with self._lock:
+                entry = self._cache.get(host)
+                if entry is not None and entry[0] > time.time():
+                    self.hits += 1
+                    break
+                event = self._pending.get(host)
+                if event is None:
+                    event = self._pending[host] = threading.Event()
+                    self.lookups += 1
+                    owner = True
+                else:
+                    owner = False
+            if owner:
+                # Waiting threads are released however the lookup ends
+                try:
+                    entry = self._lookup(host)
+                    with self._lock:
+                        self._cache[host] = entry
+                finally:
+                    with self._lock:
+                        del self._pending[host]
+                    event.set()
+                break
+            event.wait()
+        
+        addresses = entry[1]
+        if isinstance(addresses, socket.gaierror):
+            raise socket.gaierror(addresses.errno, addresses.strerror)
+        if isinstance(addresses, Exception):
+            raise type(addresses)(*addresses.args)
+        return [(family, (sockaddr[0], port) + tuple(sockaddr[2:]))
+                for family, sockaddr in addresses]
+    
+    def is_cached(self, host):
+        """True if resolve(host) can answer from the cache, without a lookup"""
+        if is_ip_address(host):
+            return True
+        with self._lock:
+            entry = self._cache.get(host.lower())
+            return entry is not None and entry[0] > time.time()
+    
+    def lookup_time(self, host):
+        """Seconds the cached lookup of host took (None if not looked up)"""
+        if is_ip_address(host):
+            return None
+        entry = self._cache.get(host.lower())
+        return entry[2] if entry is not None else None
+    
+    def _lookup(self, host):
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except Exception as e:
+            # Failures are cached like any answer, so every check of the
+            # host fails the same way without asking again
+            return time.time() + min(self.ttl, NEGATIVE_DNS_TTL), e, time.perf_counter() - started
+        addresses = []
+        for family, _, _, _, sockaddr in infos:
+            if (family, sockaddr) not in addresses:
+                addresses.append((family, sockaddr))
+        return time.time() + self.ttl, addresses, time.perf_counter() - started
+    
+    def prefetch(self, hosts, workers=DNS_WORKERS):
+        """Resolve hosts concurrently into the cache; returns the failed hosts"""
+        hosts = sorted(set(h.lower() for h in hosts if h and not is_ip_address(h)))
+        if not hosts:
+            return []
+        
+        def attempt(host):
+            try:
+                self.resolve(host)
+                return None
+            except Exception:
+                return host
+        
+        with ThreadPoolExecutor(max_workers=min(workers, len(hosts))) as executor:
+            return [host for host in executor.map(attempt, hosts) if host]
+    
+    def create_connection(self, address, timeout=None, source_address=None):
+        """
+        socket.create_connection() replacement that uses cached addresses.
+        
+        Addresses are tried in resolver order until one connects.
+        """
+        host, port = address
+        last_error = None
+        for family, sockaddr in self.resolve(host, port):
+            sock = None
+            try:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                if timeout is not None:
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                last_error = e
+                if sock is not None:
+                    sock.close()
+        raise last_error or OSError(f"no addresses for {host}")
@@ -0,0 +1,211 @@
+"""
+Saved result files - read results incrementally from JSON and JSONL
+"""
+
+import json
+import re
+
+# Characters read from the file at a time
+READ_SIZE = 64 * 1024
+
+# Files with these extensions are read as one result per line
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+# Longest first line examined when telling JSONL from a JSON document
+SNIFF_LINE_LIMIT = 1024 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class ResultFileError(ValueError):
+    """The file is not a results file that can be read"""
+
+class ResultFile:
+    """
+    Results saved by the test command, read a few at a time.
+    
+    Handles JSONL (one result per line) and the JSON layout written by
+    --format json ({"timestamp": ..., "results": [...]}, or a bare list).
+    Iterating reads the file from the start, so it can be passed over more
+    than once, and only one result is held in memory at a time however
+    large the file is. ``timestamp`` is set once it has been read.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.timestamp = None
+        with open(path, 'r', encoding='utf-8') as f:
+            self.jsonl = self._is_jsonl(f)
+    
+    def _is_jsonl(self, f):
+        if self.path.lower().endswith(JSONL_EXTENSIONS):
+            return True
+        scanner = _Scanner(f)
+        if scanner.peek() != '{':
+            return False
+        # A JSON document's first line is rarely a whole object; a JSONL
+        # file's first line is always one result
+        f.seek(0)
+        line = f.readline(SNIFF_LINE_LIMIT)
+        try:
+            first = json.loads(line)
+        except ValueError:
+            return False
+        return isinstance(first, dict) and 'results' not in first
+    
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if self.jsonl:
+                yield from self._iter_lines(f)
+            else:
+                yield from self._iter_document(_Scanner(f))
+    
+    def _iter_lines(self, f):
+        line_number = 0
+        for line in f:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except ValueError as e:
+                # A last line cut short by an interrupted run is skipped
+                if not line.endswith('\n'):
+                    return
+                raise ResultFileError(f"line {line_number}: {e}") from None
+            yield check_result(result)
+    
+    def _iter_document(self, scanner):
+        first = scanner.peek()
+        if first == '[':
+            yield from scanner.array()
+            return
+        if first != '{':
+            raise ResultFileError(scanner.error("expected '{' or '['"))
+        
+        scanner.advance()
+        if scanner.peek() == '}':
+            return
+        while True:
+            key = scanner.value()
+            if not isinstance(key, str):
+                raise ResultFileError(scanner.error("expected a property name"))
+            scanner.expect(':')
+            if key == 'results' and scanner.peek() == '[':
+                yield from scanner.array()
+            else:
+                value = scanner.value()
+                if key == 'timestamp':
+                    self.timestamp = value
+            if scanner.peek() == ',':
+                scanner.advance()
+            else:
+                scanner.expect('}')
+                return
+
+class _Scanner:
+    """Pull-style reader of JSON values from a text file"""
+    
+    def __init__(self, f):
+        self._file = f
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._offset = 0    # characters dropped from the front of the buffer
+        self._eof = False
+    
+    def _fill(self):
+        """Read more of the file; False at end of file"""
+        if self._eof:
+            return False
+        # Read at least as much as is buffered, so a value larger than
+        # READ_SIZE takes a few reads rather than one per READ_SIZE
+        chunk = self._file.read(max(READ_SIZE, len(self._buffer) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._offset += self._pos
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+    
+    def error(self, message):
+        return f"{message} at character {self._offset + self._pos}"
+    
+    def peek(self):
+        """Next non-whitespace character ('' at end of file)"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+    
+    def advance(self):
+        self._pos += 1
+    
+    def expect(self, char):
+        if self.peek() != char:
+            raise ResultFileError(self.error(f"expected '{char}'"))
+        self._pos += 1
+    
+    def value(self):
+        """Decode the next value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise ResultFileError(self.error(e.msg)) from None
+            # A number at the end of the buffer may continue in the next read
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+    
+    def array(self):
+        """Yield the items of the array starting at the next character"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.advance()
+            return
+        scan = self._decoder.scan_once
+        skip = _WHITESPACE.match
+        while True:
+            # Fast path: items that lie wholly inside the buffer, along with
+            # the separator after them
+            buffer = self._buffer
+            size = len(buffer)
+            while True:
+                try:
+                    item, end = scan(buffer, self._pos)
+                except (StopIteration, ValueError):
+                    break
+                end = skip(buffer, end).end()
+                if end >= size:
+                    break
+                if buffer[end] == ']':
+                    self._pos = end + 1
+                    yield check_result(item)
+                    return
+                if buffer[end] != ',':
+                    self._pos = end
+                    raise ResultFileError(self.error("expected ',' or ']'"))
+                self._pos = skip(buffer, end + 1).end()
+                yield check_result(item)
+            
+            # An item running past the end of the buffer
+            yield check_result(self.value())
+            if self.peek() == ',':
+                self.advance()
+                self.peek()
+            else:
+                self.expect(']')
+                return
+
+def check_result(result):
+    """Return result if it looks like a saved check result"""
+    if not isinstance(result, dict) or 'status' not in result:
+        raise ResultFileError(f"not a check result: {str(result)[:80]}")
+    return result
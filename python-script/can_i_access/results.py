@@ -0,0 +1,292 @@
+"""
+Result records - compact per-URL results and the result store
+"""
+
+import sys
+from array import array
+
+# Fields every result has, in output order
+FIELDS = (
+    'url', 'final_url', 'status', 'http_status', 'message', 'method',
+    'is_http_only', 'https_upgraded', 'is_youtube', 'video_available',
+    'response_time', 'site_name', 'unit', 'importance', 'pii_required',
+    'inferred', 'cached', 'bytes_transferred',
+)
+
+# Seconds spent in each phase of a check: the host's DNS lookup, then
+# summed over the check's requests, opening TCP connections, TLS
+# handshakes and waiting for the first byte of each response
+PHASE_FIELDS = ('dns_time', 'connect_time', 'tls_time', 'first_byte_time')
+PHASE_LABELS = {'dns_time': 'DNS', 'connect_time': 'Connect', 'tls_time': 'TLS',
+                'first_byte_time': 'First byte'}
+
+# Fields only present once they are set (source is added by the test command,
+# timeout and connect_timeout once a check has made a request, and each
+# phase time once that phase has been measured)
+OPTIONAL_FIELDS = ('source', 'timeout', 'connect_timeout') + PHASE_FIELDS
+
+# Text fields that repeat across results; each distinct value is stored once
+INTERNED_FIELDS = frozenset(('status', 'message', 'method', 'site_name', 'unit', 'source'))
+
+_SLOTS = frozenset(FIELDS + OPTIONAL_FIELDS)
+
+class CheckResult:
+    """
+    One URL's check result.
+    
+    Values live in __slots__ rather than a per-result dict, and repeated
+    strings such as statuses and messages are interned, so a million
+    results take a fraction of the memory. It still reads and writes like
+    the result dicts it replaces (result['status'], get(), items(), ...);
+    dict(result) gives the exact dict/JSON shape at serialization time.
+    Keys outside FIELDS are kept in a small overflow dict.
+    """
+    
+    __slots__ = FIELDS + OPTIONAL_FIELDS + ('_extra',)
+    
+    def __init__(self, url):
+        self.url = url
+        self.final_url = url
+        self.status = 'Error'
+        self.http_status = 'N/A'
+        self.message = 'Unknown error'
+        self.method = 'Unknown'
+        self.is_http_only = False
+        self.https_upgraded = False
+        self.is_youtube = False
+        self.video_available = None
+        self.response_time = 0
+        self.site_name = ''
+        self.unit = ''
+        self.importance = 0
+        self.pii_required = False
+        self.inferred = False
+        self.cached = False
+        self.bytes_transferred = 0
+        self._extra = None
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a result from its dict form (e.g. a journal entry)"""
+        result = cls(data.get('url', ''))
+        result.update(data)
+        return result
+    
+    def __getitem__(self, key):
+        if key in _SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key in INTERNED_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        if key in _SLOTS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        keys = list(FIELDS)
+        keys.extend(key for key in OPTIONAL_FIELDS if hasattr(self, key))
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+    
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+    
+    def update(self, other=(), **kwargs):
+        pairs = other.items() if hasattr(other, 'items') else other
+        for key, value in pairs:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+    
+    def __iter__(self):
+        return iter(self.keys())
+    
+    def __len__(self):
+        return len(self.keys())
+    
+    def __eq__(self, other):
+        if isinstance(other, (CheckResult, dict)):
+            return dict(self) == dict(other)
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"CheckResult({dict(self)!r})"
+
+# Status category bits; one status can fall into several
+ACCESSIBLE = 1
+WARNING = 2
+MENTIONS_HTTP = 4
+BLOCKED = 8
+ERROR = 16
+
+# Results that count as failures for the summary and exit status
+PROBLEM = BLOCKED | ERROR
+
+# Categories selected by each --filter choice
+FILTER_CATEGORIES = {
+    'blocked': BLOCKED,
+    'accessible': ACCESSIBLE,
+    'warnings': WARNING | MENTIONS_HTTP,
+}
+
+_status_categories = {}
+
+def status_category(status):
+    """Category bits of a status string, worked out once per distinct status"""
+    category = _status_categories.get(status)
+    if category is None:
+        category = 0
+        if 'Accessible' in status or status == 'Reachable':
+            category |= ACCESSIBLE
+        if 'Warning' in status:
+            category |= WARNING
+        if 'HTTP' in status:
+            category |= MENTIONS_HTTP
+        if status in ('Not Reachable', 'Video Removed'):
+            category |= BLOCKED
+        if status == 'Error':
+            category |= ERROR
+        _status_categories[status] = category
+    return category
+
+def add_phase_times(result, times):
+    """Add a request's {phase field: seconds} to the result's phase times"""
+    for field, seconds in times.items():
+        result[field] = result.get(field, 0) + seconds
+
+def percentile(ordered, fraction):
+    """Value at fraction (0-1) of an already sorted sequence"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class ResultStore:
+    """
+    Results with a status category column and running totals.
+    
+    Each appended result's category is stored in a byte array alongside
+    the rows, and the summary counts are updated as results arrive, so
+    summaries need no pass over the rows and filters only compare bits.
+    Phase times of results measured in this run (not cached) are kept in
+    float arrays for phase_percentiles(). Works with CheckResult records
+    and plain result dicts alike. With keep_rows=False only the totals and
+    phase times are kept, for results too many to hold.
+    """
+    
+    def __init__(self, results=(), keep_rows=True):
+        self.keep_rows = keep_rows
+        self.count = 0
+        self.rows = []
+        self.categories = array('B')
+        self.accessible = 0
+        self.warnings = 0
+        self.blocked = 0
+        self.errors = 0
+        self.inferred = 0
+        self.cached = 0
+        self.pii_required = 0
+        self.high_priority = 0
+        self.bytes_transferred = 0
+        self.phase_times = {field: array('f') for field in PHASE_FIELDS}
+        for result in results:
+            self.append(result)
+    
+    def append(self, result):
+        """Add a result and update the totals"""
+        category = status_category(result['status'])
+        self.count += 1
+        if self.keep_rows:
+            self.rows.append(result)
+            self.categories.append(category)
+        if category & ACCESSIBLE:
+            self.accessible += 1
+        if category & WARNING:
+            self.warnings += 1
+        if category & BLOCKED:
+            self.blocked += 1
+        if category & ERROR:
+            self.errors += 1
+        if result.get('inferred'):
+            self.inferred += 1
+        if result.get('cached'):
+            self.cached += 1
+        if result.get('pii_required', False):
+            self.pii_required += 1
+        if result.get('importance', 0) > 50:
+            self.high_priority += 1
+        self.bytes_transferred += result.get('bytes_transferred', 0)
+        if not result.get('cached'):
+            for field in PHASE_FIELDS:
+                seconds = result.get(field)
+                if seconds is not None:
+                    self.phase_times[field].append(seconds)
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    @property
+    def problems(self):
+        """Number of blocked, removed and errored results"""
+        return self.blocked + self.errors
+    
+    def percent(self, count):
+        """count as a percentage of all results"""
+        return count / self.count * 100 if self.count else 0.0
+    
+    def phase_percentiles(self, fractions=(0.5, 0.9, 0.99)):
+        """
+        {phase field: (count, [seconds at each fraction])} for the phases
+        measured in at least one result, in PHASE_FIELDS order
+        """
+        summary = {}
+        for field in PHASE_FIELDS:
+            times = self.phase_times[field]
+            if times:
+                ordered = sorted(times)
+                summary[field] = (len(ordered), [percentile(ordered, f) for f in fractions])
+        return summary
+    
+    def select(self, categories):
+        """Rows whose status falls in any of the category bits"""
+        return [row for row, category in zip(self.rows, self.categories) if category & categories]
+    
+    def filter(self, filter_type):
+        """A new store with the rows matching a --filter choice ('all' keeps every row)"""
+        if filter_type not in FILTER_CATEGORIES:
+            return self
+        return ResultStore(self.select(FILTER_CATEGORIES[filter_type]))
+
+def matches_filter(result, filter_type):
+    """True if a result is kept by a --filter choice"""
+    if filter_type not in FILTER_CATEGORIES:
+        return True
+    return bool(status_category(result['status']) & FILTER_CATEGORIES[filter_type])
+
+def as_store(results):
+    """Wrap a list of results in a ResultStore (stores are returned as-is)"""
+    return results if isinstance(results, ResultStore) else ResultStore(results)
@@ -0,0 +1,122 @@
+"""
+Check scheduler - global and per-host rate limits that keep workers busy
+"""
+
+import threading
+import time
+
+DEFAULT_HOST_CONCURRENCY = 6
+
+# Checks read ahead of the ones running, so a held-back host's URLs can be
+# passed over for URLs on other hosts
+LOOKAHEAD_PER_WORKER = 4
+MIN_LOOKAHEAD = 64
+
+def lookahead(workers):
+    """How many waiting checks an engine with this many workers keeps"""
+    return max(MIN_LOOKAHEAD, workers * LOOKAHEAD_PER_WORKER)
+
+class TokenBucket:
+    """
+    ``rate`` tokens per second, holding at most ``burst``.
+    
+    Starts full, so a run may begin with a burst of up to ``burst`` checks.
+    """
+    
+    def __init__(self, rate, burst=None, now=0.0):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = now
+    
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is now)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+    
+    def take(self):
+        self.tokens -= 1
+
+class Scheduler:
+    """
+    Decides which waiting check may start next.
+    
+    ``rate`` caps checks started per second across the run, ``host_rate``
+    per host, and ``host_concurrency`` how many checks on one host run at
+    once (0 disables any of them). Engines keep a window of waiting checks
+    and ask start_next() for the first one allowed to start, so a host that
+    is held back never leaves a worker idle while other hosts have work.
+    """
+    
+    def __init__(self, rate=0, host_rate=0, host_concurrency=DEFAULT_HOST_CONCURRENCY, clock=time.monotonic):
+        self.rate = rate
+        self.host_rate = host_rate
+        self.host_concurrency = host_concurrency
+        self.clock = clock
+        self.held_back = 0
+        self._bucket = TokenBucket(rate, now=clock()) if rate > 0 else None
+        self._host_buckets = {}
+        self._active = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def limited(self):
+        """True if any limit is set"""
+        return self.rate > 0 or self.host_rate > 0 or self.host_concurrency > 0
+    
+    def _host_wait(self, host, now):
+        # None: the host is at its concurrency cap until a check finishes
+        if self.host_concurrency > 0 and self._active.get(host, 0) >= self.host_concurrency:
+            return None
+        if self.host_rate <= 0:
+            return 0.0
+        bucket = self._host_buckets.get(host)
+        if bucket is None:
+            bucket = self._host_buckets[host] = TokenBucket(self.host_rate, now=now)
+        return bucket.wait_time(now)
+    
+    def start_next(self, hosts):
+        """
+        Reserve a start for the first of ``hosts`` that may start now.
+        
+        Returns (position, 0.0) for the chosen host, whose check must call
+        finish() when it is done, or (None, delay) when none may start:
+        delay is how long until one could (None if only a finishing check
+        can free a slot).
+        """
+        with self._lock:
+            now = self.clock()
+            if self._bucket is not None:
+                delay = self._bucket.wait_time(now)
+                if delay > 0:
+                    return None, delay
+            
+            soonest = None
+            passed_over = set()
+            for position, host in enumerate(hosts):
+                if host in passed_over:
+                    continue
+                delay = self._host_wait(host, now)
+                if delay == 0:
+                    if self._bucket is not None:
+                        self._bucket.take()
+                    if self.host_rate > 0:
+                        self._host_buckets[host].take()
+                    self._active[host] = self._active.get(host, 0) + 1
+                    if position:
+                        self.held_back += 1
+                    return position, 0.0
+                passed_over.add(host)
+                if delay is not None and (soonest is None or delay < soonest):
+                    soonest = delay
+            return None, soonest
+    
+    def finish(self, host):
+        """Release the host slot taken by start_next()"""
+        with self._lock:
+            remaining = self._active.get(host, 0) - 1
+            if remaining > 0:
+                self._active[host] = remaining
+            else:
+                self._active.pop(host, None)
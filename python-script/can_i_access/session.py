@@ -0,0 +1,349 @@
+"""
+Check sessions - state shared by every check in one run
+"""
+
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen, Request, getproxies, proxy_bypass
+
+from .resolver import is_ip_address
+from .results import add_phase_times
+
+# Default threads for background work such as the HTTP side of --race-https;
+# runs size this from their concurrency (helper_threads)
+HELPER_THREADS = 8
+
+class ConnectTimeout(socket.timeout):
+    """No connection (TCP and TLS) within the connect deadline"""
+
+def mark_connected(error):
+    """
+    Mark a network error as raised on an established connection, after the
+    TCP and TLS handshakes (see is_connection_failure); returns error
+    """
+    error.connected = True
+    return error
+
+class Response:
+    """
+    Status line and headers of an HTTP response.
+    
+    size is the approximate number of bytes exchanged to get it: request
+    and response headers plus any body bytes read, summed over redirects.
+    timings holds the seconds spent in each phase ({'connect_time': ...},
+    see results.PHASE_FIELDS) where the client measured them.
+    """
+    
+    def __init__(self, url, status, reason, headers, size=0, timings=None):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.size = size
+        self.timings = timings
+
+def redirect_loop_error(response):
+    """
+    The HTTPError for a response that still redirects when no more
+    redirects are followed, as urlopen raises for a redirect loop
+    """
+    error = HTTPError(response.url, response.status, f"redirect loop ({response.reason})",
+                      response.headers, None)
+    error.size = response.size
+    error.timings = response.timings
+    return error
+
+def request_size(method, url, headers):
+    """Approximate bytes of an HTTP/1.1 request line and headers"""
+    parsed = urlparse(url)
+    target = (parsed.path or '/') + ('?' + parsed.query if parsed.query else '')
+    size = len(method) + len(target) + len(' HTTP/1.1\r\n') + 1
+    size += len('Host: \r\n') + len(parsed.netloc)
+    for name, value in headers.items():
+        size += len(name) + len(str(value)) + 4
+    return size + 2
+
+def response_header_size(status, reason, headers):
+    """Approximate bytes of an HTTP/1.1 status line and headers"""
+    size = len(f"HTTP/1.1 {status} {reason}\r\n")
+    for name, value in (headers or {}).items():
+        size += len(name) + len(str(value)) + 4
+    return size + 2
+
+def uses_proxy(url):
+    """True when urllib would send this URL through a configured proxy"""
+    parsed = urlparse(url)
+    proxies = getproxies()
+    if parsed.scheme.lower() not in proxies:
+        return False
+    return not proxy_bypass(parsed.hostname or '')
+
+class CheckSession:
+    """
+    Shared per-run state for check_url_accessibility().
+    
+    A session without a connection pool sends every request through
+    urlopen, exactly like a standalone check. A session with a Resolver
+    answers DNS from the run's cache, one with a HostCircuitBreaker
+    stops testing hosts that keep failing to connect, and one with
+    AdaptiveTimeouts picks each check's deadlines from the run's latencies.
+    With an OutcomeRecorder (``outcomes``), the outcome of every network
+    operation is written to it for a later --replay (see replay.py).
+    
+    https_upgrade and race_https control how http:// URLs are tested,
+    probe_mode ('get' or 'head') how much of each page is requested, and
+    depth ('dns', 'tcp', 'tls' or 'http') the layer each check stops at (see
+    check_url_accessibility). check_videos turns YouTube availability checks
+    on or off; with a VideoChecker each video is only checked once per run.
+    helper_threads caps the threads behind submit().
+    """
+    
+    def __init__(self, pool=None, resolver=None, breaker=None, videos=None,
+                 https_upgrade=True, race_https=False, probe_mode='get', check_videos=True,
+                 timeouts=None, depth='http', outcomes=None, helper_threads=HELPER_THREADS):
+        self.pool = pool
+        self.resolver = resolver
+        self.breaker = breaker
+        self.timeouts = timeouts
+        self.videos = videos
+        self.check_videos = check_videos
+        self.https_upgrade = https_upgrade
+        self.race_https = race_https
+        self.probe_mode = probe_mode
+        self.depth = depth
+        self.outcomes = outcomes
+        self.helper_threads = helper_threads
+        self._ssl_context = None
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def submit(self, fn, *args):
+        """Run fn(*args) on the session's helper threads; returns a Future"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.helper_threads)
+        return self._executor.submit(fn, *args)
+    
+    def close(self):
+        """Release pooled connections, helper threads, the video cache and any recorder"""
+        if self.pool is not None:
+            self.pool.close()
+        if self.videos is not None:
+            self.videos.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self.outcomes is not None:
+            self.outcomes.close()
+    
+    def _recorded(self, operation, key, call, *args):
+        """call(*args), with its outcome and duration written to the recorder"""
+        started = time.perf_counter()
+        try:
+            value = call(*args)
+        except Exception as e:
+            self.outcomes.record_error(operation, key, time.perf_counter() - started, e)
+            raise
+        self.outcomes.record(operation, key, time.perf_counter() - started, value)
+        return value
+    
+    def circuit_open(self, url):
+        """True if the URL's host has failed too often to be worth testing"""
+        if self.breaker is None:
+            return False
+        host = urlparse(url).hostname
+        if self.breaker.allow(host):
+            return False
+        if self.outcomes is not None:
+            self.outcomes.record('circuit', url, 0.0, self.breaker.failures(host))
+        return True
+    
+    def circuit_failures(self, host):
+        """Connection failures in a row that opened host's circuit"""
+        return self.breaker.failures(host)
+    
+    def record_outcome(self, url, connection_failed):
+        """Feed the result of a real check to the circuit breaker"""
+        if self.breaker is not None:
+            self.breaker.record(urlparse(url).hostname, connection_failed)
+    
+    def deadlines(self, url, timeout):
+        """
+        (timeout, connect_timeout) for a check of url.
+        
+        Without adaptive timeouts that is timeout as given and no separate
+        connect deadline (None).
+        """
+        if self.timeouts is None:
+            return timeout, None
+        deadlines = self.timeouts.deadlines(urlparse(url).hostname)
+        if self.outcomes is not None:
+            self.outcomes.record('deadlines', url, 0.0, deadlines)
+        return deadlines
+    
+    def record_connect(self, host, seconds):
+        """Feed the time taken to connect to host to the adaptive timeouts"""
+        if self.timeouts is not None:
+            self.timeouts.record_connect(host, seconds)
+    
+    def record_response(self, url, seconds):
+        """Feed a response time to the adaptive timeouts"""
+        if self.timeouts is not None:
+            self.timeouts.record_response(urlparse(url).hostname, seconds)
+    
+    def record_timeout(self, url):
+        """Tell the adaptive timeouts a check of url timed out"""
+        if self.timeouts is not None:
+            self.timeouts.record_timeout(urlparse(url).hostname)
+    
+    def check_video(self, kind, video_id, timeout):
+        """YouTube availability of a video or playlist (see check_youtube_video)"""
+        if self.videos is None:
+            from . import check_youtube_video
+            return check_youtube_video(video_id, timeout, self, kind)
+        return self.videos.check(kind, video_id, timeout, self)
+    
+    def resolve(self, url):
+        """
+        Look up the URL's host in the run's DNS cache.
+        
+        Returns the seconds the host's lookup took, which is done once per
+        run, or None when there was no lookup. Raises socket.gaierror when
+        the host does not resolve. Does nothing without a resolver or when
+        the URL goes through a proxy (the proxy resolves the name, not us).
+        """
+        host = urlparse(url).hostname
+        if self.resolver is None or not host or uses_proxy(url):
+            return None
+        if self.outcomes is not None and not is_ip_address(host):
+            return self._recorded('resolve', host.lower(), self._resolve, host)
+        return self._resolve(host)
+    
+    def _resolve(self, host):
+        self.resolver.resolve(host)
+        return self.resolver.lookup_time(host)
+    
+    def lookup(self, host):
+        """Resolve host, through the run's DNS cache when there is one"""
+        if self.outcomes is not None:
+            return self._recorded('lookup', host.lower(), self._lookup, host)
+        return self._lookup(host)
+    
+    def _lookup(self, host):
+        if self.resolver is not None:
+            return self.resolver.resolve(host)
+        return socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    
+    def handshake(self, host, port, tls, timeout, connect_timeout=None):
+        """
+        Open a connection to host:port and close it again.
+        
+        With tls the TLS handshake is completed first, sending the host name
+        (SNI) and verifying the certificate like a request would. Returns the
+        phase times ({'connect_time': ..., 'tls_time': ...}). Raises the
+        same errors as a request (URLError for refused or reset
+        connections), or ConnectTimeout when connect_timeout is shorter
+        than timeout and runs out.
+        """
+        if self.outcomes is not None:
+            return self._recorded('connect', f"{host} {port} {'tls' if tls else 'tcp'}",
+                                  self._handshake, host, port, tls, timeout, connect_timeout)
+        return self._handshake(host, port, tls, timeout, connect_timeout)
+    
+    def _handshake(self, host, port, tls, timeout, connect_timeout):
+        limit = min(timeout, connect_timeout or timeout)
+        if self.resolver is not None:
+            create_connection = self.resolver.create_connection
+        else:
+            create_connection = socket.create_connection
+        started = time.perf_counter()
+        timings = {}
+        try:
+            sock = create_connection((host, port), limit)
+            connected = time.perf_counter()
+            timings['connect_time'] = connected - started
+            try:
+                if tls:
+                    with self._lock:
+                        if self._ssl_context is None:
+                            self._ssl_context = ssl.create_default_context()
+                    self._ssl_context.wrap_socket(sock, server_hostname=host).close()
+                    timings['tls_time'] = time.perf_counter() - connected
+            finally:
+                sock.close()
+        except socket.timeout:
+            if limit < timeout:
+                raise ConnectTimeout(f"no connection within {limit}s") from None
+            raise
+        except (socket.gaierror, ssl.SSLError):
+            raise
+        except OSError as e:
+            raise URLError(e)
+        self.record_connect(host, time.perf_counter() - started)
+        return timings
+    
+    def request(self, method, url, headers, timeout, max_body=None, result=None, connect_timeout=None):
+        """
+        Send one request and return a Response, following redirects.
+        
+        Raises HTTPError for 4xx/5xx statuses and URLError/socket errors for
+        connection failures, the same way urlopen does. Proxied URLs always
+        go through urlopen so proxy settings keep working.
+        
+        max_body caps the response body bytes read (pooled connections only;
+        urlopen never reads the body). When result is given, the request's
+        approximate size is added to result['bytes_transferred'] and its
+        phase times to the result's (pooled connections only).
+        connect_timeout, if shorter than timeout, limits the time to open a
+        new pooled connection (ConnectTimeout when exceeded).
+        """
+        if self.outcomes is not None:
+            return self._recorded('request', f"{method} {url}", self._request, method, url, headers,
+                                  timeout, max_body, result, connect_timeout)
+        return self._request(method, url, headers, timeout, max_body, result, connect_timeout)
+    
+    def _request(self, method, url, headers, timeout, max_body, result, connect_timeout):
+        size = 0
+        timings = None
+        started = time.time()
+        try:
+            if self.pool is not None and not uses_proxy(url):
+                if max_body is None:
+                    response = self.pool.request(method, url, headers, timeout,
+                                                 connect_timeout=connect_timeout)
+                else:
+                    response = self.pool.request(method, url, headers, timeout, max_body,
+                                                 connect_timeout=connect_timeout)
+            else:
+                req = Request(url, headers=headers, method=method)
+                with urlopen(req, timeout=timeout) as raw:
+                    response = Response(raw.url, raw.status, raw.reason, raw.headers,
+                                        request_size(method, url, headers) +
+                                        response_header_size(raw.status, raw.reason, raw.headers))
+            size = response.size
+            timings = response.timings
+            self.record_response(url, time.time() - started)
+            return response
+        except HTTPError as e:
+            self.record_response(url, time.time() - started)
+            timings = getattr(e, 'timings', None)
+            size = getattr(e, 'size', None)
+            if size is None:
+                size = e.size = request_size(method, url, headers) + response_header_size(e.code, e.reason, e.headers)
+            raise
+        except OSError as e:
+            # urlopen wraps errors from connecting and sending in URLError;
+            # anything else came while reading the response
+            if not isinstance(e, URLError):
+                mark_connected(e)
+            raise
+        finally:
+            if result is not None:
+                result['bytes_transferred'] += size
+                if timings:
+                    add_phase_times(result, timings)
+        
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Google Sheets loading - conditional downloads with an on-disk copy of each sheet
+"""
+
+import hashlib
+import json
+import os
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen, Request
+
+from . import USER_AGENT
+from .cache import cache_dir
+
+SHEET_TIMEOUT = 30
+
+def sheet_cache_paths(sheet_url):
+    """Paths of the cached CSV and its validators for a sheet URL"""
+    key = hashlib.sha256(sheet_url.encode('utf-8')).hexdigest()[:32]
+    directory = os.path.join(cache_dir(), 'sheets')
+    return os.path.join(directory, key + '.csv'), os.path.join(directory, key + '.json')
+
+def content_hash(content):
+    """SHA-256 of a sheet's CSV text, tying validators to the copy they describe"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def read_cached_sheet(sheet_url):
+    """
+    Return (csv_content, metadata) of the cached copy, or (None, {}).
+    
+    A copy whose metadata was written for different content (a run that
+    stopped between the two files) is not used, so its validators are
+    never sent with the wrong sheet.
+    """
+    csv_path, meta_path = sheet_cache_paths(sheet_url)
+    try:
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            content = f.read()
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None, {}
+    if not isinstance(metadata, dict) or metadata.get('sha256') != content_hash(content):
+        return None, {}
+    return content, metadata
+
+def write_cached_sheet(sheet_url, content, metadata):
+    """
+    Store a downloaded sheet; files are replaced atomically, the CSV first
+    and then the metadata holding its hash
+    """
+    csv_path, meta_path = sheet_cache_paths(sheet_url)
+    metadata = dict(metadata, sha256=content_hash(content))
+    try:
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        for path, data in ((csv_path, content), (meta_path, json.dumps(metadata))):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+    except OSError:
+        pass  # the cache is an optimization; the download itself succeeded
+
+def fetch_sheet(sheet_url, timeout=SHEET_TIMEOUT):
+    """
+    Fetch a published sheet's CSV, revalidating the cached copy.
+    
+    The request carries the cached copy's ETag/Last-Modified, so an
+    unchanged sheet costs a single 304. If the sheet host cannot be reached
+    (or answers with an error) the cached copy is used instead.
+    
+    Returns (csv_content, origin, fetched_at) where origin is 'downloaded',
+    'unchanged' or 'offline'. Raises the download error when there is no
+    cached copy to fall back to.
+    """
+    cached, metadata = read_cached_sheet(sheet_url)
+    headers = {'User-Agent': USER_AGENT}
+    if cached is not None:
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+    
+    try:
+        with urlopen(Request(sheet_url, headers=headers), timeout=timeout) as response:
+            content = response.read().decode('utf-8')
+            metadata = {
+                'url': sheet_url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time()
+            }
+    except HTTPError as e:
+        if cached is None:
+            raise
+        if e.code == 304:
+            return cached, 'unchanged', metadata.get('fetched_at')
+        return cached, 'offline', metadata.get('fetched_at')
+    except (URLError, OSError):
+        if cached is None:
+            raise
+        return cached, 'offline', metadata.get('fetched_at')
+    
+    write_cached_sheet(sheet_url, content, metadata)
+    return content, 'downloaded', metadata['fetched_at']
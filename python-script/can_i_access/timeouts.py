@@ -0,0 +1,139 @@
+"""
+Adaptive timeouts - per-host deadlines from the latencies seen during a run
+"""
+
+import threading
+from collections import deque
+
+DEFAULT_TIMEOUT_MIN = 2
+DEFAULT_TIMEOUT_MAX = 30
+
+# Smoothing gains and deviation multiplier of the per-host estimates, as in
+# TCP's retransmission timer (RFC 6298)
+ALPHA = 0.125
+BETA = 0.25
+DEVIATION_FACTOR = 4
+
+# Recent samples kept for the run-wide percentiles
+RECENT_SAMPLES = 1000
+PERCENTILE = 0.95
+MIN_SAMPLES = 20
+PERCENTILE_EVERY = 50
+
+# Hosts without samples yet get this multiple of the run-wide percentile
+UNSEEN_HOST_FACTOR = 3
+
+# Each timeout doubles a host's deadlines, up to this many times
+MAX_BACKOFF = 8
+
+class LatencyEstimate:
+    """Smoothed latency and mean deviation of one host"""
+    
+    __slots__ = ('smoothed', 'deviation')
+    
+    def __init__(self, seconds):
+        self.smoothed = seconds
+        self.deviation = seconds / 2
+    
+    def update(self, seconds):
+        self.deviation += BETA * (abs(self.smoothed - seconds) - self.deviation)
+        self.smoothed += ALPHA * (seconds - self.smoothed)
+    
+    def deadline(self):
+        return self.smoothed + DEVIATION_FACTOR * self.deviation
+
+class RecentLatencies:
+    """High percentile of the run's recent samples, refreshed every few samples"""
+    
+    def __init__(self):
+        self.samples = deque(maxlen=RECENT_SAMPLES)
+        self.percentile = None
+        self._new = 0
+    
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self._new += 1
+        if len(self.samples) >= MIN_SAMPLES and (self.percentile is None or self._new >= PERCENTILE_EVERY):
+            ordered = sorted(self.samples)
+            self.percentile = ordered[int(len(ordered) * PERCENTILE)]
+            self._new = 0
+
+class AdaptiveTimeouts:
+    """
+    Connect and read deadlines from the latencies observed so far.
+    
+    Connecting (TCP and any TLS handshake) takes about a round trip, so its
+    deadline is tight: the host's smoothed connect time plus four
+    deviations, or three times the run's 95th percentile connect time for
+    a host not connected to yet. A host that silently drops packets costs a
+    couple of seconds instead of the full timeout.
+    
+    The read deadline covers the rest of a request. It is never shorter
+    than ``initial`` and grows, in the same way, for hosts whose responses
+    are slow and for runs on a slow link, so slow sites are not cut off.
+    A timeout doubles the host's deadlines until it next answers. Deadlines
+    stay within ``minimum`` and ``maximum`` seconds.
+    """
+    
+    def __init__(self, initial, minimum=DEFAULT_TIMEOUT_MIN, maximum=DEFAULT_TIMEOUT_MAX):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = max(maximum, initial)
+        self._connects = {}
+        self._responses = {}
+        self._backoff = {}
+        self._recent_connects = RecentLatencies()
+        self._recent_responses = RecentLatencies()
+        self._lock = threading.Lock()
+    
+    def _bounded(self, seconds, limit):
+        return round(min(limit, max(self.minimum, seconds)), 1)
+    
+    def deadlines(self, host):
+        """(read, connect) deadlines in seconds for the next check on host"""
+        with self._lock:
+            backoff = self._backoff.get(host, 1)
+            
+            response = self._responses.get(host)
+            if response is not None:
+                read = max(self.initial, response.deadline())
+            elif self._recent_responses.percentile is not None:
+                read = max(self.initial, self._recent_responses.percentile * UNSEEN_HOST_FACTOR)
+            else:
+                read = self.initial
+            read = self._bounded(read * backoff, self.maximum)
+            
+            connect = self._connects.get(host)
+            if connect is not None:
+                connect = connect.deadline()
+            elif self._recent_connects.percentile is not None:
+                connect = self._recent_connects.percentile * UNSEEN_HOST_FACTOR
+            else:
+                connect = read
+            return read, self._bounded(connect * backoff, read)
+    
+    def record_connect(self, host, seconds):
+        """Record a connection to host that took this many seconds to set up"""
+        with self._lock:
+            estimate = self._connects.get(host)
+            if estimate is None:
+                self._connects[host] = LatencyEstimate(seconds)
+            else:
+                estimate.update(seconds)
+            self._recent_connects.add(seconds)
+    
+    def record_response(self, host, seconds):
+        """Record a response from host that took this many seconds"""
+        with self._lock:
+            estimate = self._responses.get(host)
+            if estimate is None:
+                self._responses[host] = LatencyEstimate(seconds)
+            else:
+                estimate.update(seconds)
+            self._recent_responses.add(seconds)
+            self._backoff.pop(host, None)
+    
+    def record_timeout(self, host):
+        """Give host longer next time after a check on it timed out"""
+        with self._lock:
+            self._backoff[host] = min(MAX_BACKOFF, self._backoff.get(host, 1) * 2)
@@ -0,0 +1,156 @@
+"""
+YouTube checks - each video checked once per run, answers kept between runs
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import check_youtube_video
+from .cache import cache_dir, LOCK_TIMEOUT
+
+DEFAULT_VIDEO_TTL = 3 * 24 * 3600
+
+# Concurrent oEmbed queries during the video pre-check stage
+VIDEO_WORKERS = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    kind TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (kind, video_id)
+)
+"""
+
+def default_video_cache_path():
+    """Per-user video cache database location"""
+    return os.path.join(cache_dir(), 'videos.sqlite')
+
+class VideoCache:
+    """
+    sqlite-backed store of YouTube availability answers, kept for ``ttl``.
+    
+    Shared by every run on the machine, like ResultCache.
+    """
+    
+    def __init__(self, path=None, ttl=DEFAULT_VIDEO_TTL):
+        self.path = path or default_video_cache_path()
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(SCHEMA)
+    
+    def get(self, kind, video_id):
+        """Return the stored answer, or None without a fresh one"""
+        query = 'SELECT result FROM videos WHERE kind = ? AND video_id = ? AND expires_at > ?'
+        with self._lock:
+            row = self._db.execute(query, (kind, video_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, kind, video_id, check):
+        """Store an answer"""
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?)',
+                             (kind, video_id, time.time() + self.ttl, json.dumps(check)))
+    
+    def close(self):
+        """Drop expired answers and close the database"""
+        try:
+            with self._lock:
+                self._db.execute('DELETE FROM videos WHERE expires_at <= ?', (time.time(),))
+        finally:
+            self._db.close()
+
+class VideoChecker:
+    """
+    Thread-safe, per-run memo of YouTube availability checks.
+    
+    Each (kind, id) is queried once per run; concurrent checks of the same
+    video share one oEmbed request. Definitive answers are read from and
+    written to an optional VideoCache (reads are skipped with refresh).
+    """
+    
+    def __init__(self, store=None, refresh=False):
+        self.store = store
+        self.refresh = refresh
+        self.queries = 0
+        self.stored_hits = 0
+        self._results = {}    # (kind, id) -> check result
+        self._pending = {}    # (kind, id) -> threading.Event for checks in progress
+        self._lock = threading.Lock()
+    
+    def check(self, kind, video_id, timeout, session):
+        """Return the availability check result for a video or playlist"""
+        key = (kind, video_id)
+        while True:
+            with self._lock:
+                if key in self._results:
+                    return self._results[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+            if owner:
+                try:
+                    check = self._lookup(kind, video_id, timeout, session)
+                    with self._lock:
+                        self._results[key] = check
+                    return check
+                finally:
+                    with self._lock:
+                        del self._pending[key]
+                    event.set()
+            event.wait()
+    
+    def cached(self, kind, video_id):
+        """This run's answer for a video or playlist, or None before it is checked"""
+        with self._lock:
+            return self._results.get((kind, video_id))
+    
+    def _lookup(self, kind, video_id, timeout, session):
+        if self.store is not None and not self.refresh:
+            check = self.store.get(kind, video_id)
+            if check is not None:
+                with self._lock:
+                    self.stored_hits += 1
+                return check
+        
+        check = check_youtube_video(video_id, timeout, session, kind)
+        with self._lock:
+            self.queries += 1
+        if self.store is not None and check.get('definitive'):
+            self.store.put(kind, video_id, check)
+        return check
+    
+    def prefetch(self, videos, timeout, session, workers=VIDEO_WORKERS):
+        """Check unique (kind, id) pairs concurrently; returns how many there were"""
+        videos = sorted(set(videos))
+        if not videos:
+            return 0
+        
+        def check_one(video):
+            try:
+                self.check(video[0], video[1], timeout, session)
+            except Exception:
+                # Only an early start: the URL's own check asks again and
+                # reports what went wrong
+                pass
+        
+        with ThreadPoolExecutor(max_workers=min(workers, len(videos))) as executor:
+            list(executor.map(check_one, videos))
+        return len(videos)
+    
+    def close(self):
+        """Close the persistent store"""
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,101 @@
+"""
+Tests for the asyncio probe engine
+"""
+
+import asyncio
+import os
+import threading
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import mock
+
+from can_i_access.aio import check_url_accessibility_async, iter_checks_async
+from can_i_access.resolver import Resolver
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """Answers every request with an empty 200 and keeps its request target"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class ThreadRecordingResolver(Resolver):
+    """Resolver that notes the thread of every resolve() call"""
+    
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+    
+    def resolve(self, host, port=None):
+        self.threads.append(threading.current_thread())
+        return super().resolve(host, port)
+
+class AsyncEngineTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), RecordingHandler)
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.port = self.server.server_address[1]
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def test_checks_share_one_event_loop(self):
+        urls = [f"http://127.0.0.1:{self.port}/{i}" for i in range(10)]
+        results = list(iter_checks_async(urls, check_url_accessibility_async, concurrency=5))
+        self.assertEqual(sorted(index for index, _, _ in results), list(range(10)))
+        for _, url, result in results:
+            self.assertEqual(result['url'], url)
+            self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+    
+    def test_proxied_urls_go_through_the_proxy(self):
+        proxy = f"http://127.0.0.1:{self.port}"
+        environ = {'http_proxy': proxy, 'HTTP_PROXY': proxy, 'no_proxy': '', 'NO_PROXY': ''}
+        with mock.patch.dict(os.environ, environ):
+            # urlopen() keeps the proxies it found on first use
+            urllib.request.install_opener(urllib.request.build_opener())
+            self.addCleanup(urllib.request.install_opener, None)
+            result = run(check_url_accessibility_async('http://site.invalid/page', timeout=5))
+        self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+        self.assertEqual(self.server.paths, ['http://site.invalid/page'])
+    
+    def test_cached_names_are_resolved_on_the_event_loop(self):
+        resolver = ThreadRecordingResolver()
+        session = CheckSession(resolver=resolver)
+        url = f"http://localhost:{self.port}/"
+        
+        first = run(check_url_accessibility_async(url, timeout=5, session=session))
+        self.assertNotEqual(resolver.threads[0], threading.current_thread())
+        del resolver.threads[:]
+        second = run(check_url_accessibility_async(url, timeout=5, session=session))
+        self.assertEqual((first['status'], second['status']), ('Reachable (HTTP Warning)',) * 2)
+        self.assertEqual(set(resolver.threads), {threading.current_thread()})
+        self.assertEqual(resolver.lookups, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Tests for the offline benchmark suite in benchmarks/
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+BENCH_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'benchmarks', 'bench.py')
+
+class BenchmarkTest(unittest.TestCase):
+    
+    def test_every_case_checks_the_whole_mix(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            output = os.path.join(work_dir, 'results.json')
+            # 100 URLs is one full pass over the mix's shares
+            subprocess.run([sys.executable, BENCH_SCRIPT, '--urls', '100', '--parallel', '8',
+                            '--output', output],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True, timeout=120)
+            with open(output, encoding='utf-8') as f:
+                report = json.load(f)
+        
+        cases = [(case['suite'], case['engine']) for case in report['results']]
+        self.assertEqual(cases, [('check', 'thread'), ('check', 'async'),
+                                 ('command', 'thread'), ('command', 'async')])
+        for case in report['results']:
+            self.assertEqual(case['urls'], 100)
+            self.assertGreater(case['throughput'], 0)
+            self.assertEqual(case['statuses'], {'Fully Accessible': 20, 'Not Reachable': 10,
+                                                'Reachable (HTTP Warning)': 70})
+
+if __name__ == '__main__':
+    unittest.main()
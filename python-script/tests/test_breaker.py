@@ -0,0 +1,127 @@
+"""
+Tests for what counts towards the host circuit breaker
+"""
+
+import asyncio
+import socket
+import threading
+import unittest
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.breaker import HostCircuitBreaker
+from can_i_access.pool import ConnectionPool
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class SilentServer:
+    """Accepts connections and never answers them"""
+    
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        self.accepted = []
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+    
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted.append(conn)
+    
+    def close(self):
+        self.sock.close()
+        for conn in self.accepted:
+            conn.close()
+
+def closed_port():
+    """A local port with nothing listening on it"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+class HostCircuitBreakerTest(unittest.TestCase):
+    
+    def test_circuit_opens_after_threshold_consecutive_failures(self):
+        breaker = HostCircuitBreaker(threshold=2)
+        breaker.record('a.example', True)
+        breaker.record('a.example', False)
+        breaker.record('a.example', True)
+        self.assertTrue(breaker.allow('a.example'))
+        breaker.record('a.example', True)
+        self.assertFalse(breaker.allow('a.example'))
+        self.assertTrue(breaker.allow('b.example'))
+        self.assertEqual(breaker.inferred, 1)
+        self.assertEqual(breaker.open_hosts(), ['a.example'])
+    
+    def test_confirmation_probe_can_close_the_circuit(self):
+        breaker = HostCircuitBreaker(threshold=1, confirm=True)
+        breaker.record('a.example', True)
+        self.assertTrue(breaker.allow('a.example'))
+        breaker.record('a.example', False)
+        self.assertTrue(breaker.allow('a.example'))
+        
+        breaker.record('a.example', True)
+        self.assertTrue(breaker.allow('a.example'))
+        breaker.record('a.example', True)
+        self.assertFalse(breaker.allow('a.example'))
+
+class CircuitBreakerTest(unittest.TestCase):
+    
+    def sessions(self):
+        yield 'pool', CheckSession(pool=ConnectionPool(), https_upgrade=False,
+                                   breaker=HostCircuitBreaker(threshold=1))
+        yield 'urlopen', CheckSession(https_upgrade=False, breaker=HostCircuitBreaker(threshold=1))
+    
+    def test_read_timeout_on_established_connection_keeps_circuit_closed(self):
+        server = SilentServer()
+        self.addCleanup(server.close)
+        url = f"http://127.0.0.1:{server.port}/"
+        for name, session in self.sessions():
+            with self.subTest(client=name):
+                first = check_url_accessibility(url, timeout=0.3, session=session)
+                second = check_url_accessibility(url, timeout=0.3, session=session)
+                session.close()
+                self.assertTrue(first['message'].startswith('Timeout'), first['message'])
+                self.assertFalse(second['inferred'])
+                self.assertTrue(second['message'].startswith('Timeout'), second['message'])
+    
+    def test_read_timeout_on_established_connection_keeps_circuit_closed_async(self):
+        server = SilentServer()
+        self.addCleanup(server.close)
+        url = f"http://127.0.0.1:{server.port}/"
+        session = CheckSession(https_upgrade=False, breaker=HostCircuitBreaker(threshold=1))
+        
+        async def check_twice():
+            first = await check_url_accessibility_async(url, timeout=0.3, session=session)
+            second = await check_url_accessibility_async(url, timeout=0.3, session=session)
+            return first, second
+        first, second = run(check_twice())
+        self.assertTrue(first['message'].startswith('Timeout'), first['message'])
+        self.assertFalse(second['inferred'])
+    
+    def test_refused_connection_opens_circuit(self):
+        url = f"http://127.0.0.1:{closed_port()}/"
+        for name, session in self.sessions():
+            with self.subTest(client=name):
+                check_url_accessibility(url, timeout=1, session=session)
+                second = check_url_accessibility(url, timeout=1, session=session)
+                session.close()
+                self.assertTrue(second['inferred'])
+
+if __name__ == '__main__':
+    unittest.main()
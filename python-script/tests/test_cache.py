@@ -0,0 +1,61 @@
+"""
+Tests for the on-disk result cache
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from can_i_access import new_result
+from can_i_access.cache import ResultCache, normalize_url
+
+def checked(url, status):
+    result = new_result(url)
+    result.update(status=status, message=status, bytes_transferred=512, site_name='Site')
+    return result
+
+class ResultCacheTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'results.sqlite')
+    
+    def open(self, **options):
+        cache = ResultCache(self.path, **options)
+        self.addCleanup(cache.close)
+        return cache
+    
+    def test_urls_are_normalized_for_keys(self):
+        self.assertEqual(normalize_url(' HTTP://Example.COM:80/a?b=1#top '), 'http://example.com/a?b=1')
+        self.assertEqual(normalize_url('https://example.com:8443'), 'https://example.com:8443/')
+    
+    def test_fresh_results_are_found_under_their_profile_only(self):
+        cache = self.open(profile='school')
+        cache.store('https://example.com/', checked('https://example.com/', 'Fully Accessible'))
+        cache.flush()
+        
+        self.assertIsNone(cache.get('https://other.example/'))
+        result = cache.get('https://EXAMPLE.com')
+        self.assertEqual(result['url'], 'https://EXAMPLE.com')
+        self.assertEqual(result['status'], 'Fully Accessible')
+        self.assertTrue(result['cached'])
+        self.assertEqual(result['bytes_transferred'], 0)
+        self.assertEqual(result['site_name'], '')
+        self.assertEqual(cache.hits, 1)
+        self.assertIsNone(self.open(profile='home').get('https://example.com/'))
+    
+    def test_failures_expire_with_the_failure_ttl(self):
+        cache = self.open(success_ttl=600, failure_ttl=0.05)
+        cache.store('https://up.example/', checked('https://up.example/', 'Fully Accessible'))
+        cache.store('https://down.example/', checked('https://down.example/', 'Not Reachable'))
+        cache.flush()
+        
+        time.sleep(0.1)
+        self.assertIsNotNone(cache.get('https://up.example/'))
+        self.assertIsNone(cache.get('https://down.example/'))
+
+if __name__ == '__main__':
+    unittest.main()
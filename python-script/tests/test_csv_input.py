@@ -0,0 +1,53 @@
+"""
+Tests for streamed CSV input
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from can_i_access.commands.test import load_urls_from_csv
+
+class LoadUrlsFromCsvTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+    
+    def load(self, text):
+        path = os.path.join(self.directory, 'urls.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        records, source = load_urls_from_csv(path)
+        return list(records)
+    
+    def test_delimiters_are_detected(self):
+        for delimiter in (',', ';', '\t', '|'):
+            with self.subTest(delimiter=delimiter):
+                header = delimiter.join(['URL', 'site', 'Student PII Needed'])
+                row = delimiter.join(['https://a.example/', 'Site A', 'yes'])
+                self.assertEqual(self.load(f"{header}\n{row}\n"), [
+                    {'url': 'https://a.example/', 'site_name': 'Site A', 'pii_required': True},
+                ])
+    
+    def test_single_column_file_with_bom_skips_empty_rows(self):
+        records = self.load('﻿url\nhttps://a.example/\n\n  https://b.example/  \n')
+        self.assertEqual(records, [{'url': 'https://a.example/'}, {'url': 'https://b.example/'}])
+    
+    def test_rows_are_read_as_they_are_consumed(self):
+        path = os.path.join(self.directory, 'urls.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write('URL\nhttps://a.example/\nhttps://b.example/\n')
+        records, source = load_urls_from_csv(path)
+        # An iterator, not a list read up front
+        self.assertIs(iter(records), records)
+        self.assertEqual(next(records), {'url': 'https://a.example/'})
+        records.close()
+    
+    def test_missing_url_column_exits(self):
+        with self.assertRaises(SystemExit):
+            self.load('site\nSite A\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Tests for checks that stop at DNS, TCP or the TLS handshake (--depth)
+"""
+
+import asyncio
+import socket
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Counts GET requests, answering each with an empty 200"""
+    
+    def do_GET(self):
+        self.server.requests += 1
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+def closed_port():
+    """A local port with nothing listening on it"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class DepthTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), CountingHandler)
+        self.server.requests = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+    
+    def check(self, engine, url, depth):
+        session = CheckSession(https_upgrade=False, depth=depth)
+        self.addCleanup(session.close)
+        if engine == 'async':
+            return run(check_url_accessibility_async(url, timeout=5, session=session))
+        return check_url_accessibility(url, timeout=5, session=session)
+    
+    def test_shallow_checks_send_no_request(self):
+        # http:// has no TLS layer, so tls depth stops at TCP
+        for engine in ('thread', 'async'):
+            for depth, method in (('dns', 'DNS Lookup'), ('tcp', 'TCP Connect'), ('tls', 'TCP Connect')):
+                with self.subTest(engine=engine, depth=depth):
+                    result = self.check(engine, self.url, depth)
+                    self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+                    self.assertEqual(result['method'], method)
+        self.assertEqual(self.server.requests, 0)
+    
+    def test_refused_connection_fails_at_tcp_depth(self):
+        url = f"http://127.0.0.1:{closed_port()}/"
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                result = self.check(engine, url, 'tcp')
+                self.assertEqual(result['status'], 'Not Reachable', result['message'])
+                self.assertEqual(result['method'], 'TCP Connect')
+    
+    def test_http_depth_sends_the_request(self):
+        result = self.check('thread', self.url, 'http')
+        self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+        self.assertEqual(self.server.requests, 1)
+
+if __name__ == '__main__':
+    unittest.main()
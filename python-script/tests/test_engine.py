@@ -0,0 +1,48 @@
+"""
+Tests for the thread engine
+
+Run from the python-script directory:
+    python -m unittest discover tests
+"""
+
+import threading
+import time
+import unittest
+
+from can_i_access.engine import iter_checks
+
+class IterChecksTest(unittest.TestCase):
+    
+    def test_checks_run_concurrently(self):
+        # Each check waits for all four, which only works if they overlap
+        barrier = threading.Barrier(4, timeout=5)
+        
+        def check(item):
+            barrier.wait()
+            return item
+        
+        results = list(iter_checks(range(4), check, workers=4))
+        self.assertEqual(sorted(result for _, _, result in results), [0, 1, 2, 3])
+    
+    def test_results_carry_their_input_position(self):
+        items = (f"url-{i}" for i in range(20))
+        results = list(iter_checks(items, str.upper, workers=3))
+        self.assertEqual(sorted(results), [(i, f"url-{i}", f"URL-{i}") for i in range(20)])
+    
+    def test_stopping_early_cancels_checks_not_yet_started(self):
+        started = []
+        
+        def check(item):
+            started.append(item)
+            time.sleep(0.05)
+            return item
+        
+        checks = iter_checks(range(100), check, workers=2)
+        next(checks)
+        checks.close()
+        time.sleep(0.2)
+        # Two running and a window of four queued at most
+        self.assertLessEqual(len(started), 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Tests for the run history database
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from can_i_access.history import HistoryStore
+
+class HistoryStoreTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.store = HistoryStore(os.path.join(directory, 'history.sqlite'))
+        self.addCleanup(self.store.close)
+    
+    def record_run(self, started_at, statuses):
+        self.store.start_run('CSV file', started_at)
+        for url, status in statuses.items():
+            self.store.record({'url': url, 'status': status, 'http_status': 200, 'response_time': 0.1})
+        self.store.finish_run()
+    
+    def test_flips_are_kept_for_runs_recorded_in_any_order(self):
+        self.record_run(100, {'https://a.example/': 'Fully Accessible'})
+        self.record_run(300, {'https://a.example/': 'Fully Accessible'})
+        # An imported run landing between the two splits the unchanged pair
+        self.record_run(200, {'https://a.example/': 'Not Reachable'})
+        
+        self.assertEqual(self.store.flips(), [
+            (200, 'https://a.example/', 'Fully Accessible', 'Not Reachable', 0),
+            (300, 'https://a.example/', 'Not Reachable', 'Fully Accessible', 1),
+        ])
+        self.assertEqual(self.store.flips(since=250), [
+            (300, 'https://a.example/', 'Not Reachable', 'Fully Accessible', 1),
+        ])
+    
+    def test_timeline_uptime_and_runs(self):
+        self.record_run(100, {'https://a.example/': 'Fully Accessible', 'https://b.example/x': 'Error'})
+        self.record_run(200, {'HTTPS://A.example:443/': 'Not Reachable', 'https://b.example/x': 'Error'})
+        
+        timeline = self.store.timeline('https://a.example')
+        self.assertEqual([(checked_at, status) for checked_at, status, *rest in timeline],
+                         [(200, 'Not Reachable'), (100, 'Fully Accessible')])
+        self.assertEqual(self.store.uptime(), [('b.example', 2, 0, 200), ('a.example', 2, 1, 200)])
+        self.assertEqual(self.store.uptime(host='A.EXAMPLE'), [('a.example', 2, 1, 200)])
+        self.assertEqual([run[1:] for run in self.store.runs()], [(200, 'CSV file', 2), (100, 'CSV file', 2)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Tests for how http:// URLs are upgraded to HTTPS
+"""
+
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class CountingServer(ThreadingMixIn, HTTPServer):
+    """Plain HTTP server counting the connections and GET requests it gets"""
+    
+    daemon_threads = True
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.connections = 0
+        self.requests = 0
+    
+    def verify_request(self, request, client_address):
+        self.connections += 1
+        return True
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every GET with an empty 200"""
+    
+    def do_GET(self):
+        self.server.requests += 1
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class HttpsUpgradeTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = CountingServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+    
+    def check(self, engine, **options):
+        session = CheckSession(**options)
+        self.addCleanup(session.close)
+        if engine == 'async':
+            return run(check_url_accessibility_async(self.url, timeout=5, session=session))
+        return check_url_accessibility(self.url, timeout=5, session=session)
+    
+    def test_no_https_upgrade_sends_plain_http_only(self):
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                self.server.connections = self.server.requests = 0
+                result = self.check(engine, https_upgrade=False)
+                self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+                self.assertTrue(result['is_http_only'])
+                self.assertEqual((self.server.connections, self.server.requests), (1, 1))
+    
+    def test_failed_upgrade_falls_back_to_one_http_request(self):
+        for engine in ('thread', 'async'):
+            for race in (False, True):
+                with self.subTest(engine=engine, race_https=race):
+                    self.server.requests = 0
+                    result = self.check(engine, race_https=race)
+                    self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+                    self.assertFalse(result['https_upgraded'])
+                    self.assertEqual(self.server.requests, 1)
+
+if __name__ == '__main__':
+    unittest.main()
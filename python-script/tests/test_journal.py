@@ -0,0 +1,48 @@
+"""
+Tests for the checkpoint journal behind --journal and --resume
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from can_i_access.journal import Journal, load_journal
+
+class JournalTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'run.journal')
+    
+    def test_results_survive_a_reopen(self):
+        journal = Journal(self.path)
+        journal.record('https://a.example/', {'status': 'Fully Accessible'})
+        journal.close()
+        journal = Journal(self.path)
+        journal.record('https://b.example/', {'status': 'Not Reachable'})
+        journal.close()
+        
+        self.assertEqual(load_journal(self.path), {
+            'https://a.example/': {'status': 'Fully Accessible'},
+            'https://b.example/': {'status': 'Not Reachable'},
+        })
+    
+    def test_partial_last_line_is_ignored_and_cut_off_before_appending(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"url":"https://a.example/","result":{"status":"Error"}}\n{"url":"https://b.exa')
+        self.assertEqual(list(load_journal(self.path)), ['https://a.example/'])
+        
+        journal = Journal(self.path)
+        journal.record('https://c.example/', {'status': 'Error'})
+        journal.close()
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(list(load_journal(self.path)), ['https://a.example/', 'https://c.example/'])
+    
+    def test_missing_journal_is_empty(self):
+        self.assertEqual(load_journal(self.path), {})
+
+if __name__ == '__main__':
+    unittest.main()
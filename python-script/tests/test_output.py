@@ -0,0 +1,96 @@
+"""
+Tests for streamed result output
+"""
+
+import csv
+import os
+import tempfile
+import time
+import unittest
+
+from can_i_access.output import FlushedFile, ResultStream
+from can_i_access.results import CheckResult, FIELDS, OPTIONAL_FIELDS
+
+class ResultStreamTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+    
+    def stream(self, format_type, results):
+        path = os.path.join(self.work_dir.name, 'results.' + format_type)
+        stream = ResultStream(path, format_type)
+        for result in results:
+            stream.write(result)
+        stream.close()
+        self.assertEqual(stream.count, len(results))
+        return path
+    
+    def test_jsonl_has_one_compact_object_per_line(self):
+        path = self.stream('jsonl', [{'url': 'https://a.example/', 'status': 'Error'},
+                                     {'url': 'https://b.example/', 'status': 'Not Reachable'}])
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ['{"url":"https://a.example/","status":"Error"}',
+                                 '{"url":"https://b.example/","status":"Not Reachable"}'])
+    
+    def test_csv_writes_a_header_then_a_row_per_result(self):
+        path = self.stream('csv', [{'url': 'https://a.example/', 'status': 'Error'},
+                                   {'url': 'https://b.example/', 'status': 'Not Reachable'}])
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row['status'] for row in rows], ['Error', 'Not Reachable'])
+    
+    def test_csv_header_does_not_depend_on_the_first_result(self):
+        first = CheckResult('https://a.example/')
+        later = CheckResult('https://b.example/')
+        later.update(dns_time=0.01, connect_time=0.02, tls_time=0.03, first_byte_time=0.04)
+        path = self.stream('csv', [first, later])
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+        self.assertEqual(tuple(reader.fieldnames), FIELDS + OPTIONAL_FIELDS)
+        self.assertEqual(rows[0]['dns_time'], '')
+        self.assertEqual([rows[1][field] for field in ('dns_time', 'connect_time', 'tls_time', 'first_byte_time')],
+                         ['0.01', '0.02', '0.03', '0.04'])
+    
+    def test_unstreamable_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ResultStream(os.path.join(self.work_dir.name, 'results.txt'), 'text')
+
+class FlushedFileTest(unittest.TestCase):
+    
+    def test_lines_are_flushed_without_further_writes(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, 'lines.jsonl')
+            out = FlushedFile(path, interval=0.05)
+            try:
+                out.write('{"first":1}\n')
+                deadline = time.time() + 2
+                while time.time() < deadline and os.path.getsize(path) == 0:
+                    time.sleep(0.02)
+                with open(path, encoding='utf-8') as f:
+                    self.assertEqual(f.read(), '{"first":1}\n')
+            finally:
+                out.close()
+    
+    def test_close_never_races_the_flusher(self):
+        # With no interval the flusher is always about to flush, so a close
+        # landing between its wait and its flush is hit within a few tries
+        flushed_after_close = []
+        with tempfile.TemporaryDirectory() as work_dir:
+            for attempt in range(200):
+                out = FlushedFile(os.path.join(work_dir, f"{attempt}.jsonl"), interval=0)
+                file_flush = out._file.flush
+                
+                def flush(file=out._file, flush=file_flush):
+                    if file.closed:
+                        flushed_after_close.append(attempt)
+                    flush()
+                out._file.flush = flush
+                out.write('{}\n')
+                out.close()
+        self.assertEqual(flushed_after_close, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for the DNS, connect, TLS and first-byte times recorded per check
+"""
+
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.pool import ConnectionPool
+from can_i_access.resolver import Resolver
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a short 200"""
+    
+    def do_GET(self):
+        body = b'<html><title>Ok</title></html>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+class PhaseTimesTest(unittest.TestCase):
+    
+    def setUp(self):
+        server = ThreadingServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.port = server.server_address[1]
+    
+    def check(self, engine, url, **options):
+        resolver = Resolver()
+        session = CheckSession(pool=ConnectionPool(resolver=resolver), resolver=resolver,
+                               https_upgrade=False, **options)
+        self.addCleanup(session.close)
+        if engine == 'async':
+            return run(check_url_accessibility_async(url, timeout=5, session=session))
+        return check_url_accessibility(url, timeout=5, session=session)
+    
+    def test_plain_http_check_records_each_phase_but_tls(self):
+        url = f"http://localhost:{self.port}/"
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                result = self.check(engine, url)
+                self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+                for field in ('dns_time', 'connect_time', 'first_byte_time'):
+                    self.assertGreaterEqual(result[field], 0)
+                self.assertNotIn('tls_time', result)
+    
+    def test_tcp_depth_stops_after_connect(self):
+        url = f"http://localhost:{self.port}/"
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                result = self.check(engine, url, depth='tcp')
+                self.assertIn('connect_time', result)
+                self.assertNotIn('first_byte_time', result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for the keep-alive connection pool
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.pool import ConnectionPool, PoolTimeout
+from can_i_access.resolver import Resolver
+from can_i_access.session import CheckSession
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every request with an empty 200, keeping the connection open"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class CountingResolver(Resolver):
+    """Resolver that counts the connections opened through it"""
+    
+    def __init__(self):
+        super().__init__()
+        self.connections = 0
+    
+    def create_connection(self, *args, **kwargs):
+        self.connections += 1
+        return super().create_connection(*args, **kwargs)
+
+class ConnectionPoolTest(unittest.TestCase):
+    
+    def start_server(self):
+        server = ThreadingServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+    
+    def test_connections_are_opened_through_the_resolver_and_reused(self):
+        port = self.start_server()
+        resolver = CountingResolver()
+        pool = ConnectionPool(resolver=resolver)
+        self.addCleanup(pool.close)
+        url = f"http://127.0.0.1:{port}/"
+        
+        first = pool.request('GET', url, {}, 5)
+        second = pool.request('GET', url, {}, 5)
+        self.assertEqual((first.status, second.status), (200, 200))
+        self.assertEqual(resolver.connections, 1)
+        self.assertEqual(pool.stats()[:2], (1, 1))
+        self.assertIn('connect_time', first.timings)
+        self.assertNotIn('connect_time', second.timings)
+    
+    def test_waiting_for_a_free_connection_is_not_a_site_timeout(self):
+        port = self.start_server()
+        pool = ConnectionPool(per_host=1)
+        self.addCleanup(pool.close)
+        held, _ = pool.acquire('http', '127.0.0.1', port, 5)
+        self.addCleanup(pool.release, 'http', '127.0.0.1', port, held, False)
+        
+        with self.assertRaises(PoolTimeout):
+            pool.acquire('http', '127.0.0.1', port, 0.1)
+        url = f"http://127.0.0.1:{port}/"
+        result = check_url_accessibility(url, timeout=0.1, session=CheckSession(pool=pool))
+        self.assertEqual(result['status'], 'Error')
+        self.assertIn('no free connection', result['message'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the HEAD probe mode and the bytes counted per check
+"""
+
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.pool import ConnectionPool
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class NoHeadHandler(BaseHTTPRequestHandler):
+    """
+    Rejects HEAD with 405 and answers a ranged GET of /empty with 416;
+    notes each request as 'HEAD', 'GET' or 'GET range'
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_HEAD(self):
+        self.server.requests.append('HEAD')
+        self.send_response(405)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_GET(self):
+        ranged = 'Range' in self.headers
+        self.server.requests.append('GET range' if ranged else 'GET')
+        if ranged and self.path == '/empty':
+            self.send_response(416)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'x' * 4096
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+class ProbeModeTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), NoHeadHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+    
+    def check(self, client, url, probe_mode):
+        if client == 'pool':
+            session = CheckSession(pool=ConnectionPool(), https_upgrade=False, probe_mode=probe_mode)
+        else:
+            session = CheckSession(https_upgrade=False, probe_mode=probe_mode)
+        self.addCleanup(session.close)
+        if client == 'async':
+            return run(check_url_accessibility_async(url, timeout=5, session=session))
+        return check_url_accessibility(url, timeout=5, session=session)
+    
+    def test_rejected_head_falls_back_to_a_ranged_get(self):
+        for client in ('pool', 'urlopen', 'async'):
+            for path, expected in (('/page', ['HEAD', 'GET range']),
+                                   ('/empty', ['HEAD', 'GET range', 'GET'])):
+                with self.subTest(client=client, path=path):
+                    del self.server.requests[:]
+                    result = self.check(client, self.base + path, 'head')
+                    self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+                    self.assertEqual(self.server.requests, expected)
+                    self.assertGreater(result['bytes_transferred'], 0)
+    
+    def test_pool_reads_at_most_the_probe_body_limit(self):
+        get = self.check('pool', self.base + '/page', 'get')
+        head = self.check('pool', self.base + '/page', 'head')
+        # The full GET drains the 4 KB body; the ranged GET stops at 1 KB
+        self.assertGreater(get['bytes_transferred'], 4096)
+        self.assertLess(head['bytes_transferred'], 4096)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests for --profile
+"""
+
+import io
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.engine import iter_checks
+from can_i_access.profiling import Profiler, stage
+from can_i_access.session import CheckSession
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every request with an empty 200"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class ProfilerTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def test_profiled_checks_on_worker_threads_finish_and_are_counted(self):
+        session = CheckSession(https_upgrade=False)
+        results = []
+        
+        def run_checks():
+            check = lambda url: check_url_accessibility(url, timeout=5, session=session)
+            results.extend(result for _, _, result in iter_checks([self.url] * 4, check, 2))
+        
+        profiler = Profiler()
+        profiler.start()
+        try:
+            stage('test')
+            # A worker thread that dies on start would leave iter_checks()
+            # waiting forever, so the run gets a thread and a deadline
+            runner = threading.Thread(target=run_checks, daemon=True)
+            runner.start()
+            runner.join(30)
+        finally:
+            profiler.stop()
+        
+        self.assertFalse(runner.is_alive(), "profiled run did not finish")
+        self.assertEqual([result['status'] for result in results], ['Reachable (HTTP Warning)'] * 4)
+        functions = {name for _, _, name in profiler.statistics().stats}
+        self.assertIn('check_url_accessibility', functions)
+        self.assertIn('test', profiler.stages)
+        
+        report = io.StringIO()
+        profiler.write_report(report, 'test')
+        self.assertIn('Hot functions by cumulative time', report.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for redirect handling
+"""
+
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.pool import ConnectionPool
+from can_i_access.session import CheckSession
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class SelfRedirectHandler(BaseHTTPRequestHandler):
+    """Redirects every request back to the same path"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        self.send_response(302)
+        self.send_header('Location', self.path)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class RedirectLoopTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), SelfRedirectHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/loop"
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def assertRedirectLoop(self, result):
+        self.assertEqual(result['status'], 'Not Reachable')
+        self.assertEqual(result['http_status'], 302)
+        self.assertIn('redirect loop', result['message'])
+    
+    def test_pooled_check_reports_redirect_loop(self):
+        session = CheckSession(pool=ConnectionPool())
+        self.addCleanup(session.pool.close)
+        self.assertRedirectLoop(check_url_accessibility(self.url, timeout=5, session=session))
+    
+    def test_urlopen_check_reports_redirect_loop(self):
+        self.assertRedirectLoop(check_url_accessibility(self.url, timeout=5, session=CheckSession()))
+    
+    def test_async_check_reports_redirect_loop(self):
+        result = run(check_url_accessibility_async(self.url, timeout=5))
+        self.assertRedirectLoop(result)
+
+if __name__ == '__main__':
+    unittest.main()
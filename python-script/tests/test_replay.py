@@ -0,0 +1,133 @@
+"""
+Tests for --record and --replay of raw network outcomes
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.pool import ConnectionPool
+from can_i_access.replay import (
+    OutcomeRecorder, OutcomesFileError, ReplaySession, describe_error, load_outcomes, rebuild_error,
+)
+from can_i_access.session import CheckSession, mark_connected
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """Serves a page at /, a 404 at /missing and a redirect loop at /loop"""
+    
+    def do_GET(self):
+        if self.path == '/loop':
+            self.send_response(302)
+            self.send_header('Location', '/loop')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'<html><head><title>Site</title></head></html>'
+        self.send_response(404 if self.path == '/missing' else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def unused_port():
+    """A local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+class RecordReplayTest(unittest.TestCase):
+    
+    def setUp(self):
+        server = ThreadingServer(('127.0.0.1', 0), SiteHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        self.urls = [base + '/', base + '/missing', base + '/loop', f"http://127.0.0.1:{unused_port()}/"]
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.path = os.path.join(work_dir.name, 'outcomes.jsonl')
+    
+    def record(self, engine):
+        recorder = OutcomeRecorder(self.path, {'timeout': 5})
+        session = CheckSession(pool=ConnectionPool(), https_upgrade=False, outcomes=recorder)
+        try:
+            if engine == 'async':
+                return [run(check_url_accessibility_async(url, timeout=5, session=session))
+                        for url in self.urls]
+            return [check_url_accessibility(url, timeout=5, session=session) for url in self.urls]
+        finally:
+            session.close()
+            recorder.close()
+    
+    def replay(self):
+        settings, outcomes = load_outcomes(self.path)
+        self.assertEqual(settings, {'timeout': 5})
+        session = ReplaySession(outcomes, https_upgrade=False)
+        results = []
+        for url in self.urls:
+            session.start_check()
+            results.append(check_url_accessibility(url, timeout=5, session=session))
+        return results
+    
+    def test_replay_classifies_like_the_recorded_run(self):
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                recorded = self.record(engine)
+                self.assertIn('redirect loop', recorded[2]['message'])
+                replayed = self.replay()
+                self.assertEqual([(result['status'], result['message'], result['http_status'])
+                                  for result in replayed],
+                                 [(result['status'], result['message'], result['http_status'])
+                                  for result in recorded])
+    
+    def test_url_not_recorded_fails_without_the_network(self):
+        self.record('thread')
+        _, outcomes = load_outcomes(self.path)
+        session = ReplaySession(outcomes, https_upgrade=False)
+        result = check_url_accessibility('http://not-recorded.invalid/', timeout=5, session=session)
+        self.assertIn('no recorded outcome', result['message'])
+    
+    def test_file_without_the_header_is_rejected(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"url":"https://a.example/"}\n')
+        with self.assertRaises(OutcomesFileError):
+            load_outcomes(self.path)
+
+class ErrorDescriptionTest(unittest.TestCase):
+    
+    def test_errors_are_rebuilt_with_their_type_and_connected_mark(self):
+        for error in (ConnectionResetError(104, 'Connection reset by peer'),
+                      mark_connected(ConnectionResetError(104, 'Connection reset by peer')),
+                      socket.gaierror(-2, 'Name or service not known'),
+                      socket.timeout('timed out')):
+            with self.subTest(error=repr(error)):
+                rebuilt = rebuild_error(describe_error(error))
+                self.assertIs(type(rebuilt), type(error))
+                self.assertEqual(str(rebuilt), str(error))
+                self.assertEqual(getattr(rebuilt, 'connected', False), getattr(error, 'connected', False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests for HTML reports
+"""
+
+import io
+import json
+import re
+import unittest
+from unittest import mock
+
+from can_i_access import new_result
+from can_i_access.commands import report
+
+def checked(url, status, **fields):
+    result = new_result(url)
+    result.update(status=status, message=f"{status} message", **fields)
+    return result
+
+def html_report(results):
+    summary = report.ReportSummary()
+    for result in results:
+        summary.add(result)
+    out = io.StringIO()
+    report.write_html_report(out, summary, iter(results), 0)
+    return out.getvalue()
+
+class HtmlReportTest(unittest.TestCase):
+    
+    def test_small_report_renders_escaped_rows(self):
+        html = html_report([checked('https://a.example/?q=<b>', 'Fully Accessible'),
+                            checked('https://b.example/', 'Not Reachable', importance=80)])
+        self.assertIn('https://a.example/?q=&lt;b&gt;', html)
+        self.assertNotIn('<b>', html)
+        self.assertIn('<span class="status blocked">Not Reachable</span>', html)
+        # Priority has a value in some row, Site/Unit/PII in none
+        self.assertIn('<span class="importance high">80</span>', html)
+        self.assertIn('<th>Priority</th>', html)
+        self.assertNotIn('<th>Site</th>', html)
+        self.assertNotIn('report-data', html)
+    
+    def test_large_report_embeds_rows_for_paging(self):
+        results = [checked(f"https://{number}.example/", 'Fully Accessible') for number in range(5)]
+        results.append(checked('https://x.example/</script>', 'Error', site_name='Site X'))
+        with mock.patch.object(report, 'PAGED_REPORT_ROWS', 3):
+            html = html_report(results)
+        
+        data = re.search(r'<script type="application/json" id="report-data">(.*?)</script>',
+                         html, re.DOTALL).group(1)
+        self.assertNotIn('</script>', data)
+        data = json.loads(data)
+        self.assertEqual(data['columns'], ['site_name'])
+        self.assertEqual(len(data['rows']), 6)
+        url, status, status_class, inferred, site, message = data['rows'][-1]
+        self.assertEqual((url, status, data['classes'][status_class], site),
+                         ('https://x.example/</script>', 'Error', 'blocked', 'Site X'))
+    
+    def test_empty_report(self):
+        self.assertIn('No results to report', html_report([]))
+
+if __name__ == '__main__':
+    unittest.main()
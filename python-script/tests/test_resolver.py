@@ -0,0 +1,57 @@
+"""
+Tests for the run's DNS cache
+"""
+
+import socket
+import threading
+import unittest
+
+from can_i_access.resolver import Resolver
+
+# getaddrinfo() cannot even encode a label this long, so no query is sent
+TOO_LONG_HOST = 'a' * 64 + '.com'
+
+class ResolverTest(unittest.TestCase):
+    
+    def test_host_is_looked_up_once(self):
+        resolver = Resolver()
+        first = resolver.resolve('localhost', 80)
+        second = resolver.resolve('LOCALHOST', 443)
+        self.assertEqual(resolver.lookups, 1)
+        self.assertEqual(resolver.hits, 1)
+        self.assertEqual(first[0][1][1], 80)
+        self.assertEqual(second[0][1][1], 443)
+    
+    def test_ip_literals_are_not_looked_up(self):
+        resolver = Resolver()
+        self.assertEqual(resolver.resolve('127.0.0.1', 80), [(socket.AF_INET, ('127.0.0.1', 80))])
+        self.assertEqual(resolver.lookups, 0)
+    
+    def test_unencodable_host_fails_every_time_without_hanging(self):
+        resolver = Resolver()
+        for _ in range(2):
+            with self.assertRaises(UnicodeError):
+                resolver.resolve(TOO_LONG_HOST)
+        self.assertEqual(resolver.lookups, 1)
+        
+        # A second thread asking for the host must not wait for a lookup
+        # that already ended
+        errors = []
+        
+        def resolve():
+            try:
+                resolver.resolve(TOO_LONG_HOST)
+            except UnicodeError as e:
+                errors.append(e)
+        thread = threading.Thread(target=resolve)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+    
+    def test_prefetch_reports_unencodable_host_as_failed(self):
+        resolver = Resolver()
+        self.assertEqual(resolver.prefetch(['localhost', TOO_LONG_HOST]), [TOO_LONG_HOST.lower()])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for reading saved results files incrementally
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from can_i_access import resultfile
+from can_i_access.resultfile import ResultFile, ResultFileError
+
+RESULTS = [{'url': f"https://{number}.example/", 'status': 'Fully Accessible', 'message': 'x' * number}
+           for number in range(50)]
+
+class ResultFileTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+    
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+    
+    def test_json_document_is_read_across_buffer_boundaries(self):
+        path = self.write('results.json', json.dumps({'timestamp': 1700000000.5, 'results': RESULTS,
+                                                      'summary': {'total': 50}}, indent=2))
+        # Small reads split results, strings and whitespace between buffers
+        with mock.patch.object(resultfile, 'READ_SIZE', 7):
+            source = ResultFile(path)
+            self.assertFalse(source.jsonl)
+            self.assertEqual(list(source), RESULTS)
+            self.assertEqual(source.timestamp, 1700000000.5)
+            # Each pass reads the file again
+            self.assertEqual(len(list(source)), 50)
+    
+    def test_bare_list(self):
+        path = self.write('results.json', json.dumps(RESULTS[:3]))
+        self.assertEqual(list(ResultFile(path)), RESULTS[:3])
+    
+    def test_jsonl_is_detected_and_a_cut_off_last_line_skipped(self):
+        lines = ''.join(json.dumps(result) + '\n' for result in RESULTS[:3])
+        path = self.write('results.txt', lines + '{"url": "https://cut.exa')
+        source = ResultFile(path)
+        self.assertTrue(source.jsonl)
+        self.assertEqual(list(source), RESULTS[:3])
+    
+    def test_invalid_files_raise(self):
+        for name, text in (('results.json', '{"results": [{"url": "https://a.example/"}]}'),
+                           ('results.json', '{"results": [1, 2'),
+                           ('results.jsonl', '{"status": "Error"}\nnot json\n')):
+            with self.subTest(text=text):
+                with self.assertRaises(ResultFileError):
+                    list(ResultFile(self.write(name, text)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Tests for compact result records
+"""
+
+import json
+import unittest
+
+from can_i_access import new_result
+from can_i_access.results import (
+    ACCESSIBLE, BLOCKED, ERROR, FIELDS, MENTIONS_HTTP, WARNING, CheckResult, ResultStore, status_category,
+)
+
+class CheckResultTest(unittest.TestCase):
+    
+    def test_reads_and_serializes_like_a_dict(self):
+        result = new_result('https://example.com/')
+        result.update({'status': 'Fully Accessible', 'http_status': 200}, source='Sheet')
+        result['note'] = 'extra'
+        
+        self.assertIsInstance(result, CheckResult)
+        self.assertEqual(list(result), list(FIELDS) + ['source', 'note'])
+        self.assertEqual(result['status'], 'Fully Accessible')
+        self.assertEqual(result.get('missing', 'default'), 'default')
+        self.assertIn('note', result)
+        self.assertNotIn('missing', result)
+        with self.assertRaises(KeyError):
+            result['missing']
+        self.assertEqual(json.loads(json.dumps(dict(result)))['source'], 'Sheet')
+    
+    def test_optional_fields_are_absent_until_set(self):
+        result = new_result('https://example.com/')
+        self.assertNotIn('source', result)
+        self.assertNotIn('source', dict(result))
+        with self.assertRaises(KeyError):
+            result['source']
+    
+    def test_repeated_strings_are_stored_once(self):
+        first = new_result('https://a.example/')
+        second = new_result('https://b.example/')
+        first['message'] = ''.join(['Connection ', 'timed out'])
+        second['message'] = ''.join(['Connection timed', ' out'])
+        self.assertIs(first['message'], second['message'])
+    
+    def test_records_have_no_instance_dict(self):
+        self.assertFalse(hasattr(new_result('https://example.com/'), '__dict__'))
+    
+    def test_dict_form_round_trips(self):
+        result = new_result('https://example.com/')
+        result.update(status='Blocked', source='CSV file', note='extra')
+        rebuilt = CheckResult.from_dict(json.loads(json.dumps(dict(result))))
+        self.assertEqual(rebuilt, result)
+        self.assertEqual(rebuilt, dict(result))
+
+def checked(url, status, **fields):
+    result = new_result(url)
+    result.update(status=status, **fields)
+    return result
+
+class ResultStoreTest(unittest.TestCase):
+    
+    def test_statuses_are_classified_into_category_bits(self):
+        self.assertEqual(status_category('Fully Accessible'), ACCESSIBLE)
+        self.assertEqual(status_category('Reachable (HTTP Warning)'), WARNING | MENTIONS_HTTP)
+        self.assertEqual(status_category('Not Reachable'), BLOCKED)
+        self.assertEqual(status_category('Video Removed'), BLOCKED)
+        self.assertEqual(status_category('Error'), ERROR)
+    
+    def test_totals_are_kept_as_results_arrive(self):
+        store = ResultStore()
+        store.append(checked('https://a.example/', 'Fully Accessible', bytes_transferred=100))
+        store.append(checked('http://b.example/', 'Reachable (HTTP Warning)', importance=80))
+        store.append({'url': 'https://c.example/', 'status': 'Not Reachable', 'cached': True,
+                      'pii_required': True})
+        store.append(checked('https://d.example/', 'Error', inferred=True, bytes_transferred=20))
+        
+        self.assertEqual(len(store), 4)
+        self.assertEqual((store.accessible, store.warnings, store.blocked, store.errors), (1, 1, 1, 1))
+        self.assertEqual((store.inferred, store.cached, store.pii_required, store.high_priority),
+                         (1, 1, 1, 1))
+        self.assertEqual(store.problems, 2)
+        self.assertEqual(store.bytes_transferred, 120)
+        self.assertEqual(store.percent(store.problems), 50.0)
+    
+    def test_filters_select_by_category(self):
+        store = ResultStore([checked('https://a.example/', 'Fully Accessible'),
+                             checked('http://b.example/', 'Accessible (HTTP only)'),
+                             checked('https://c.example/', 'Not Reachable')])
+        urls = lambda selected: [result['url'] for result in selected]
+        self.assertEqual(urls(store.filter('blocked')), ['https://c.example/'])
+        self.assertEqual(urls(store.filter('accessible')), ['https://a.example/', 'http://b.example/'])
+        self.assertEqual(urls(store.filter('warnings')), ['http://b.example/'])
+        self.assertIs(store.filter('all'), store)
+        self.assertEqual(store.filter('blocked').blocked, 1)
+    
+    def test_totals_only_store_keeps_no_rows(self):
+        store = ResultStore(keep_rows=False)
+        store.append(checked('https://a.example/', 'Fully Accessible'))
+        store.append(checked('https://b.example/', 'Error'))
+        self.assertEqual((len(store), store.accessible, store.errors), (2, 1, 1))
+        self.assertEqual(list(store), [])
+    
+    def test_phase_percentiles_cover_the_measured_phases(self):
+        store = ResultStore(keep_rows=False)
+        for i in range(1, 11):
+            store.append(checked(f"https://{i}.example/", 'Fully Accessible',
+                                 connect_time=i / 100, first_byte_time=i / 10))
+        store.append(checked('https://cached.example/', 'Fully Accessible'))
+        
+        summary = store.phase_percentiles((0.5, 0.9))
+        self.assertEqual(list(summary), ['connect_time', 'first_byte_time'])
+        count, (p50, p90) = summary['connect_time']
+        self.assertEqual(count, 10)
+        self.assertAlmostEqual(p50, 0.06, places=6)
+        self.assertAlmostEqual(p90, 0.10, places=6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Tests for the rate and per-host limits of the check scheduler
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+
+from can_i_access.aio import iter_checks_async
+from can_i_access.engine import iter_checks
+from can_i_access.scheduler import Scheduler, TokenBucket
+
+class FakeClock:
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+class TokenBucketTest(unittest.TestCase):
+    
+    def test_starts_full_then_refills_at_the_rate(self):
+        bucket = TokenBucket(2, burst=2)
+        for _ in range(2):
+            self.assertEqual(bucket.wait_time(0.0), 0.0)
+            bucket.take()
+        self.assertAlmostEqual(bucket.wait_time(0.0), 0.5)
+        self.assertEqual(bucket.wait_time(0.5), 0.0)
+
+class SchedulerTest(unittest.TestCase):
+    
+    def test_global_rate_delays_every_host(self):
+        clock = FakeClock()
+        scheduler = Scheduler(rate=1, host_concurrency=0, clock=clock)
+        self.assertEqual(scheduler.start_next(['a', 'b']), (0, 0.0))
+        self.assertEqual(scheduler.start_next(['a', 'b']), (None, 1.0))
+        clock.now = 1.0
+        self.assertEqual(scheduler.start_next(['b']), (0, 0.0))
+    
+    def test_busy_host_is_passed_over_for_another(self):
+        scheduler = Scheduler(host_concurrency=1, clock=FakeClock())
+        self.assertEqual(scheduler.start_next(['a', 'a', 'b']), (0, 0.0))
+        self.assertEqual(scheduler.start_next(['a', 'b']), (1, 0.0))
+        # Only a finishing check can free a slot
+        self.assertEqual(scheduler.start_next(['a', 'b']), (None, None))
+        scheduler.finish('a')
+        self.assertEqual(scheduler.start_next(['a', 'b']), (0, 0.0))
+        self.assertEqual(scheduler.held_back, 1)
+    
+    def test_host_rate_reports_the_soonest_start(self):
+        clock = FakeClock()
+        scheduler = Scheduler(host_rate=2, host_concurrency=0, clock=clock)
+        # A burst of two, then one start every half second per host
+        for _ in range(2):
+            self.assertEqual(scheduler.start_next(['a']), (0, 0.0))
+        self.assertEqual(scheduler.start_next(['a', 'b']), (1, 0.0))
+        self.assertEqual(scheduler.start_next(['a']), (None, 0.5))
+
+class ScheduledEngineTest(unittest.TestCase):
+    
+    def test_engines_keep_to_the_host_concurrency(self):
+        items = [(host, number) for number in range(6) for host in ('a', 'b')]
+        
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                lock = threading.Lock()
+                active = {'a': 0, 'b': 0}
+                peak = {'a': 0, 'b': 0}
+                
+                def begin(host):
+                    with lock:
+                        active[host] += 1
+                        peak[host] = max(peak[host], active[host])
+                
+                def end(host):
+                    with lock:
+                        active[host] -= 1
+                
+                def check(item):
+                    begin(item[0])
+                    time.sleep(0.02)
+                    end(item[0])
+                    return item
+                
+                async def check_async(item):
+                    begin(item[0])
+                    await asyncio.sleep(0.02)
+                    end(item[0])
+                    return item
+                
+                scheduler = Scheduler(host_concurrency=2)
+                host = lambda item: item[0]
+                if engine == 'thread':
+                    results = list(iter_checks(items, check, 6, scheduler, host))
+                else:
+                    results = list(iter_checks_async(items, check_async, 6, scheduler, host))
+                self.assertEqual(sorted(item for _, item, _ in results), sorted(items))
+                self.assertEqual(peak, {'a': 2, 'b': 2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Tests for conditional Google Sheet downloads and their on-disk copies
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import mock
+
+from can_i_access.sheets import fetch_sheet, sheet_cache_paths
+
+SHEET = 'URL,site\r\nhttps://a.example/,Site A\r\n'
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class SheetHandler(BaseHTTPRequestHandler):
+    """Serves SHEET with an ETag, answering a matching If-None-Match with 304"""
+    
+    def do_GET(self):
+        self.server.validators.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = SHEET.encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+class FetchSheetTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        patcher = mock.patch.dict(os.environ, {'XDG_CACHE_HOME': directory})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.server = ThreadingServer(('127.0.0.1', 0), SheetHandler)
+        self.server.validators = []
+        self.running = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.stop_server)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/sheet.csv"
+    
+    def stop_server(self):
+        if self.running:
+            self.server.shutdown()
+            self.server.server_close()
+            self.running = False
+    
+    def test_unchanged_sheet_is_revalidated_then_used_offline(self):
+        content, origin, fetched_at = fetch_sheet(self.url, timeout=5)
+        self.assertEqual((content, origin), (SHEET, 'downloaded'))
+        
+        content, origin, cached_at = fetch_sheet(self.url, timeout=5)
+        self.assertEqual((content, origin, cached_at), (SHEET, 'unchanged', fetched_at))
+        self.assertEqual(self.server.validators, [None, '"v1"'])
+        
+        self.stop_server()
+        content, origin, cached_at = fetch_sheet(self.url, timeout=5)
+        self.assertEqual((content, origin, cached_at), (SHEET, 'offline', fetched_at))
+    
+    def test_copy_not_matching_its_validators_is_downloaded_again(self):
+        fetch_sheet(self.url, timeout=5)
+        csv_path, meta_path = sheet_cache_paths(self.url)
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            f.write('URL\r\nhttps://stale.example/\r\n')
+        
+        content, origin, fetched_at = fetch_sheet(self.url, timeout=5)
+        self.assertEqual((content, origin), (SHEET, 'downloaded'))
+        self.assertEqual(self.server.validators, [None, None])
+    
+    def test_unreachable_sheet_without_a_copy_raises(self):
+        self.stop_server()
+        with self.assertRaises(OSError):
+            fetch_sheet(self.url, timeout=5)
+
+if __name__ == '__main__':
+    unittest.main()
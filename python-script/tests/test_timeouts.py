@@ -0,0 +1,105 @@
+"""
+Tests for adaptive per-host timeouts
+"""
+
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from can_i_access import check_url_accessibility
+from can_i_access.aio import check_url_accessibility_async
+from can_i_access.pool import ConnectionPool
+from can_i_access.session import CheckSession
+from can_i_access.timeouts import MIN_SAMPLES, AdaptiveTimeouts
+
+def run(coroutine):
+    """asyncio.run(), which Python 3.6 does not have"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """http.server.ThreadingHTTPServer, which Python 3.6 does not have"""
+    
+    daemon_threads = True
+
+class OkHandler(BaseHTTPRequestHandler):
+    """Answers every GET with an empty 200"""
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def log_message(self, format, *args):
+        pass
+
+class AdaptiveTimeoutsTest(unittest.TestCase):
+    
+    def test_unknown_host_gets_the_initial_timeout(self):
+        self.assertEqual(AdaptiveTimeouts(10).deadlines('a.example'), (10, 10))
+    
+    def test_connect_deadline_follows_the_host_connect_times(self):
+        timeouts = AdaptiveTimeouts(10, minimum=0.1)
+        for _ in range(5):
+            timeouts.record_connect('a.example', 0.1)
+        read, connect = timeouts.deadlines('a.example')
+        self.assertEqual(read, 10)
+        self.assertLess(connect, 1)
+        # A second host is not affected until the run has enough samples
+        self.assertEqual(timeouts.deadlines('b.example'), (10, 10))
+    
+    def test_unseen_hosts_use_the_run_percentile(self):
+        timeouts = AdaptiveTimeouts(10, minimum=0.1)
+        for number in range(MIN_SAMPLES):
+            timeouts.record_connect(f"{number}.example", 0.2)
+        self.assertEqual(timeouts.deadlines('new.example'), (10, 0.6))
+    
+    def test_slow_hosts_get_longer_reads_within_the_maximum(self):
+        timeouts = AdaptiveTimeouts(10, maximum=30)
+        timeouts.record_response('slow.example', 12)
+        self.assertEqual(timeouts.deadlines('slow.example')[0], 30)
+        timeouts.record_response('fast.example', 0.1)
+        self.assertEqual(timeouts.deadlines('fast.example')[0], 10)
+    
+    def test_timeouts_back_off_until_the_host_answers(self):
+        timeouts = AdaptiveTimeouts(5, minimum=0.1, maximum=60)
+        timeouts.record_timeout('a.example')
+        timeouts.record_timeout('a.example')
+        self.assertEqual(timeouts.deadlines('a.example'), (20, 20))
+        timeouts.record_response('a.example', 0.1)
+        self.assertEqual(timeouts.deadlines('a.example')[0], 5)
+
+class AdaptiveCheckTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.server = ThreadingServer(('127.0.0.1', 0), OkHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+    
+    def test_checks_record_latencies_and_their_deadlines(self):
+        for engine in ('thread', 'async'):
+            with self.subTest(engine=engine):
+                timeouts = AdaptiveTimeouts(10, minimum=1)
+                pool = ConnectionPool(timeouts=timeouts) if engine == 'thread' else None
+                session = CheckSession(pool=pool, https_upgrade=False, timeouts=timeouts)
+                self.addCleanup(session.close)
+                for _ in range(2):
+                    if engine == 'thread':
+                        result = check_url_accessibility(self.url, timeout=10, session=session)
+                    else:
+                        result = run(check_url_accessibility_async(self.url, timeout=10, session=session))
+                    self.assertEqual(result['status'], 'Reachable (HTTP Warning)', result['message'])
+                # The second check's connect deadline came from the first
+                self.assertEqual((result['timeout'], result['connect_timeout']), (10, 1))
+
+if __name__ == '__main__':
+    unittest.main()
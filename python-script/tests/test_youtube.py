@@ -0,0 +1,118 @@
+"""
+Tests for YouTube video checks
+"""
+
+import http.client
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from can_i_access import check_youtube_video, classify_youtube_url
+from can_i_access.youtube import VideoCache, VideoChecker
+
+class FailingSession:
+    """Stands in for a CheckSession whose every request raises error"""
+    
+    def __init__(self, error):
+        self.error = error
+        self.requests = 0
+    
+    def request(self, method, url, headers, timeout):
+        self.requests += 1
+        raise self.error
+
+class StatusSession:
+    """Stands in for a CheckSession answering every request with status, slowly"""
+    
+    def __init__(self, status):
+        self.status = status
+        self.requests = 0
+    
+    def request(self, method, url, headers, timeout):
+        self.requests += 1
+        time.sleep(0.05)
+        return self
+
+class ClassifyYoutubeUrlTest(unittest.TestCase):
+    
+    def test_links_are_classified_in_one_pass(self):
+        links = {
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ': ('video', 'dQw4w9WgXcQ'),
+            'https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ': ('video', 'dQw4w9WgXcQ'),
+            'https://youtu.be/dQw4w9WgXcQ': ('video', 'dQw4w9WgXcQ'),
+            'https://www.youtube.com/shorts/abc_DEF-123': ('video', 'abc_DEF-123'),
+            'https://www.youtube.com/live/abc_DEF-123': ('video', 'abc_DEF-123'),
+            'https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ': ('video', 'dQw4w9WgXcQ'),
+            'https://www.youtube.com/playlist?list=PL0123456789': ('playlist', 'PL0123456789'),
+            'https://www.youtube.com/channel/UC0123456789': None,
+            'https://example.com/watch?v=dQw4w9WgXcQ': None,
+        }
+        for url, expected in links.items():
+            with self.subTest(url=url):
+                self.assertEqual(classify_youtube_url(url), expected)
+
+class VideoCheckerTest(unittest.TestCase):
+    
+    def test_concurrent_checks_of_one_video_share_a_request(self):
+        session = StatusSession(200)
+        checker = VideoChecker()
+        self.assertIsNone(checker.cached('video', 'dQw4w9WgXcQ'))
+        threads = [threading.Thread(target=checker.check, args=('video', 'dQw4w9WgXcQ', 1, session))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual((session.requests, checker.queries), (1, 1))
+        self.assertTrue(checker.cached('video', 'dQw4w9WgXcQ')['available'])
+    
+    def test_only_definitive_answers_are_kept_between_runs(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'videos.sqlite')
+        
+        checker = VideoChecker(store=VideoCache(path))
+        checker.check('video', 'removed0001', 1, StatusSession(404))
+        checker.check('video', 'erroring001', 1, FailingSession(ConnectionResetError()))
+        checker.close()
+        
+        session = StatusSession(200)
+        checker = VideoChecker(store=VideoCache(path))
+        self.addCleanup(checker.close)
+        self.assertFalse(checker.check('video', 'removed0001', 1, session)['available'])
+        self.assertTrue(checker.check('video', 'erroring001', 1, session)['available'])
+        self.assertEqual((checker.stored_hits, session.requests), (1, 1))
+        
+        refreshed = VideoChecker(store=checker.store, refresh=True)
+        refreshed.check('video', 'removed0001', 1, session)
+        self.assertEqual(session.requests, 2)
+
+class VideoCheckTest(unittest.TestCase):
+    
+    def test_dropped_connections_are_network_errors(self):
+        errors = (ConnectionResetError(104, 'Connection reset by peer'),
+                  http.client.RemoteDisconnected('Remote end closed connection without response'),
+                  http.client.IncompleteRead(b''))
+        for error in errors:
+            with self.subTest(error=type(error).__name__):
+                check = check_youtube_video('dQw4w9WgXcQ', timeout=1, session=FailingSession(error))
+                self.assertFalse(check['available'])
+                self.assertFalse(check['definitive'])
+                self.assertTrue(check['reason'].startswith('Network error'), check['reason'])
+    
+    def test_prefetch_survives_a_failing_check(self):
+        session = FailingSession(RuntimeError('unexpected'))
+        checker = VideoChecker()
+        videos = [('video', 'dQw4w9WgXcQ'), ('playlist', 'PL0123456789')]
+        self.assertEqual(checker.prefetch(videos, 1, session), 2)
+        self.assertEqual(session.requests, 2)
+        # Nothing was remembered, so the URL's own check asks again
+        with self.assertRaises(RuntimeError):
+            checker.check('video', 'dQw4w9WgXcQ', 1, session)
+
+if __name__ == '__main__':
+    unittest.main()